@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Scaling of the allowed_registries encodings in build_smt_for_registry.
+
+For each list size, builds a symbolic query (registry free) and a ground
+query (registry pinned to a bypass string) with the "flat" disjunction
+and the "trie" regular expression, solves them in one warm z3 session,
+and prints SMT size and solve time. Queries that exceed --timeout are
+reported as timeouts rather than aborting the run.
+
+    python benchmarks/bench_registry_encoding.py --sizes 10 100 1000 10000
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from model_builder import build_smt_for_registry    # noqa: E402
+from solver_interface import SolverSession          # noqa: E402
+
+TEAMS = ["corp", "team", "prod", "dev", "eu", "us", "ml", "web", "data", "infra"]
+
+
+def allowlist(n, shape, rng):
+    """
+    n registry hostnames. "shared": a common host prefix, as in
+    per-team mirrors of one registry; "distinct": names diverge from the
+    first character, the worst case for prefix sharing.
+    """
+    if shape == "shared":
+        return [f"registry.example.com.{rng.choice(TEAMS)}{i}" for i in range(n)]
+    return [f"{rng.choice(TEAMS)}{i}.registry.example.com" for i in range(n)]
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    p.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    p.add_argument("--encodings", nargs="+", default=["flat", "trie"])
+    p.add_argument("--shapes", nargs="+", default=["shared", "distinct"])
+    p.add_argument("--timeout", type=int, default=10,
+                   help="Per-query timeout in seconds (default: 10)")
+    p.add_argument("--json", help="Also write the rows to this JSON file")
+    args = p.parse_args()
+
+    rows = []
+    print(f"{'shape':9} {'size':>6} {'encoding':8} {'query':7} "
+          f"{'smt bytes':>10} {'build ms':>9} {'solve ms':>9}  verdict")
+    for shape in args.shapes:
+        for n in args.sizes:
+            allowed = allowlist(n, shape, random.Random(n))
+            bypass = allowed[n // 2] + ".attacker.com"
+            for encoding in args.encodings:
+                for query, extra in (("symbolic", {}), ("ground", {"test_registry": bypass})):
+                    policy = dict(allowed_registries=allowed, prefix_bad=True, **extra)
+                    t0 = time.perf_counter()
+                    smt = build_smt_for_registry(policy, encoding)
+                    t1 = time.perf_counter()
+                    # a fresh session per query so a timeout cannot skew the next one
+                    with SolverSession(timeout=args.timeout) as session:
+                        try:
+                            verdict = "sat" if session.check(smt)[0] else "unsat"
+                        except RuntimeError:
+                            verdict = "timeout"
+                    t2 = time.perf_counter()
+                    row = dict(shape=shape, size=n, encoding=encoding, query=query,
+                               smt_bytes=len(smt), build_ms=(t1 - t0) * 1000,
+                               solve_ms=(t2 - t1) * 1000, verdict=verdict)
+                    rows.append(row)
+                    print(f"{shape:9} {n:>6} {encoding:8} {query:7} {len(smt):>10} "
+                          f"{row['build_ms']:>9.1f} {row['solve_ms']:>9.1f}  {verdict}",
+                          flush=True)
+    if args.json:
+        Path(args.json).write_text(json.dumps(rows, indent=2))
+
+
+if __name__ == "__main__":
+    main()
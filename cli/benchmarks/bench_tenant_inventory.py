@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Scaling of the tenant inventory model in build_smt_for_tenant.
+
+For each inventory size, builds one isolated and one leaking inventory
+(a single non-admin namespace granted access to a neighbour), solves each
+as a single query in a fresh z3 session, and prints SMT size and solve
+time next to the number of pairwise fixtures the same check would take.
+
+    python benchmarks/bench_tenant_inventory.py --sizes 10 100 1000 10000
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from model_builder import build_smt_for_tenant     # noqa: E402
+from solver_interface import SolverSession         # noqa: E402
+
+
+def inventory(n, leak, rng):
+    """n namespaces, 1% of them admins with "*"; everyone else sees itself."""
+    names = [f"team-{i}" for i in range(n)]
+    admins = rng.sample(names, max(1, n // 100))
+    grants = {name: ["*"] if name in admins else [name] for name in names}
+    if leak:
+        tenant = next(name for name in names if name not in admins)
+        grants[tenant].append(rng.choice([name for name in names if name != tenant]))
+    return {"name": f"inventory of {n}", "case": "tenant",
+            "namespaces": names, "admins": admins, "grants": grants}
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    p.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    p.add_argument("--timeout", type=int, default=10,
+                   help="Per-query timeout in seconds (default: 10)")
+    p.add_argument("--json", help="Also write the rows to this JSON file")
+    args = p.parse_args()
+
+    rows = []
+    print(f"{'size':>6} {'pairs':>12} {'query':8} {'smt bytes':>10} "
+          f"{'build ms':>9} {'solve ms':>9}  verdict")
+    for n in args.sizes:
+        for query in ("isolated", "leaking"):
+            policy = inventory(n, query == "leaking", random.Random(n))
+            t0 = time.perf_counter()
+            smt = build_smt_for_tenant(policy)
+            t1 = time.perf_counter()
+            with SolverSession(timeout=args.timeout) as session:
+                try:
+                    verdict = "sat" if session.check(smt)[0] else "unsat"
+                except RuntimeError:
+                    verdict = "timeout"
+            t2 = time.perf_counter()
+            row = dict(size=n, pairs=n * n, query=query, smt_bytes=len(smt),
+                       build_ms=(t1 - t0) * 1000, solve_ms=(t2 - t1) * 1000,
+                       verdict=verdict)
+            rows.append(row)
+            print(f"{n:>6} {n * n:>12} {query:8} {len(smt):>10} "
+                  f"{row['build_ms']:>9.1f} {row['solve_ms']:>9.1f}  {verdict}",
+                  flush=True)
+    if args.json:
+        Path(args.json).write_text(json.dumps(rows, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Generate a synthetic `kubectl get ... -o yaml` RBAC dump for scan_rbac.py.
+
+Produces `--namespaces` namespaces with a few Roles, RoleBindings and
+ServiceAccount subjects each, a set of ClusterRoles (one in
+`--wildcard-ratio` of them with a `*` rule) and ClusterRoleBindings to
+Groups, Users and ServiceAccounts. A small share of bindings reference
+roles that are not in the dump. Output is deterministic for a given seed.
+
+    python benchmarks/generate_cluster_dump.py -o /tmp/rbac.yaml --namespaces 5000
+"""
+import argparse
+import json
+import random
+from pathlib import Path
+
+import yaml
+
+VERBS = ["get", "list", "watch", "create", "update", "patch", "delete"]
+RESOURCES = ["pods", "deployments", "services", "configmaps", "secrets", "jobs"]
+
+
+def _rules(rng, wildcard):
+    rules = [{"apiGroups": [""], "resources": rng.sample(RESOURCES, 2),
+              "verbs": rng.sample(VERBS, 3)} for _ in range(rng.randint(1, 4))]
+    if wildcard:
+        rules.append({"apiGroups": ["*"], "resources": ["*"], "verbs": ["*"]})
+    return rules
+
+
+def generate(namespaces=1000, cluster_roles=200, wildcard_ratio=0.02, seed=0):
+    """Return a kind: List of roles and bindings."""
+    rng = random.Random(seed)
+    items = []
+    for c in range(cluster_roles):
+        items.append({"apiVersion": "rbac.authorization.k8s.io/v1", "kind": "ClusterRole",
+                      "metadata": {"name": f"cluster-role-{c}"},
+                      "rules": _rules(rng, rng.random() < wildcard_ratio)})
+    for n in range(namespaces):
+        ns = f"team-{n}"
+        for r in range(3):
+            items.append({"apiVersion": "rbac.authorization.k8s.io/v1", "kind": "Role",
+                          "metadata": {"name": f"role-{r}", "namespace": ns},
+                          "rules": _rules(rng, False)})
+        for b in range(3):
+            if rng.random() < 0.5:
+                ref = {"kind": "Role", "name": f"role-{rng.randrange(4)}"}   # role-3: missing
+            else:
+                ref = {"kind": "ClusterRole", "name": f"cluster-role-{rng.randrange(cluster_roles)}"}
+            items.append({"apiVersion": "rbac.authorization.k8s.io/v1", "kind": "RoleBinding",
+                          "metadata": {"name": f"binding-{b}", "namespace": ns},
+                          "roleRef": {"apiGroup": "rbac.authorization.k8s.io", **ref},
+                          "subjects": [{"kind": "ServiceAccount", "name": f"sa-{s}",
+                                        "namespace": ns} for s in range(rng.randint(1, 3))]})
+    for b in range(namespaces // 10):
+        kind = rng.choice(["Group", "User", "ServiceAccount"])
+        subject = {"kind": kind, "name": "system:masters" if kind == "Group" and b % 2
+                   else f"{kind.lower()}-{b}"}
+        if kind == "ServiceAccount":
+            subject["namespace"] = f"team-{rng.randrange(namespaces)}"
+        items.append({"apiVersion": "rbac.authorization.k8s.io/v1", "kind": "ClusterRoleBinding",
+                      "metadata": {"name": f"cluster-binding-{b}"},
+                      "roleRef": {"apiGroup": "rbac.authorization.k8s.io", "kind": "ClusterRole",
+                                  "name": f"cluster-role-{rng.randrange(cluster_roles)}"},
+                      "subjects": [subject]})
+    return {"apiVersion": "v1", "kind": "List", "items": items}
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    p.add_argument("--out", "-o", required=True, help="File to write (.yaml or .json)")
+    p.add_argument("--namespaces", type=int, default=1000)
+    p.add_argument("--cluster-roles", type=int, default=200)
+    p.add_argument("--wildcard-ratio", type=float, default=0.02)
+    p.add_argument("--seed", type=int, default=0)
+    args = p.parse_args()
+
+    dump = generate(args.namespaces, args.cluster_roles, args.wildcard_ratio, args.seed)
+    out = Path(args.out)
+    if out.suffix == ".json":
+        out.write_text(json.dumps(dump))
+    else:
+        out.write_text(yaml.dump(dump, Dumper=getattr(yaml, "CSafeDumper", yaml.SafeDumper)))
+    print(f"Wrote {len(dump['items'])} objects to {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Generate synthetic registry, wildcard and tenant fixtures for benchmarks.
+
+Fixtures follow the same schema as cli/fixtures/. A `bad_ratio` share of
+them encode a violation (prefix bypass, wildcard to a non-admin, cross
+tenant access), the rest the corresponding fixed configuration. Output is
+deterministic for a given seed.
+
+    python benchmarks/generate_fixtures.py -o /tmp/fixtures --count 5000
+"""
+import argparse
+import random
+from pathlib import Path
+
+import yaml
+
+CASES = ("registry", "wildcard", "tenant")
+KINDS = ["ClusterRole", "Role"]
+ACTIONS = ["create", "update", "patch", "bind", "escalate"]
+
+
+def _registry(i, rng, bad, allowlist_size):
+    allowed = [f"registry{n}.corp{rng.randrange(100)}.example.com"
+               for n in range(allowlist_size)]
+    pick = rng.choice(allowed)
+    return {
+        "name": f"Synthetic registry {i} ({'bad' if bad else 'fixed'})",
+        "case": "registry",
+        "allowed_registries": allowed,
+        "test_registry": f"{pick}.attacker.com" if bad else pick,
+        "prefix_bad": bad,
+    }
+
+
+def _wildcard(i, rng, bad, allowlist_size):
+    # fixed: either an admin holding the wildcard, or no wildcard at all
+    admin = False if bad else rng.random() < 0.5
+    return {
+        "name": f"Synthetic wildcard {i} ({'bad' if bad else 'fixed'})",
+        "case": "wildcard",
+        "resource_kind": rng.choice(KINDS),
+        "action": rng.choice(ACTIONS),
+        "subject_is_admin": admin,
+        "wildcard_present": bad or admin,
+    }
+
+
+def _tenant(i, rng, bad, allowlist_size):
+    subj = f"team{rng.randrange(1000)}"
+    res = subj if not bad else f"team{rng.randrange(1000)}x"
+    return {
+        "name": f"Synthetic tenant {i} ({'bad' if bad else 'fixed'})",
+        "case": "tenant",
+        "subject_tenant": subj,
+        "resource_tenant": res,
+    }
+
+
+GENERATORS = {"registry": _registry, "wildcard": _wildcard, "tenant": _tenant}
+
+
+def generate(count, cases=CASES, bad_ratio=0.5, allowlist_size=5, seed=0):
+    """Yield `count` fixture dicts cycling through `cases`."""
+    rng = random.Random(seed)
+    for i in range(count):
+        case = cases[i % len(cases)]
+        yield GENERATORS[case](i, rng, rng.random() < bad_ratio, allowlist_size)
+
+
+def write_fixtures(out_dir, fixtures, per_file=100):
+    """
+    Write fixtures as multi-document YAML files of `per_file` documents
+    each. Returns the number of files written.
+    """
+    out = Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    batch, n = [], 0
+    for fx in fixtures:
+        batch.append(fx)
+        if len(batch) == per_file:
+            (out / f"synthetic-{n:05d}.yaml").write_text(yaml.safe_dump_all(batch))
+            batch, n = [], n + 1
+    if batch:
+        (out / f"synthetic-{n:05d}.yaml").write_text(yaml.safe_dump_all(batch))
+        n += 1
+    return n
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    p.add_argument("--out", "-o", required=True, help="Directory to write into")
+    p.add_argument("--count", "-n", type=int, default=1000)
+    p.add_argument("--cases", nargs="+", choices=CASES, default=list(CASES))
+    p.add_argument("--bad-ratio", type=float, default=0.5,
+                   help="Share of fixtures that encode a violation (default: 0.5)")
+    p.add_argument("--allowlist-size", type=int, default=5,
+                   help="Entries per registry allowlist (default: 5)")
+    p.add_argument("--per-file", type=int, default=100,
+                   help="YAML documents per file (default: 100)")
+    p.add_argument("--seed", type=int, default=0)
+    args = p.parse_args()
+
+    fixtures = generate(args.count, args.cases, args.bad_ratio,
+                        args.allowlist_size, args.seed)
+    files = write_fixtures(args.out, fixtures, args.per_file)
+    print(f"Wrote {args.count} fixtures to {files} file(s) in {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Throughput and latency benchmarks for the verification CLI.
+
+Generates a synthetic fixture tree (see generate_fixtures.py) and times:
+  - load_fixtures over the whole tree
+  - each build_smt_* builder, per call, on a fresh (not interned) IR
+    object, so every call builds the script
+  - run_smt (fresh z3 per query) and SolverSession.check (warm z3)
+  - verify_policies.py end to end, in several configurations; every run
+    is in-process (--no-server) and parses the YAML (--no-bundle), so a
+    running verify_server.py or an earlier run's bundle cannot answer it
+Results go to a JSON report; --compare checks it against an earlier
+report and exits 1 if any throughput dropped by more than --threshold.
+
+    python benchmarks/run_benchmarks.py --count 3000 -o bench.json
+    python benchmarks/run_benchmarks.py --count 3000 --compare bench.json
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+CLI_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(CLI_DIR))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from generate_fixtures import generate, write_fixtures      # noqa: E402
+from model_builder import (                                 # noqa: E402
+    build_smt_for_registry,
+    build_smt_for_wildcard,
+    build_smt_for_tenant
+)
+from policy_ir import CLASSES                               # noqa: E402
+from schema import validate                                 # noqa: E402
+from solver_interface import SolverSession, run_smt, solver_identity  # noqa: E402
+from utils import load_fixtures, percentile                 # noqa: E402
+
+BUILDERS = {
+    "registry": build_smt_for_registry,
+    "wildcard": build_smt_for_wildcard,
+    "tenant": build_smt_for_tenant,
+}
+
+END_TO_END = {
+    "e2e_default": [],
+    "e2e_no_fast_path": ["--no-fast-path"],
+    "e2e_no_fast_path_batch32": ["--no-fast-path", "--batch-size", "32"],
+    "e2e_no_fast_path_jobs4": ["--no-fast-path", "--jobs", "4"],
+}
+
+
+def summarize(name, latencies, units=None, total=None):
+    """
+    One report row. latencies are seconds per unit of work; units and
+    total override the count and elapsed time for coarse measurements.
+    """
+    units = len(latencies) if units is None else units
+    total = sum(latencies) if total is None else total
+    ms = [t * 1000 for t in latencies]
+    return {
+        "name": name,
+        "units": units,
+        "total_s": round(total, 6),
+        "throughput_per_s": round(units / total, 3) if total else None,
+        "p50_ms": round(percentile(ms, 50), 4),
+        "p95_ms": round(percentile(ms, 95), 4),
+        "p99_ms": round(percentile(ms, 99), 4),
+        "max_ms": round(max(ms), 4),
+    }
+
+
+def timed(fn, *args):
+    t = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - t, result
+
+
+def bench_load(fixture_dir, repeat):
+    runs = [timed(load_fixtures, fixture_dir) for _ in range(repeat)]
+    best, docs = min(runs, key=lambda r: r[0])
+    # latency per document, averaged within each run
+    return summarize("load_fixtures", [t / len(docs) for t, _ in runs],
+                     units=len(docs), total=best), docs
+
+
+def bench_builders(docs):
+    rows, smts = [], {}
+    for case, build in BUILDERS.items():
+        lat = []
+        for fx in (d for d in docs if d["case"] == case):
+            # from_fixture would return the interned object, whose script
+            # is cached after its first build
+            t, smt = timed(build, CLASSES[validate(fx)].from_dict(fx))
+            lat.append(t)
+            smts.setdefault(case, []).append(smt)
+        if lat:
+            rows.append(summarize(f"build_smt_for_{case}", lat))
+    return rows, smts
+
+
+def bench_solvers(smts, sample):
+    rows = []
+    queries = [smt for case in smts.values() for smt in case[:sample]]
+    rows.append(summarize("run_smt", [timed(run_smt, q)[0] for q in queries]))
+    with SolverSession() as session:
+        session.check(queries[0])       # start z3 outside the timing
+        rows.append(summarize("session_check",
+                              [timed(session.check, q)[0] for q in queries]))
+    return rows
+
+
+def bench_end_to_end(fixture_dir, count, configs):
+    rows = []
+    for name, extra in configs.items():
+        cmd = [sys.executable, str(CLI_DIR / "verify_policies.py"),
+               "--input", str(fixture_dir), "--no-cache", "--no-server", "--no-bundle",
+               *extra]
+        t0 = time.perf_counter()
+        first = None
+        with subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True) as proc:
+            for line in proc.stdout:
+                if first is None and line.startswith(("VALID", "INVALID")):
+                    first = time.perf_counter() - t0
+        total = time.perf_counter() - t0
+        row = summarize(name, [total / count], units=count, total=total)
+        row["first_verdict_ms"] = round((first or total) * 1000, 3)
+        rows.append(row)
+    return rows
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=CLI_DIR,
+                              stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                              text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(report, baseline, threshold):
+    """Print throughput deltas; return True if any row regressed."""
+    old = {r["name"]: r for r in baseline["results"]}
+    regressed = False
+    print(f"\n{'benchmark':28} {'baseline/s':>12} {'current/s':>12} {'change':>8}")
+    for row in report["results"]:
+        base = old.get(row["name"])
+        if not base or not base["throughput_per_s"] or not row["throughput_per_s"]:
+            continue
+        change = row["throughput_per_s"] / base["throughput_per_s"] - 1
+        flag = ""
+        if change < -threshold:
+            flag, regressed = "  REGRESSION", True
+        print(f"{row['name']:28} {base['throughput_per_s']:>12.1f} "
+              f"{row['throughput_per_s']:>12.1f} {change:>+8.1%}{flag}")
+    return regressed
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    p.add_argument("--count", "-n", type=int, default=3000,
+                   help="Synthetic fixtures to generate (default: 3000)")
+    p.add_argument("--allowlist-size", type=int, default=5)
+    p.add_argument("--bad-ratio", type=float, default=0.5)
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--repeat", type=int, default=3,
+                   help="Repetitions of the load benchmark (default: 3)")
+    p.add_argument("--solver-sample", type=int, default=50,
+                   help="Queries per case for the solver benchmarks (default: 50)")
+    p.add_argument("--skip-e2e", action="store_true",
+                   help="Skip the end-to-end verify_policies.py runs")
+    p.add_argument("--output", "-o", help="Write the JSON report here")
+    p.add_argument("--compare", help="Earlier JSON report to compare against")
+    p.add_argument("--threshold", type=float, default=0.15,
+                   help="Allowed throughput drop before --compare fails (default: 0.15)")
+    args = p.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        write_fixtures(tmp, generate(args.count, bad_ratio=args.bad_ratio,
+                                     allowlist_size=args.allowlist_size,
+                                     seed=args.seed))
+        results = []
+        row, docs = bench_load(tmp, args.repeat)
+        results.append(row)
+        rows, smts = bench_builders(docs)
+        results += rows
+        results += bench_solvers(smts, args.solver_sample)
+        if not args.skip_e2e:
+            results += bench_end_to_end(tmp, args.count, END_TO_END)
+
+    report = {
+        "meta": {
+            "revision": git_revision(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "solver": solver_identity(),
+            "params": {k: getattr(args, k) for k in
+                       ("count", "allowlist_size", "bad_ratio", "seed")},
+        },
+        "results": results,
+    }
+
+    print(f"{'benchmark':28} {'units':>7} {'per sec':>11} {'p50 ms':>9} "
+          f"{'p95 ms':>9} {'max ms':>9}")
+    for r in results:
+        print(f"{r['name']:28} {r['units']:>7} {r['throughput_per_s'] or 0:>11.1f} "
+              f"{r['p50_ms']:>9.3f} {r['p95_ms']:>9.3f} {r['max_ms']:>9.3f}")
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())
+        if baseline["meta"].get("params") != report["meta"]["params"]:
+            print("warning: baseline was generated with different parameters",
+                  file=sys.stderr)
+        if compare(report, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# cli/evaluator.py
+
+"""
+Fast path for fully ground fixtures.
+
+The wildcard and tenant models, and the registry model whenever a
+test_registry is given, pin every SMT variable to a constant, so their
+satisfiability is just the invariant evaluated on those constants. The
+evaluate_* functions mirror build_smt_for_* exactly (they read the same
+policy IR, see policy_ir.py) and return the verdict in the run_smt
+shape, with a counterexample model laid out like z3's.
+"""
+import re
+
+from policy_ir import RegistryPolicy, TenantInventory, TenantPolicy, WildcardPolicy, as_ir
+
+# Strings that mean the same thing in Python and as SMT-LIB literals.
+_PLAIN = re.compile(r'[ -!#-\[\]-~]*')
+
+
+def _plain(value):
+    return _PLAIN.fullmatch(str(value)) is not None
+
+
+def _model(bindings):
+    """Render [(name, sort, value)] the way z3's (get-model) does."""
+    lines = ["("]
+    for name, sort, value in bindings:
+        if sort == "String":
+            value = f'"{value}"'
+        lines += [f"  (define-fun {name} () {sort}", f"    {value})"]
+    lines.append(")")
+    return "\n".join(lines)
+
+
+def _bool(value):
+    return "true" if value else "false"
+
+
+def evaluate_registry(ir):
+    if ir.test_registry is None:
+        return None          # registry is free: needs the solver
+    if not all(_plain(r) for r in ir.allowed) or not _plain(ir.test_registry):
+        return None
+    if ir.prefix_bad and not any(ir.test_registry.startswith(r) for r in ir.allowed):
+        return False, None
+    if ir.test_registry in ir.allowed:
+        return False, None
+    return True, _model([("registry", "String", ir.test_registry)])
+
+
+def evaluate_wildcard(ir):
+    if ir.is_admin is None or ir.wildcard_present is None:
+        return None          # unknown attribute: needs the solver
+    if not (_plain(ir.resource_kind) and _plain(ir.action)):
+        return None
+    if ir.is_admin or not ir.wildcard_present:
+        return False, None
+    return True, _model([("kind", "String", ir.resource_kind),
+                         ("action", "String", ir.action),
+                         ("isAdmin", "Bool", _bool(ir.is_admin)),
+                         ("hasWildcard", "Bool", _bool(ir.wildcard_present))])
+
+
+def evaluate_tenant(ir):
+    if not (_plain(ir.subject_tenant) and _plain(ir.resource_tenant)):
+        return None
+    if ir.subject_tenant == ir.resource_tenant:
+        return False, None
+    return True, _model([("subTenant", "String", ir.subject_tenant),
+                         ("resTenant", "String", ir.resource_tenant)])
+
+
+def evaluate_tenant_inventory(ir):
+    for sub, targets in ir.grants:
+        if sub < ir.admins:
+            continue
+        if targets is None:
+            targets = range(min(len(ir.names), 2))
+        for res in targets:
+            if res != sub:
+                return True, _model([("sub", "Int", sub), ("res", "Int", res)])
+    return False, None
+
+
+EVALUATORS = {
+    RegistryPolicy: evaluate_registry,
+    WildcardPolicy: evaluate_wildcard,
+    TenantPolicy: evaluate_tenant,
+    TenantInventory: evaluate_tenant_inventory,
+}
+
+
+def evaluate(case, policy):
+    """
+    Decide a fixture (IR object or dict of `case`) without the solver.
+    Returns (sat, model), or None when the fixture has free variables or
+    values the fast path does not handle. Malformed fixtures raise
+    SchemaError like the model builders do.
+    """
+    ir = as_ir(policy, case)
+    return EVALUATORS[type(ir)](ir)
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# cli/fixture_bundle.py
+
+"""
+Precompiled fixture bundles, so repeated runs skip YAML parsing.
+
+A bundle stores, for every fixture file under one input path, the file's
+(mtime_ns, size), the sha256 of its content and its parsed documents as a
+marshal blob. Loading a file from the bundle costs one os.stat and one
+marshal.loads. A file whose mtime or size changed is re-read; if its
+content hash still matches (e.g. after a checkout that only touched it)
+the entry is kept, otherwise only that file is parsed again. Stale
+entries are rewritten at the end of the run.
+
+Bundles live in the cache directory (one per input path), or wherever
+--bundle points. At most MAX_BUNDLES are kept in the cache directory,
+least recently used first out, and they count towards the verdict
+cache's size bound (see result_cache.py). Compiling one ahead of time also checks every document
+against its case's schema:
+
+    python fixture_bundle.py fixtures/
+"""
+import argparse
+import hashlib
+import io
+import marshal
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import yaml
+
+from result_cache import default_cache_dir
+from schema import SchemaError, validate
+from utils import iter_fixture_files
+
+# Bumped whenever the entry layout changes; older bundles are ignored.
+BUNDLE_FORMAT = 1
+
+# Cache-directory bundles kept; each input path (e.g. every temporary
+# benchmark tree) gets its own.
+MAX_BUNDLES = 32
+
+
+def default_bundle_path(path, recursive=True, cache_dir=None):
+    """The cache-directory bundle for the fixtures under `path`."""
+    ident = f"{os.path.abspath(path)}\0{recursive}".encode()
+    root = Path(cache_dir) if cache_dir else default_cache_dir()
+    return root / "bundles" / (hashlib.sha256(ident).hexdigest()[:24] + ".bundle")
+
+
+def evict_bundles(directory, keep=MAX_BUNDLES):
+    """Delete all but the `keep` most recently used bundles in `directory`."""
+    bundles = []
+    for path in Path(directory).glob("*.bundle"):
+        try:
+            bundles.append((path.stat().st_mtime, path))
+        except FileNotFoundError:
+            continue    # evicted by a concurrent process
+    for _, path in sorted(bundles, reverse=True)[keep:]:
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class FixtureBundle:
+    """
+    The entries of one bundle file:
+      abs path -> (mtime_ns, size, sha256 hex, marshal blob or None)
+    A None blob marks a file whose documents marshal cannot represent
+    (e.g. YAML timestamps); such files are always parsed.
+    """
+    def __init__(self, bundle_path):
+        self.path = Path(bundle_path)
+        self.entries = {}
+        self.rebuilt = 0
+        self._dirty = False
+        try:
+            with open(self.path, "rb") as f:
+                data = marshal.load(f)
+            if data.get("format") == BUNDLE_FORMAT:
+                self.entries = data["entries"]
+            os.utime(self.path)     # recently used, for evict_bundles
+        except (OSError, EOFError, ValueError, TypeError, AttributeError):
+            pass            # missing or unreadable: start an empty bundle
+
+    def documents(self, f):
+        """The non-empty YAML documents of file f, from the bundle if current."""
+        key = os.path.abspath(f)
+        st = os.stat(f)
+        entry = self.entries.get(key)
+        if entry and entry[:2] == (st.st_mtime_ns, st.st_size) and entry[3] is not None:
+            return marshal.loads(entry[3])
+        data = Path(f).read_bytes()
+        digest = hashlib.sha256(data).hexdigest()
+        if entry and entry[2] == digest and entry[3] is not None:
+            # touched but unchanged: keep the parse, refresh the stat
+            self.entries[key] = (st.st_mtime_ns, st.st_size, digest, entry[3])
+            self._dirty = True
+            return marshal.loads(entry[3])
+        stream = io.BytesIO(data)
+        stream.name = str(f)    # so YAML errors name the file, as iter_fixtures' do
+        docs = [doc for doc in yaml.safe_load_all(stream) if doc is not None]
+        try:
+            blob = marshal.dumps(docs)
+        except ValueError:
+            blob = None
+        self.entries[key] = (st.st_mtime_ns, st.st_size, digest, blob)
+        self.rebuilt += 1
+        self._dirty = True
+        return docs
+
+    def prune(self, files):
+        """Drop entries for files that are no longer part of the input."""
+        keep = {os.path.abspath(f) for f in files}
+        for key in [k for k in self.entries if k not in keep]:
+            del self.entries[key]
+            self._dirty = True
+
+    def save(self):
+        """Write the bundle if anything changed. I/O problems are never fatal."""
+        if not self._dirty:
+            return
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.path.parent, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                marshal.dump({"format": BUNDLE_FORMAT, "entries": self.entries}, f)
+            os.replace(tmp, self.path)
+            self._dirty = False
+        except OSError:
+            pass
+
+
+def iter_bundled_fixtures(path, recursive=True, bundle_path=None, cache_dir=None):
+    """
+    iter_fixtures() backed by a bundle: yields the same documents in the
+    same order, parsing only files that are new or changed, and saves the
+    refreshed bundle once every file has been read.
+    """
+    bundle = FixtureBundle(bundle_path or default_bundle_path(path, recursive, cache_dir))
+    files = list(iter_fixture_files(path, recursive))
+    for f in files:
+        yield from bundle.documents(f)
+    bundle.prune(files)
+    bundle.save()
+    if not bundle_path:
+        evict_bundles(bundle.path.parent)
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    p.add_argument("input", help="Fixture file or directory")
+    p.add_argument("--out", "-o", default=None,
+                   help="Bundle to write (default: the cache-directory bundle "
+                        "verify_policies.py uses for this input)")
+    p.add_argument("--no-recursive", dest="recursive", action="store_false")
+    p.add_argument("--cache-dir", default=None)
+    args = p.parse_args()
+
+    out = Path(args.out) if args.out else default_bundle_path(args.input, args.recursive,
+                                                               args.cache_dir)
+    bundle = FixtureBundle(out)
+    files = list(iter_fixture_files(args.input, args.recursive))
+    documents = invalid = 0
+    for f in files:
+        try:
+            docs = bundle.documents(f)
+        except (OSError, yaml.YAMLError) as e:
+            print(f"REJECTED: malformed input file ({f}: {e})", file=sys.stderr)
+            invalid += 1
+            continue
+        for doc in docs:
+            documents += 1
+            try:
+                validate(doc)
+            except SchemaError as e:
+                invalid += 1
+                name = doc.get("name", "<unnamed>") if isinstance(doc, dict) else "<unnamed>"
+                print(f"SCHEMA: {f}: {name}: {e}", file=sys.stderr)
+    bundle.prune(files)
+    bundle.save()
+    if not args.out:
+        evict_bundles(out.parent)
+    print(f"{out}: {len(files)} file(s), {documents} document(s), "
+          f"{bundle.rebuilt} parsed, {invalid} invalid")
+    return 1 if invalid else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,47 +4,190 @@
 Translate loaded YAML policy definitions into SMT-LIB2 code
 reflecting the formal model from Section IV.
 """
-from textwrap import dedent
+import re
 
-def build_smt_for_registry(policy):
+from policy_ir import RegistryPolicy, TenantInventory, TenantPolicy, WildcardPolicy, as_ir
+from xacml_compiler import attribute_symbol, smt_string
+
+# Echoed after each fixture of a batch script so its output can be split.
+BATCH_MARKER = "@@k8s-abac-end-of-fixture"
+
+_SET_LOGIC = re.compile(r"^\s*\(set-logic\s+[^)]*\)\s*$", re.MULTILINE)
+
+
+def split_logic(smt):
     """
-    SMT for the 'registry' case:
-      - assert registry = test_registry
-      - (if prefix_bad) assert prefix-match
-      - assert (not allowed) to find violations
+    Split a single-fixture script into its (set-logic ...) line (or "")
+    and the remaining commands.
+    """
+    m = _SET_LOGIC.search(smt)
+    if not m:
+        return "", smt
+    return m.group(0).strip(), smt[:m.start()] + smt[m.end():]
+
+_END = ""   # trie key marking the end of an allowed registry
+
+
+def _build_trie(words):
+    root = {}
+    for w in words:
+        node = root
+        for ch in w:
+            node = node.setdefault(ch, {})
+        node[_END] = True
+    return root
+
+
+def _trie_regex(node):
+    """
+    Regular expression for the words below a trie node. Runs of nodes with
+    a single child collapse into one str.to_re literal, and siblings share
+    their common prefix, so the term grows with the number of distinct
+    branch points rather than with the total length of the list.
+    """
+    branches = []
+    for ch, child in sorted((k, v) for k, v in node.items() if k != _END):
+        label = ch
+        while len(child) == 1 and _END not in child:
+            (ch, child), = child.items()
+            label += ch
+        lit = f"(str.to_re {smt_string(label)})"
+        rest = _trie_regex(child)
+        branches.append(lit if rest == '(str.to_re "")' else f"(re.++ {lit} {rest})")
+    if _END in node:
+        if not branches:
+            return '(str.to_re "")'
+        return f"(re.opt {branches[0]})" if len(branches) == 1 else \
+            f"(re.opt (re.union {' '.join(branches)}))"
+    if not branches:
+        return "re.none"
+    return branches[0] if len(branches) == 1 else f"(re.union {' '.join(branches)})"
+
+
+def registry_terms(allowed, encoding="trie"):
     """
-    allowed = policy["allowed_registries"]
-    test_reg = policy["test_registry"]
-    prefix_bad = policy.get("prefix_bad", False)
+    SMT terms over `registry` for (exact membership, prefix rule) given
+    the allowed registries. "trie" shares prefixes in one regular
+    expression; "flat" is the plain disjunction over every entry.
+    """
+    if encoding == "flat":
+        exact = " ".join(f"(= registry {smt_string(r)})" for r in allowed)
+        prefix = " ".join(f"(str.prefixof {smt_string(r)} registry)" for r in allowed)
+        return f"(or {exact})", f"(or {prefix})"
+    regex = _trie_regex(_build_trie(str(r) for r in allowed))
+    return (f"(str.in_re registry {regex})",
+            f"(str.in_re registry (re.++ {regex} re.all))")
+
+
+# Preassembled scripts for each case; the builders only fill in values,
+# strings as smt_string literals.
+_REGISTRY_SMT = """\
+; SMT model for registry case
+(set-logic QF_S)
+(declare-fun registry () String)
+
+{pin}
+
+(define-fun allowed () Bool
+  {allowed})
+
+{prefix}
+; Security invariant: only exact matches allowed
+(assert (not allowed))
+
+(check-sat)
+(get-model)"""
+
+_WILDCARD_SMT = """\
+; SMT model for wildcard role-binding case
+(set-logic QF_S)
+(declare-fun kind () String)
+(declare-fun action () String)
+(declare-fun isAdmin () Bool)
+(declare-fun hasWildcard () Bool)
+
+(assert (= kind {kind}))
+(assert (= action {action}))
+{pins}
+
+; Invariant: non-admin + wildcard => forbidden
+(assert (and (not isAdmin) hasWildcard))
+
+(check-sat)
+(get-model)"""
+
+_TENANT_SMT = """\
+; SMT model for tenant isolation case
+(set-logic QF_S)
+(declare-fun subTenant () String)
+(declare-fun resTenant () String)
+
+(assert (= subTenant {subject}))
+(assert (= resTenant {resource}))
+
+; Invariant: cross-tenant must be forbidden
+(assert (not (= subTenant resTenant)))
+
+(check-sat)
+(get-model)"""
+
+_TENANT_INVENTORY_SMT = """\
+; SMT model for tenant inventory case
+; {count} namespaces, indices below {admins} are admins
+(set-logic QF_LIA)
+(declare-fun sub () Int)
+(declare-fun res () Int)
+(assert (and (<= 0 sub) (< sub {count}) (<= 0 res) (< res {count})))
+(define-fun granted () Bool {granted})
 
-    allowed_checks = " ".join(f'(= registry "{r}")' for r in allowed)
-    prefix_assert = f'(assert (str.prefixof "{allowed[0]}" registry))' if prefix_bad else ""
+; Invariant: only admins may reach another tenant's resources
+(assert granted)
+(assert (not (= sub res)))
+(assert (>= sub {admins}))
 
-    smt = dedent(f"""
-        ; SMT model for registry case: {policy.get('name')}
-        (set-logic QF_S)
-        (declare-fun registry () String)
+(check-sat)
+(get-model)"""
 
-        ; Constrain to our test_registry
-        (assert (= registry "{test_reg}"))
 
-        (define-fun allowed () Bool
-          (or {allowed_checks}))
+def _bool(value):
+    return "true" if value else "false"
 
-        {prefix_assert}
-        ; Security invariant: only exact matches allowed
-        (assert (not allowed))
 
-        (check-sat)
-        (get-model)
-    """).strip()
+def build_smt_for_registry(policy, encoding="trie"):
+    """
+    SMT for the 'registry' case:
+      - assert registry = test_registry
+      - (if prefix_bad) assert prefix-match against any allowed registry
+      - assert (not allowed) to find violations
+    Without a test_registry the model is symbolic: registry is left free
+    and must pass the admission rule (prefix-match if prefix_bad, else
+    exact match), so one query covers every candidate string.
+    See registry_terms for the `encoding` of the allowed list.
 
+    `policy` is a RegistryPolicy or a fixture dict; like every case
+    builder, the script is cached on the (interned) IR object.
+    """
+    ir = as_ir(policy, "registry")
+    if ir.smt is not None and encoding == "trie":
+        return ir.smt
+    allowed_term, prefix_term = registry_terms(ir.allowed, encoding)
+    prefix_assert = f"(assert {prefix_term})" if ir.prefix_bad else ""
+    if ir.test_registry is None:
+        pin = "; Symbolic: any registry admitted by the rule"
+        if not ir.prefix_bad:
+            prefix_assert = "(assert allowed)"
+    else:
+        pin = ("; Constrain to our test_registry\n"
+               f"(assert (= registry {smt_string(ir.test_registry)}))")
+    smt = _REGISTRY_SMT.format(pin=pin, allowed=allowed_term, prefix=prefix_assert)
+    if encoding == "trie":
+        ir.smt = smt
     return smt
 
 
 def build_smt_for_wildcard(policy):
     """
-    Given a dict with keys:
+    Given a WildcardPolicy or a dict with keys:
       - subject_is_admin: bool
       - resource_kind: string
       - action: string
@@ -55,57 +198,223 @@ def build_smt_for_wildcard(policy):
       isAdmin == subject_is_admin
       hasWildcard == wildcard_present
       then asserts (and (not isAdmin) hasWildcard) to test violation.
+    subject_is_admin or wildcard_present may be null (unknown, e.g. a
+    binding to a role missing from a cluster dump); that variable is
+    then left free.
     """
-    kind = policy["resource_kind"]
-    action = policy["action"]
-    is_admin = "true" if policy["subject_is_admin"] else "false"
-    has_wild = "true" if policy["wildcard_present"] else "false"
-
-    smt = dedent(f"""
-        ; SMT model for wildcard role-binding case: {policy.get('name')}
-        (set-logic QF_S)
-        (declare-fun kind () String)
-        (declare-fun action () String)
-        (declare-fun isAdmin () Bool)
-        (declare-fun hasWildcard () Bool)
-
-        (assert (= kind "{kind}"))
-        (assert (= action "{action}"))
-        (assert (= isAdmin {is_admin}))
-        (assert (= hasWildcard {has_wild}))
-
-        ; Invariant: non-admin + wildcard => forbidden
-        (assert (and (not isAdmin) hasWildcard))
-
-        (check-sat)
-        (get-model)
-    """).strip()
-    return smt
+    ir = as_ir(policy, "wildcard")
+    if ir.smt is None:
+        pins = [f"(assert (= {var} {_bool(value)}))"
+                for var, value in (("isAdmin", ir.is_admin),
+                                   ("hasWildcard", ir.wildcard_present))
+                if value is not None]
+        ir.smt = _WILDCARD_SMT.format(kind=smt_string(ir.resource_kind),
+                                      action=smt_string(ir.action),
+                                      pins="\n".join(pins))
+    return ir.smt
 
 
 def build_smt_for_tenant(policy):
     """
-    Given a dict with keys:
+    Given a TenantPolicy or a dict with keys:
       - subject_tenant: string
       - resource_tenant: string
     produce SMT-LIB to assert they differ, i.e. violation.
+    A fixture with a `namespaces` inventory instead checks every pair at
+    once (see build_smt_for_tenant_inventory).
     """
-    subj = policy["subject_tenant"]
-    res  = policy["resource_tenant"]
+    ir = as_ir(policy, "tenant")
+    if isinstance(ir, TenantInventory):
+        return build_smt_for_tenant_inventory(ir)
+    if ir.smt is None:
+        ir.smt = _TENANT_SMT.format(subject=smt_string(ir.subject_tenant),
+                                    resource=smt_string(ir.resource_tenant))
+    return ir.smt
 
-    smt = dedent(f"""
-        ; SMT model for tenant isolation case: {policy.get('name')}
-        (set-logic QF_S)
-        (declare-fun subTenant () String)
-        (declare-fun resTenant () String)
 
-        (assert (= subTenant "{subj}"))
-        (assert (= resTenant "{res}"))
+def _or_terms(terms):
+    return terms[0] if len(terms) == 1 else f"(or {' '.join(terms)})"
 
-        ; Invariant: cross-tenant must be forbidden
-        (assert (not (= subTenant resTenant)))
 
-        (check-sat)
-        (get-model)
-    """).strip()
-    return smt
+def _index_ranges(indices):
+    """Sorted ints -> [(lo, hi)] runs of consecutive values."""
+    runs = []
+    for i in indices:
+        if runs and runs[-1][1] == i - 1:
+            runs[-1][1] = i
+        else:
+            runs.append([i, i])
+    return runs
+
+
+def build_smt_for_tenant_inventory(policy):
+    """
+    Tenant isolation for a whole namespace inventory in one query. The
+    subject and resource tenants are symbolic indices into the inventory
+    (admins first, see TenantInventory), `granted` is the grant relation
+    and the violation is a grant from a non-admin to another tenant. Only
+    non-admin grants are encoded, as runs of consecutive indices, so the
+    script grows with the grants rather than with the number of pairs.
+    """
+    ir = as_ir(policy, "tenant")
+    if ir.smt is not None:
+        return ir.smt
+    terms = []
+    for sub, targets in ir.grants:
+        if sub < ir.admins:
+            continue
+        if targets is None:
+            terms.append(f"(= sub {sub})")
+            continue
+        runs = [f"(= res {lo})" if lo == hi else f"(and (<= {lo} res) (<= res {hi}))"
+                for lo, hi in _index_ranges([t for t in targets if t != sub])]
+        if runs:
+            terms.append(f"(and (= sub {sub}) {_or_terms(runs)})")
+    ir.smt = _TENANT_INVENTORY_SMT.format(count=len(ir.names), admins=ir.admins,
+                                          granted=_or_terms(terms) if terms else "false")
+    return ir.smt
+
+
+# Containment checks for --equivalence: each query is satisfiable exactly
+# when some request is allowed by one layer but denied by the other.
+EQUIVALENCE_QUERIES = (
+    ("ABAC⊂RBAC", "(and abac (not rbac))"),
+    ("RBAC⊂ABAC", "(and rbac (not abac))"),
+)
+
+
+def build_equivalence_base(policy):
+    """
+    The shared part of the equivalence model for one fixture (IR object
+    or dict, like the case builders): variable declarations plus `rbac`
+    (what the RBAC/admission layer allows) and `abac` (what the ABAC
+    policy allows). It depends only on the case and, for registries, the
+    allowlist, so many fixtures share one base.
+      - registry: rbac is the admission rule, a prefix match when
+        prefixBad holds and an exact match otherwise; abac is exact match
+      - wildcard: rbac grants whatever a wildcard or an admin role covers;
+        abac grants it to admins only
+      - tenant: rbac grants cluster-wide; abac only within the tenant
+    """
+    ir = as_ir(policy)
+    if ir.case == "registry":
+        exact, prefix = registry_terms(ir.allowed)
+        decls = "(declare-fun registry () String)\n(declare-fun prefixBad () Bool)"
+        rbac, abac = f"(ite prefixBad {prefix} {exact})", exact
+    elif ir.case == "wildcard":
+        decls = "\n".join(f"(declare-fun {v} () {sort})" for v, sort in (
+            ("kind", "String"), ("action", "String"),
+            ("isAdmin", "Bool"), ("hasWildcard", "Bool")))
+        rbac, abac = "(or isAdmin hasWildcard)", "isAdmin"
+    else:
+        decls = "(declare-fun subTenant () String)\n(declare-fun resTenant () String)"
+        rbac, abac = "true", "(= subTenant resTenant)"
+    return (f"; Equivalence model for {ir.case}\n(set-logic QF_S)\n{decls}\n"
+            f"(define-fun rbac () Bool {rbac})\n(define-fun abac () Bool {abac})")
+
+
+def _pins(values):
+    """Assertions fixing each (variable, str or bool value); None stays free."""
+    return "\n".join(
+        f"(assert (= {v} {smt_string(val) if isinstance(val, str) else _bool(val)}))"
+        for v, val in values if val is not None)
+
+
+def build_equivalence_pins(policy):
+    """Assertions fixing the variables a fixture gives values for."""
+    ir = as_ir(policy)
+    if isinstance(ir, RegistryPolicy):
+        pins = [("prefixBad", ir.prefix_bad), ("registry", ir.test_registry)]
+    elif isinstance(ir, WildcardPolicy):
+        pins = [("kind", ir.resource_kind), ("action", ir.action),
+                ("isAdmin", ir.is_admin), ("hasWildcard", ir.wildcard_present)]
+    elif isinstance(ir, TenantPolicy):
+        pins = [("subTenant", ir.subject_tenant), ("resTenant", ir.resource_tenant)]
+    else:
+        pins = []       # an inventory pins no pair, leaving both tenants free
+    return _pins(pins)
+
+
+_RESOURCE = "urn:oasis:names:tc:xacml:3.0:attribute-category:resource"
+_SUBJECT = "urn:oasis:names:tc:xacml:3.0:attribute-category:subject"
+
+
+def _xacml_attr(category, attribute_id, declared, decls, bag=False):
+    """Symbol for a request attribute, declaring it in `decls` if the
+    compiled policy set does not already."""
+    symbol = attribute_symbol(category, attribute_id)
+    if symbol not in declared:
+        decls.append(f"(declare-fun {symbol} ({'String' if bag else ''}) "
+                     f"{'Bool' if bag else 'String'})")
+    return symbol
+
+
+def build_xacml_query(policy, declared=()):
+    """
+    Map a fixture (IR object or dict) onto the request attributes of the
+    deployed XACML policies (see xacml_compiler). Returns (script, query):
+    the script declares and pins the case's variables and ties the
+    attributes to them; the query term holds when the fixture's violation
+    is still possible and the policy set permits it. `declared` lists the
+    attribute symbols the compiled policy set already declares.
+      - registry: a Pod whose image comes from `registry`
+      - wildcard: a <resource_kind>Binding; the role is cluster-admin
+        exactly when it has the wildcard, the subject is in system:masters
+        exactly when it is an admin
+      - tenant: the subject's and the resource's namespaces (left free
+        for an inventory fixture)
+    """
+    ir = as_ir(policy)
+    decls, lines = [], []
+    if ir.case == "registry":
+        allowed_term, prefix_term = registry_terms(ir.allowed)
+        lines += ["(declare-fun registry () String)",
+                  f"(define-fun allowed () Bool {allowed_term})",
+                  _pins([("registry", ir.test_registry)])]
+        if ir.prefix_bad:
+            lines.append(f"(assert {prefix_term})")
+        elif ir.test_registry is None:
+            lines.append("(assert allowed)")
+        kind = _xacml_attr(_RESOURCE, "urn:k8s:resource:kind", declared, decls)
+        image = _xacml_attr(_RESOURCE, "urn:k8s:resource:imageRegistry", declared, decls)
+        lines += [f'(assert (= {kind} "Pod"))', f"(assert (= {image} registry))"]
+        violation = "(not allowed)"
+    elif ir.case == "wildcard":
+        lines += ["(declare-fun isAdmin () Bool)", "(declare-fun hasWildcard () Bool)",
+                  _pins([("isAdmin", ir.is_admin), ("hasWildcard", ir.wildcard_present)])]
+        res_kind = _xacml_attr(_RESOURCE, "urn:k8s:resource:kind", declared, decls)
+        role = _xacml_attr(_RESOURCE, "urn:k8s:resource:roleRefName", declared, decls)
+        groups = _xacml_attr(_SUBJECT, "urn:k8s:subject:groups", declared, decls, bag=True)
+        lines += [_pins([(res_kind, ir.resource_kind + "Binding")]),
+                  f'(assert (= (= {role} "cluster-admin") hasWildcard))',
+                  f'(assert (= ({groups} "system:masters") isAdmin))']
+        violation = "(and (not isAdmin) hasWildcard)"
+    else:
+        res_ns = _xacml_attr(_RESOURCE, "urn:k8s:resource:namespace", declared, decls)
+        sub_ns = _xacml_attr(_SUBJECT, "urn:k8s:subject:namespace", declared, decls)
+        if isinstance(ir, TenantPolicy):
+            lines.append(_pins([(sub_ns, ir.subject_tenant), (res_ns, ir.resource_tenant)]))
+        violation = f"(not (= {sub_ns} {res_ns}))"
+    return "\n".join(decls + [line for line in lines if line]), \
+        f"(and {violation} xacml.permit)"
+
+
+def build_smt_batch(scripts, timeout_ms=None):
+    """
+    Combine single-fixture scripts from the build_smt_for_* functions
+    (normally all of one case) into one SMT-LIB script:
+      - the first script's (set-logic) is issued once
+      - each fixture runs in its own (push) ... (pop) scope, so its
+        (check-sat)/(get-model) only see its own assertions
+      - BATCH_MARKER is echoed after every fixture
+    With timeout_ms, each (check-sat) gives up with `unknown` instead of
+    stalling the rest of the batch.
+    """
+    logic = split_logic(scripts[0])[0] if scripts else ""
+    parts = [logic] if logic else []
+    if timeout_ms:
+        parts.append(f"(set-option :timeout {int(timeout_ms)})")
+    for smt in scripts:
+        parts += ["(push)", split_logic(smt)[1].strip(), "(pop)",
+                  f'(echo "{BATCH_MARKER}")']
+    return "\n".join(parts)
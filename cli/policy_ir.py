@@ -0,0 +1,186 @@
+# cli/policy_ir.py
+
+"""
+Typed intermediate representation of fixtures.
+
+Each case is a small __slots__ class holding only the values its model
+depends on, normalised (tuples, plain str/bool/int) and validated once
+against schema.py. The fixture's `name` is not part of it. Two fixtures
+with the same values are the same policy, and from_fixture() interns
+them so they share one object. They also share the SMT text that
+model_builder caches on that object, so verify_policies can recognise
+them and solve them once.
+"""
+import sys
+
+from schema import SchemaError, validate
+
+
+def _str(value):
+    return None if value is None else sys.intern(value)
+
+
+class PolicyIR:
+    """Base class: equality and hashing by (case, field values)."""
+    __slots__ = ("smt", "_key", "_hash")
+    case = None
+    fields = ()
+
+    def _seal(self):
+        self.smt = None         # filled in by model_builder on first build
+        self._key = (self.case,) + tuple(getattr(self, f) for f in self.fields)
+        self._hash = hash(self._key)
+
+    def __eq__(self, other):
+        return type(other) is type(self) and other._key == self._key
+
+    def __hash__(self):
+        return self._hash
+
+    def __repr__(self):
+        values = ", ".join(f"{f}={getattr(self, f)!r}" for f in self.fields)
+        return f"{type(self).__name__}({values})"
+
+    def free_variables(self):
+        """
+        Names of the SMT variables the policy leaves unconstrained; these
+        are what distinguishes one counterexample from another.
+        """
+        return []
+
+    def decode(self, assignment):
+        """A counterexample's (variable, value) pairs in fixture terms."""
+        return assignment
+
+
+class RegistryPolicy(PolicyIR):
+    __slots__ = ("allowed", "test_registry", "prefix_bad")
+    case = "registry"
+    fields = __slots__
+
+    def __init__(self, allowed, test_registry=None, prefix_bad=False):
+        self.allowed = tuple(map(_str, allowed))
+        self.test_registry = _str(test_registry)
+        self.prefix_bad = bool(prefix_bad)
+        self._seal()
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d["allowed_registries"], d.get("test_registry"), d.get("prefix_bad", False))
+
+    def free_variables(self):
+        return ["registry"] if self.test_registry is None else []
+
+
+class WildcardPolicy(PolicyIR):
+    """is_admin and wildcard_present may be None: unknown, left free."""
+    __slots__ = ("resource_kind", "action", "is_admin", "wildcard_present")
+    case = "wildcard"
+    fields = __slots__
+
+    def __init__(self, resource_kind, action, is_admin, wildcard_present):
+        self.resource_kind = _str(resource_kind)
+        self.action = _str(action)
+        self.is_admin = is_admin
+        self.wildcard_present = wildcard_present
+        self._seal()
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d["resource_kind"], d["action"], d["subject_is_admin"], d["wildcard_present"])
+
+    def free_variables(self):
+        return [var for var, value in (("isAdmin", self.is_admin),
+                                       ("hasWildcard", self.wildcard_present))
+                if value is None]
+
+
+class TenantPolicy(PolicyIR):
+    __slots__ = ("subject_tenant", "resource_tenant")
+    case = "tenant"
+    fields = __slots__
+
+    def __init__(self, subject_tenant, resource_tenant):
+        self.subject_tenant = _str(subject_tenant)
+        self.resource_tenant = _str(resource_tenant)
+        self._seal()
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d["subject_tenant"], d["resource_tenant"])
+
+
+class TenantInventory(PolicyIR):
+    """
+    A tenant fixture over a namespace inventory:
+      - names: the namespaces, admins first, so "is an admin" is the
+        index comparison `index < admins`
+      - admins: how many of the names are admins
+      - grants: ((subject index, sorted resource indices or None for
+        "*"), ...) in subject order
+    """
+    __slots__ = ("names", "admins", "grants")
+    case = "tenant"
+    fields = __slots__
+
+    def __init__(self, names, admins, grants):
+        self.names = tuple(map(_str, names))
+        self.admins = admins
+        self.grants = tuple(grants)
+        self._seal()
+
+    @classmethod
+    def from_dict(cls, d):
+        namespaces = d["namespaces"]
+        admins = set(d.get("admins") or [])
+        if len(set(namespaces)) != len(namespaces):
+            raise SchemaError("duplicate namespace in inventory")
+        if admins - set(namespaces):
+            raise SchemaError(f"admins not in namespaces: {sorted(admins - set(namespaces))}")
+        names = sorted(admins) + sorted(set(namespaces) - admins)
+        index = {name: i for i, name in enumerate(names)}
+        grants = {}
+        for sub, targets in d["grants"].items():
+            targets = targets or []
+            unknown = [t for t in [sub] + targets if t != "*" and t not in index]
+            if unknown:
+                raise SchemaError(f"grant names namespaces not in the inventory: {unknown}")
+            grants[index[sub]] = (None if "*" in targets
+                                  else tuple(sorted({index[t] for t in targets})))
+        return cls(names, len(admins), sorted(grants.items()))
+
+    def free_variables(self):
+        return ["sub", "res"]
+
+    def decode(self, assignment):
+        """Namespace indices become their (quoted) names."""
+        return [(var, f'"{self.names[int(val)]}"') for var, val in assignment]
+
+
+CLASSES = {
+    "registry": RegistryPolicy,
+    "wildcard": WildcardPolicy,
+    "tenant": TenantPolicy,
+    "tenant-inventory": TenantInventory,
+}
+
+# Interned IR objects; cleared when it grows past _INTERN_MAX so a long
+# --watch session or server does not keep every edit alive.
+_INTERNED = {}
+_INTERN_MAX = 1 << 16
+
+
+def from_fixture(doc, case=None):
+    """
+    Validate a fixture document (of `case`, default its own) and return
+    its interned IR object. Raises SchemaError for malformed fixtures.
+    """
+    ir = CLASSES[validate(doc, case)].from_dict(doc)
+    if len(_INTERNED) >= _INTERN_MAX:
+        _INTERNED.clear()
+    return _INTERNED.setdefault(ir, ir)
+
+
+def as_ir(policy, case=None):
+    """`policy` as IR: IR objects pass through, dicts go through from_fixture."""
+    return policy if isinstance(policy, PolicyIR) else from_fixture(policy, case)
@@ -0,0 +1,192 @@
+# cli/rbac_index.py
+
+"""
+Indexes over exported cluster RBAC state, for scanning whole clusters
+for non-admin subjects that reach wildcard permissions.
+
+Input is what `kubectl get roles,clusterroles,rolebindings,
+clusterrolebindings -A -o yaml` (or `-o json`) prints: a `kind: List`
+of objects, or any stream of such objects. RbacIndex keeps
+  - roles:            (kind, namespace, name) -> rules
+  - wildcard_roles:   the subset of roles with a `*` verb or resource
+  - bindings_by_role: role key -> [Binding]
+  - by_subject:       (kind, namespace, name) -> [Binding]
+so a scan only ever looks at bindings whose role has a wildcard rule (or
+is missing from the dump), never at the rest of the cluster. A field of
+the wrong type (e.g. `items` or `rules` that is not a list) raises
+ValueError naming the dump.
+"""
+import json
+from collections import defaultdict
+
+import yaml
+
+# libyaml's parser is several times faster on large dumps when available
+_Loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+ROLE_KINDS = ("Role", "ClusterRole")
+BINDING_KINDS = ("RoleBinding", "ClusterRoleBinding")
+DEFAULT_ADMIN_GROUPS = ("system:masters",)
+
+
+def _field(obj, key, kind):
+    """obj[key], or an empty `kind` if missing or null; ValueError if not a `kind`."""
+    value = obj.get(key)
+    if value is None:
+        return kind()
+    if not isinstance(value, kind):
+        expected = "mapping" if kind is dict else kind.__name__
+        raise ValueError(f"{obj.get('kind') or 'object'} field {key!r} must be a "
+                         f"{expected}, got {type(value).__name__}")
+    return value
+
+
+def iter_objects(path):
+    """Yield the Kubernetes objects in a YAML or JSON dump, flattening Lists."""
+    with open(path) as f:
+        if str(path).endswith(".json"):
+            docs = [json.load(f)]
+        else:
+            docs = yaml.load_all(f, Loader=_Loader)
+        for doc in docs:
+            if not isinstance(doc, dict):
+                continue
+            kind = doc.get("kind") or ""
+            if not isinstance(kind, str):
+                raise ValueError(f"{path}: kind must be a string, got {type(kind).__name__}")
+            if kind.endswith("List") and "items" in doc:
+                try:
+                    items = _field(doc, "items", list)
+                except ValueError as e:
+                    raise ValueError(f"{path}: {e}") from None
+                yield from (item for item in items if isinstance(item, dict))
+            else:
+                yield doc
+
+
+def wildcard_rules(rules):
+    """The rules granting `*` verbs or resources, as (verbs, resources)."""
+    found = []
+    for rule in rules or []:
+        verbs = rule.get("verbs") or []
+        resources = rule.get("resources") or []
+        if "*" in verbs or "*" in resources:
+            found.append((verbs, resources))
+    return found
+
+
+def subject_key(subject, namespace=None):
+    """(kind, namespace, name); only ServiceAccounts are namespaced."""
+    kind = subject.get("kind", "")
+    ns = (subject.get("namespace") or namespace) if kind == "ServiceAccount" else None
+    return kind, ns, subject.get("name", "")
+
+
+def format_subject(key):
+    kind, ns, name = key
+    return f"{kind} {ns}/{name}" if ns else f"{kind} {name}"
+
+
+class Binding:
+    __slots__ = ("kind", "namespace", "name", "role", "subjects")
+
+    def __init__(self, kind, namespace, name, role, subjects):
+        self.kind = kind
+        self.namespace = namespace
+        self.name = name
+        self.role = role
+        self.subjects = subjects
+
+    def scope(self):
+        return f"namespace {self.namespace}" if self.namespace else "cluster-wide"
+
+
+class RbacIndex:
+    """
+    Role and binding indexes for one cluster. `admin_groups` and `admins`
+    (subject keys) decide who is an admin; Users outside both are
+    unknown, since group membership of Users is not part of RBAC state.
+    """
+    def __init__(self, admin_groups=DEFAULT_ADMIN_GROUPS, admins=()):
+        self.admin_groups = set(admin_groups)
+        self.admins = set(admins)
+        self.roles = {}
+        self.wildcard_roles = {}
+        self.bindings_by_role = defaultdict(list)
+        self.by_subject = defaultdict(list)
+        self.objects = 0
+
+    def add(self, obj):
+        kind = obj.get("kind")
+        meta = _field(obj, "metadata", dict)
+        ns = meta.get("namespace") if kind in ("Role", "RoleBinding") else None
+        name = meta.get("name", "")
+        if kind in ROLE_KINDS:
+            key = (kind, ns, name)
+            self.roles[key] = _field(obj, "rules", list)
+            if not all(isinstance(rule, dict) for rule in self.roles[key]):
+                raise ValueError(f"{kind} {name}: every rule must be a mapping")
+            wild = wildcard_rules(self.roles[key])
+            if wild:
+                self.wildcard_roles[key] = wild
+        elif kind in BINDING_KINDS:
+            ref = _field(obj, "roleRef", dict)
+            ref_kind = ref.get("kind", "ClusterRole")
+            role = (ref_kind, ns if ref_kind == "Role" else None, ref.get("name", ""))
+            subjects = _field(obj, "subjects", list)
+            if not all(isinstance(s, dict) for s in subjects):
+                raise ValueError(f"{kind} {name}: every subject must be a mapping")
+            subjects = [subject_key(s, ns) for s in subjects]
+            binding = Binding(kind, ns, name, role, subjects)
+            self.bindings_by_role[role].append(binding)
+            for subject in subjects:
+                self.by_subject[subject].append(binding)
+        else:
+            return
+        self.objects += 1
+
+    def load(self, path):
+        for obj in iter_objects(path):
+            try:
+                self.add(obj)
+            except ValueError as e:
+                raise ValueError(f"{path}: {e}") from None
+        return self
+
+    def is_admin(self, subject):
+        """True, False, or None when RBAC state cannot tell."""
+        kind, _, name = subject
+        if subject in self.admins or (kind == "Group" and name in self.admin_groups):
+            return True
+        if kind == "User":
+            return None
+        return False
+
+    def rules_for(self, subject):
+        """[(binding, role key, rules or None if the role is missing)]."""
+        return [(b, b.role, self.roles.get(b.role)) for b in self.by_subject.get(subject, [])]
+
+    def candidates(self):
+        """
+        Yield (subject, binding, wildcard_present) for every subject bound
+        to a wildcard role or to a role missing from the dump (for which
+        wildcard_present is None). Bindings to known roles without a
+        wildcard rule are never visited.
+        """
+        roles = [(r, True) for r in self.wildcard_roles]
+        roles += [(r, None) for r in self.bindings_by_role if r not in self.roles]
+        for role, present in roles:
+            for binding in self.bindings_by_role.get(role, ()):
+                for subject in binding.subjects:
+                    yield subject, binding, present
+
+    def fixture(self, subject, binding, wildcard_present):
+        """The candidate as a `case: wildcard` fixture for the SMT layer."""
+        return {
+            "name": f"{format_subject(subject)} via {binding.kind} {binding.name}",
+            "case": "wildcard",
+            "resource_kind": binding.role[0],
+            "action": "bind",
+            "subject_is_admin": self.is_admin(subject),
+            "wildcard_present": wildcard_present,
+        }
@@ -0,0 +1,108 @@
+# cli/result_cache.py
+
+"""
+Content-addressed on-disk cache of solver verdicts.
+
+Entries are keyed by sha256(solver identity + SMT text), so any change to
+a fixture, to the model builders or to the z3 version yields a new key.
+Each entry is a small JSON file written to a temp name and os.replace()d
+into place, which keeps readers from ever seeing a partial entry and lets
+several processes (parallel CI jobs, --jobs workers) share one directory.
+"""
+import hashlib
+import itertools
+import json
+import os
+import tempfile
+from pathlib import Path
+
+
+def default_cache_dir():
+    base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "k8s-abac-verify"
+
+
+class ResultCache:
+    """
+    (sat, model) store bounded to roughly `max_bytes` on disk.
+    Hits refresh the entry's mtime; eviction drops least recently used
+    entries until the cache is back under 90% of the bound. The fixture
+    bundles in bundles/ (see fixture_bundle.py) count towards the bound
+    and are evicted the same way.
+    """
+    def __init__(self, root=None, max_bytes=256 * 1024 * 1024):
+        self.root = Path(root) if root else default_cache_dir()
+        self.max_bytes = max_bytes
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._size = None
+
+    @staticmethod
+    def key(smt_code, solver_id):
+        """
+        Digest of the solver identity and the SMT text. Comment lines are
+        left out, so fixtures differing only in `name` share an entry.
+        """
+        h = hashlib.sha256()
+        h.update(solver_id.encode())
+        for line in smt_code.splitlines():
+            if not line.lstrip().startswith(";"):
+                h.update(b"\n" + line.encode())
+        return h.hexdigest()
+
+    def _path(self, key):
+        return self.root / key[:2] / (key[2:] + ".json")
+
+    def get(self, key):
+        """Return the cached (sat, model) for key, or None on a miss."""
+        path = self._path(key)
+        try:
+            entry = json.loads(path.read_text())
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return entry["sat"], entry["model"]
+
+    def put(self, key, sat, model):
+        """Store a verdict. Cache I/O problems are never fatal."""
+        path = self._path(key)
+        data = json.dumps({"sat": sat, "model": model})
+        try:
+            path.parent.mkdir(exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            with os.fdopen(fd, "w") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except OSError:
+            return
+        if self._size is None:
+            self._size = self._scan_size()
+        self._size += len(data)
+        if self._size > self.max_bytes:
+            self.evict()
+
+    def _entries(self):
+        for path in itertools.chain(self.root.glob("??/*.json"),
+                                    self.root.glob("bundles/*.bundle")):
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue   # evicted by a concurrent process
+            yield st.st_mtime, st.st_size, path
+
+    def _scan_size(self):
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self):
+        """Drop least recently used entries down to 90% of max_bytes."""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * 0.9
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            total -= size
+        self._size = total
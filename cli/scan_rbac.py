@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# cli/scan_rbac.py
+
+"""
+Scan exported cluster RBAC state for non-admin subjects that reach
+wildcard (`*`) verbs or resources.
+
+    kubectl get roles,clusterroles,rolebindings,clusterrolebindings -A -o yaml > rbac.yaml
+    python scan_rbac.py rbac.yaml
+
+The dump is indexed (see rbac_index.py) and only bindings to wildcard
+roles, or to roles missing from the dump, become candidates. Candidates
+whose subject and role are fully known are decided by the fast path;
+the rest (Users, whose group membership RBAC does not record, and
+missing roles) go to the wildcard SMT model with the unknown attribute
+left free. Identical candidate models are solved once.
+
+Exit status is 1 if any VIOLATION, POSSIBLE or UNKNOWN finding is
+reported.
+"""
+import argparse
+import json
+import sys
+import time
+
+import yaml
+
+from evaluator import evaluate
+from model_builder import build_smt_for_wildcard
+from rbac_index import DEFAULT_ADMIN_GROUPS, RbacIndex, format_subject
+from solver_interface import SOLVER_BACKENDS, make_solver
+
+
+def parse_subject(text):
+    """'ServiceAccount:team-a/attacker-sa' or 'User:alice' -> subject key."""
+    kind, _, rest = text.partition(":")
+    ns, _, name = rest.rpartition("/")
+    return kind, (ns or None) if kind == "ServiceAccount" else None, name
+
+
+def describe(index, binding):
+    rules = index.wildcard_roles.get(binding.role)
+    kind, ns, name = binding.role
+    role = f"{kind} {ns}/{name}" if ns else f"{kind} {name}"
+    if rules is None:
+        return f"{role} (missing from the dump)"
+    grants = "; ".join(f"verbs={','.join(v)} resources={','.join(r)}" for v, r in rules)
+    return f"{role} [{grants}]"
+
+
+def scan(index, solver, solved):
+    """
+    Yield (verdict, subject, binding, model) for each candidate that
+    violates the invariant: verdict is "VIOLATION" when the index decided
+    it and "POSSIBLE" when the solver found a counterexample for a
+    candidate with unknown attributes; "UNKNOWN" (with the error in
+    place of the model) when the solver failed. Solver results are
+    memoised in `solved`, keyed by the attributes the model depends on.
+    """
+    for subject, binding, present in index.candidates():
+        fx = index.fixture(subject, binding, present)
+        result = evaluate("wildcard", fx)
+        verdict = "VIOLATION"
+        if result is None:
+            key = (fx["resource_kind"], fx["subject_is_admin"], present)
+            if key not in solved:
+                try:
+                    solved[key] = solver.check(build_smt_for_wildcard(fx))
+                except RuntimeError as e:
+                    solved[key] = e
+            result, verdict = solved[key], "POSSIBLE"
+        if isinstance(result, RuntimeError):
+            yield "UNKNOWN", subject, binding, str(result)
+        elif result[0]:
+            yield verdict, subject, binding, result[1]
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    p.add_argument("dumps", nargs="+", help="kubectl -o yaml/json RBAC dumps")
+    p.add_argument("--admin-group", action="append", default=None, metavar="GROUP",
+                   help="Group whose members are admins (repeatable; default: "
+                        + ", ".join(DEFAULT_ADMIN_GROUPS) + ")")
+    p.add_argument("--admin", action="append", default=[], metavar="KIND:[NS/]NAME",
+                   help="Subject to treat as an admin, e.g. User:alice or "
+                        "ServiceAccount:kube-system/ci (repeatable)")
+    p.add_argument("--subject", metavar="KIND:[NS/]NAME",
+                   help="Only list the roles and rules bound to this subject")
+    p.add_argument("--json", action="store_true", help="Print findings as JSON Lines")
+    p.add_argument("--verbose", "-v", action="store_true",
+                   help="Print the solver model of POSSIBLE findings")
+    p.add_argument("--solver", choices=sorted(SOLVER_BACKENDS), default="session")
+    p.add_argument("--z3", default="z3", help="Path to the z3 binary")
+    args = p.parse_args()
+
+    t0 = time.perf_counter()
+    index = RbacIndex(args.admin_group or DEFAULT_ADMIN_GROUPS,
+                      [parse_subject(a) for a in args.admin])
+    try:
+        for dump in args.dumps:
+            index.load(dump)
+    except (OSError, ValueError, yaml.YAMLError) as e:
+        print(f"REJECTED: cannot read RBAC dump ({e})", file=sys.stderr)
+        sys.exit(1)
+    t1 = time.perf_counter()
+
+    if args.subject:
+        subject = parse_subject(args.subject)
+        for binding, role, rules in index.rules_for(subject):
+            print(f"{binding.kind} {binding.name} ({binding.scope()}) -> {role[0]} {role[2]}")
+            for rule in rules if rules is not None else []:
+                print(f"  {json.dumps(rule, sort_keys=True)}")
+            if rules is None:
+                print("  (role missing from the dump)")
+        sys.exit(0)
+
+    counts = {"VIOLATION": 0, "POSSIBLE": 0, "UNKNOWN": 0}
+    solved = {}
+    with make_solver(args.solver, args.z3) as solver:
+        for verdict, subject, binding, model in scan(index, solver, solved):
+            counts[verdict] += 1
+            if args.json:
+                print(json.dumps({"verdict": verdict, "subject": format_subject(subject),
+                                  "binding": f"{binding.kind} {binding.name}",
+                                  "scope": binding.scope(), "role": list(binding.role)}))
+                continue
+            print(f"{verdict}: {format_subject(subject)} reaches {describe(index, binding)} "
+                  f"via {binding.kind} {binding.name} ({binding.scope()})")
+            if verdict == "UNKNOWN" or (verdict == "POSSIBLE" and args.verbose):
+                print(model)
+    t2 = time.perf_counter()
+    print(f"Indexed {index.objects} objects ({len(index.roles)} roles, "
+          f"{sum(map(len, index.bindings_by_role.values()))} bindings) in {t1 - t0:.2f}s; "
+          f"scanned {len(index.wildcard_roles)} wildcard role(s) in {t2 - t1:.2f}s: "
+          f"{counts['VIOLATION']} violation(s), {counts['POSSIBLE']} possible, "
+          f"{counts['UNKNOWN']} unknown, "
+          f"{len(solved)} solver quer{'y' if len(solved) == 1 else 'ies'}",
+          file=sys.stderr)
+    sys.exit(1 if any(counts.values()) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# cli/schema.py
+
+"""
+Per-case schemas for fixture documents.
+
+validate() is the gate every fixture passes before a model is built, so
+a wrongly typed field (e.g. allowed_registries given as a string) is
+rejected instead of being silently iterated character by character.
+Every problem, including a missing required key, raises SchemaError.
+"""
+
+
+class SchemaError(ValueError):
+    """A fixture does not match its case's schema."""
+
+
+def _str(value):
+    return isinstance(value, str)
+
+
+def _bool(value):
+    return isinstance(value, bool)
+
+
+def _str_list(value):
+    return isinstance(value, list) and all(isinstance(v, str) for v in value)
+
+
+def _grants(value):
+    return isinstance(value, dict) and all(
+        isinstance(k, str) and (v is None or _str_list(v)) for k, v in value.items())
+
+
+def _optional(check):
+    return lambda value: value is None or check(value)
+
+
+# field -> (check, required, description of the expected type)
+SCHEMAS = {
+    "registry": {
+        "allowed_registries": (_str_list, True, "a list of strings"),
+        "test_registry": (_optional(_str), False, "a string or null"),
+        "prefix_bad": (_bool, False, "a boolean"),
+    },
+    "wildcard": {
+        "resource_kind": (_str, True, "a string"),
+        "action": (_str, True, "a string"),
+        "subject_is_admin": (_optional(_bool), True, "a boolean or null"),
+        "wildcard_present": (_optional(_bool), True, "a boolean or null"),
+    },
+    "tenant": {
+        "subject_tenant": (_str, True, "a string"),
+        "resource_tenant": (_str, True, "a string"),
+    },
+    # a tenant fixture with a `namespaces` inventory
+    "tenant-inventory": {
+        "namespaces": (_str_list, True, "a list of strings"),
+        "admins": (_optional(_str_list), False, "a list of strings"),
+        "grants": (_grants, True, "a mapping of namespace to a list of strings"),
+    },
+}
+
+
+def schema_name(doc, case=None):
+    """The SCHEMAS entry for a document of `case` (default: its own)."""
+    case = case or doc.get("case")
+    if case == "tenant" and "namespaces" in doc:
+        return "tenant-inventory"
+    if case not in SCHEMAS:
+        raise SchemaError("Unknown case in fixture: " + repr(case))
+    return case
+
+
+def validate(doc, case=None):
+    """
+    Check one fixture document against the schema of `case` (default:
+    the document's own `case`); returns the schema name.
+    """
+    if not isinstance(doc, dict):
+        raise SchemaError(f"expected a mapping, got {type(doc).__name__}")
+    name = schema_name(doc, case)
+    for field, (check, required, expected) in SCHEMAS[name].items():
+        if field not in doc:
+            if required:
+                raise SchemaError(f"missing key {field!r}")
+            continue
+        if not check(doc[field]):
+            raise SchemaError(f"{field} must be {expected}, "
+                              f"got {type(doc[field]).__name__}")
+    return name
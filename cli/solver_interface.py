@@ -1,33 +1,641 @@
+import functools
+import os
+import re
+import selectors
+import shutil
+import signal
 import subprocess
 import tempfile
-import os
+import time
+
+from model_builder import BATCH_MARKER, build_smt_batch, split_logic
+from stats import parse_statistics
+
+# Marker echoed after every query so the session knows where z3's answer ends.
+SENTINEL = "@@k8s-abac-end-of-query"
+
+# Separates a query's answer from the (get-info :all-statistics) after it.
+STATS_MARKER = "@@k8s-abac-statistics"
+STATS_QUERY = f'\n(echo "{STATS_MARKER}")\n(get-info :all-statistics)'
+
+# Asked after every session query: why z3 answered unknown, if it did.
+REASON_QUERY = "\n(get-info :reason-unknown)"
+_REASON = re.compile(r'\(:reason-unknown\s+"([^"]*)"\)$')
+_CANCELED = re.compile(r'\(error ".*canceled"\)$')
+
+_CHECK_TAIL = re.compile(r"\(check-sat\)\s*\(get-model\)\s*$")
+
+# Lexemes whose content may contain parentheses: string literals, quoted
+# symbols and comments.
+_LEXEME = re.compile(r'"(?:[^"]|"")*"|\|[^|]*\||;[^\n]*')
+
+
+class SolverUnknown(RuntimeError):
+    """The solver gave up: `unknown`, a resource limit, or a timeout."""
+
+
+class MalformedScript(RuntimeError):
+    """A script z3 could never finish reading; it is not sent."""
+
+
+def script_error(script):
+    """
+    MalformedScript if z3 would still be waiting for input at the end of
+    `script` (an unterminated string literal or quoted symbol, or an
+    unclosed parenthesis), else None. Sent to a z3 -in session, such a
+    script would swallow the echoed sentinel and stall until the timeout;
+    in a batch, every fixture after it.
+    """
+    rest = _LEXEME.sub(" ", script)
+    if '"' in rest:
+        return MalformedScript("malformed SMT script: unterminated string literal")
+    if "|" in rest:
+        return MalformedScript("malformed SMT script: unterminated quoted symbol")
+    if rest.count("(") > rest.count(")"):
+        return MalformedScript("malformed SMT script: unbalanced parentheses")
+    return None
+
+
+def _solve_well_formed(scripts, solve_batch):
+    """
+    solve_batch() on the scripts z3 can read to the end; each of the
+    others gets its own MalformedScript, so it fails alone instead of
+    taking the rest of the batch with it.
+    """
+    errors = [script_error(smt) for smt in scripts]
+    good = [smt for smt, e in zip(scripts, errors) if e is None]
+    solved = iter(solve_batch(good) if good else [])
+    return [next(solved) if e is None else e for e in errors]
+
 
-def run_smt(smt_code, z3_path="z3"):
+def _interpret(lines, raw):
+    """
+    Turn z3's output lines for one (check-sat)(get-model) query into
+    (sat:bool, model:str or None). Raises SolverUnknown for `unknown` and
+    RuntimeError on anything else.
+    """
+    if not lines:
+        raise RuntimeError("Z3 returned no output; output: " + raw)
+
+    result = lines[0]
+    if result == "sat":
+        return True, "\n".join(lines[1:])
+    elif result == "unsat":
+        return False, None
+    elif result == "unknown":
+        raise SolverUnknown("solver returned unknown")
+    else:
+        raise RuntimeError(f"Unexpected Z3 result: {result}\nFull output:\n{raw}")
+
+
+def _z3_command(z3_path, *args, rlimit=0):
+    """argv for z3 with an optional per-query resource limit."""
+    return [z3_path, *args] + ([f"rlimit={rlimit}"] if rlimit else [])
+
+
+def _parse_answer(raw):
+    """_interpret one query's raw output, ignoring the error z3 prints
+    for (get-model) after unsat, the errors for commands cancelled by an
+    exhausted resource limit, and folding an answer to REASON_QUERY into
+    the SolverUnknown message."""
+    lines = [line for line in raw.strip().splitlines()
+             if not _CANCELED.match(line)]
+    reason = _REASON.match(lines[-1]) if lines else None
+    if reason:
+        lines.pop()
+    if lines and lines[0] == "unsat":
+        lines = lines[:1]
+    try:
+        return _interpret(lines, raw)
+    except SolverUnknown as e:
+        if reason and reason.group(1):
+            raise SolverUnknown(f"{e} ({reason.group(1)})") from None
+        raise
+
+
+def parse_batch_output(raw, count):
+    """
+    Split the output of a build_smt_batch script into per-fixture results.
+    Each item is (sat, model) or the RuntimeError for that fixture alone;
+    fixtures the solver never reached (crash, timeout) get an error too.
+    """
+    chunks = raw.split(BATCH_MARKER + "\n")
+    results = []
+    for i in range(count):
+        if i >= len(chunks) - 1:
+            results.append(SolverUnknown("Z3 produced no result for this "
+                                         "fixture (batch aborted)"))
+            continue
+        try:
+            results.append(_parse_answer(chunks[i]))
+        except RuntimeError as e:
+            results.append(e)
+    return results
+
+
+def run_smt_batch(scripts, z3_path="z3", timeout=10, rlimit=0):
+    """
+    Solve many single-fixture scripts with one `z3` invocation.
+    Returns one (sat, model) or RuntimeError per script, in order.
+    """
+    return _solve_well_formed(scripts, functools.partial(
+        _run_smt_batch, z3_path=z3_path, timeout=timeout, rlimit=rlimit))
+
+
+def _run_smt_batch(scripts, z3_path, timeout, rlimit):
+    batch = build_smt_batch(scripts, timeout_ms=timeout * 1000)
+    with tempfile.NamedTemporaryFile("w", suffix=".smt2", delete=False) as f:
+        f.write(batch)
+        fname = f.name
+
+    try:
+        proc = subprocess.run(_z3_command(z3_path, "-smt2", fname, rlimit=rlimit),
+                              stdout=subprocess.PIPE,
+                              stderr=subprocess.PIPE,
+                              text=True,
+                              timeout=timeout * len(scripts) + 1)
+        out = proc.stdout
+    except subprocess.TimeoutExpired as e:
+        out = e.stdout or ""
+        if isinstance(out, bytes):
+            out = out.decode(errors="replace")
+    finally:
+        os.unlink(fname)
+    return parse_batch_output(out, len(scripts))
+
+
+@functools.lru_cache(maxsize=None)
+def solver_identity(z3_path="z3"):
+    """
+    Version string of the z3 binary, e.g. "Z3 version 4.12.2 - 64 bit".
+    Used to key cached verdicts so a solver upgrade invalidates them.
+    """
+    proc = subprocess.run([z3_path, "--version"], stdout=subprocess.PIPE,
+                          stderr=subprocess.STDOUT, text=True, timeout=10)
+    return proc.stdout.strip()
+
+
+def _split_statistics(raw, statistics):
+    """Strip the statistics block off raw output, parsing it into the
+    `statistics` dict when one is given."""
+    if statistics is None:
+        return raw
+    raw, _, tail = raw.partition(STATS_MARKER + "\n")
+    statistics.update(parse_statistics(tail))
+    return raw
+
+
+def run_smt(smt_code, z3_path="z3", statistics=None, timeout=10, rlimit=0):
     """
     Write smt_code to a temp file, call `z3 -smt2 temp.smt2`, capture output.
-    Returns (sat:bool, model:str or None).
+    Returns (sat:bool, model:str or None). If `statistics` is a dict, z3's
+    :all-statistics for the query are stored in it. `timeout` is in
+    seconds; `rlimit` caps z3's deterministic resource count (0: none).
     """
     with tempfile.NamedTemporaryFile("w", suffix=".smt2", delete=False) as f:
-        f.write(smt_code)
+        f.write(smt_code + REASON_QUERY)
+        if statistics is not None:
+            f.write(STATS_QUERY)
         fname = f.name
 
     try:
-        proc = subprocess.run([z3_path, "-smt2", fname],
+        proc = subprocess.run(_z3_command(z3_path, "-smt2", fname, rlimit=rlimit),
                               stdout=subprocess.PIPE,
                               stderr=subprocess.PIPE,
                               text=True,
-                              timeout=10)
+                              timeout=timeout)
+    except subprocess.TimeoutExpired:
+        raise SolverUnknown(f"Z3 timed out after {timeout:g}s")
     finally:
         os.unlink(fname)
 
-    out = proc.stdout.strip().splitlines()
-    if not out:
+    stdout = _split_statistics(proc.stdout, statistics)
+    if not stdout.strip():
         raise RuntimeError("Z3 returned no output; stderr: " + proc.stderr)
+    return _parse_answer(stdout)
 
-    result = out[0]
-    if result == "sat":
-        return True, "\n".join(out[1:])
-    elif result == "unsat":
-        return False, None
-    else:
-        raise RuntimeError(f"Unexpected Z3 result: {result}\nFull output:\n{proc.stdout}")
+
+class SubprocessSolver:
+    """
+    Fallback backend: one fresh `z3` process per query via run_smt.
+    Process start-up is part of every query, so spawn_time stays 0.
+    """
+    def __init__(self, z3_path="z3", timeout=10, rlimit=0):
+        self.z3_path = z3_path
+        self.timeout = timeout
+        self.rlimit = rlimit
+        self.statistics = False
+        self.last_statistics = {}
+        self.spawn_time = 0.0
+
+    @property
+    def identity(self):
+        return solver_identity(self.z3_path)
+
+    def check(self, smt_code):
+        self.last_statistics = {} if self.statistics else None
+        return run_smt(smt_code, self.z3_path, self.last_statistics,
+                       self.timeout, self.rlimit)
+
+    def check_batch(self, scripts):
+        return run_smt_batch(scripts, self.z3_path, self.timeout, self.rlimit)
+
+    def iter_models(self, smt_code, variables, limit=None):
+        # Enumeration needs a conversation with z3; use a throwaway session.
+        with SolverSession(self.z3_path, self.timeout, self.rlimit) as session:
+            yield from session.iter_models(smt_code, variables, limit)
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class SolverSession:
+    """
+    Long-lived `z3 -in` process driven over a pipe. Every query is wrapped
+    in (push)/(pop), so declarations never leak from one fixture into the
+    next, and answers are delimited by an echoed sentinel.
+
+    check() keeps the run_smt contract: (sat:bool, model:str or None),
+    SolverUnknown/RuntimeError otherwise. A query that exceeds `timeout`
+    seconds kills the process; the next query starts a new one. A script
+    that would never echo the sentinel (see script_error) is rejected with
+    MalformedScript before it is sent. `rlimit`
+    bounds z3's deterministic resource count per query.
+
+    With `statistics` set, check() also fetches z3's :all-statistics into
+    last_statistics; spawn_time accumulates time spent starting z3.
+
+    check_in_context() keeps a shared base formula asserted between calls
+    in an outer scope; any other query drops it first.
+    """
+    def __init__(self, z3_path="z3", timeout=10, rlimit=0):
+        self.z3_path = z3_path
+        self.timeout = timeout
+        self.rlimit = rlimit
+        self.statistics = False
+        self.last_statistics = {}
+        self.spawn_time = 0.0
+        self._stat_totals = {}
+        self._base = None
+        self._proc = None
+        self._sel = None
+        self._buf = b""
+
+    @property
+    def identity(self):
+        return solver_identity(self.z3_path)
+
+    def _start(self):
+        t = time.perf_counter()
+        self._proc = subprocess.Popen(_z3_command(self.z3_path, "-in", "-smt2",
+                                                  rlimit=self.rlimit),
+                                      stdin=subprocess.PIPE,
+                                      stdout=subprocess.PIPE,
+                                      stderr=subprocess.STDOUT)
+        self._sel = selectors.DefaultSelector()
+        self._sel.register(self._proc.stdout, selectors.EVENT_READ)
+        self._buf = b""
+        self._stat_totals = {}
+        self._base = None
+        self.spawn_time += time.perf_counter() - t
+
+    def _kill(self):
+        if self._proc is None:
+            return
+        self._sel.close()
+        try:
+            self._proc.kill()
+        except OSError:
+            pass
+        self._proc.wait()
+        try:
+            self._proc.stdin.close()
+        except OSError:
+            pass        # unflushed input to a z3 that already exited
+        self._proc.stdout.close()
+        self._proc = None
+
+    def _send(self, text):
+        self._proc.stdin.write(text.encode())
+        self._proc.stdin.flush()
+
+    def _read_answer(self, deadline):
+        """Read z3 output up to the next sentinel line; return it decoded."""
+        marker = (SENTINEL + "\n").encode()
+        fd = self._proc.stdout.fileno()
+        while True:
+            idx = self._buf.find(marker)
+            if idx >= 0:
+                answer = self._buf[:idx]
+                self._buf = self._buf[idx + len(marker):]
+                return answer.decode()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not self._sel.select(remaining):
+                self._kill()
+                raise SolverUnknown(f"Z3 timed out after {self.timeout:g}s")
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                raw = self._buf.decode(errors="replace")
+                self._kill()
+                raise RuntimeError("Z3 process exited unexpectedly; output: " + raw)
+            self._buf += chunk
+
+    def query(self, script, timeout=None):
+        """
+        Send raw SMT-LIB commands (already scoped by the caller) and return
+        z3's raw output for them. Starts the process on first use. Raises
+        MalformedScript, without sending anything, for a script z3 could
+        not read to the end.
+        """
+        error = script_error(script)
+        if error:
+            raise error
+        if self._proc is None:
+            self._start()
+        try:
+            self._send(f'{script}\n(echo "{SENTINEL}")\n')
+        except BrokenPipeError:
+            # z3 died between queries; retry once on a fresh process
+            self._kill()
+            self._start()
+            self._send(f'{script}\n(echo "{SENTINEL}")\n')
+        return self._read_answer(time.monotonic() + (timeout or self.timeout))
+
+    def check(self, smt_code):
+        """
+        Solve one self-contained SMT script (as produced by model_builder)
+        inside its own (push)/(pop) scope.
+        """
+        self._drop_base()
+        body = split_logic(smt_code)[1] + REASON_QUERY
+        if not self.statistics:
+            return _parse_answer(self.query(f"(push)\n{body}\n(pop)"))
+        totals = {}
+        raw = self.query(f"(push)\n{body}{STATS_QUERY}\n(pop)")
+        answer = _parse_answer(_split_statistics(raw, totals))
+        # z3 accumulates counters over the whole process; keep this query's share
+        self.last_statistics = {k: v if "memory" in k or "max" in k
+                                else v - self._stat_totals.get(k, 0)
+                                for k, v in totals.items()}
+        self._stat_totals = totals
+        return answer
+
+    def check_batch(self, scripts):
+        """
+        Solve several scripts in one round trip; same result list as
+        run_smt_batch. A per-check timeout keeps one hard fixture from
+        using up the whole batch's deadline.
+        """
+        return _solve_well_formed(scripts, self._check_batch)
+
+    def _check_batch(self, scripts):
+        batch = split_logic(build_smt_batch(scripts, self.timeout * 1000))[1]
+        try:
+            self._drop_base()
+            raw = self.query(batch, timeout=self.timeout * len(scripts) + 1)
+        except RuntimeError as e:
+            return [e] * len(scripts)
+        return parse_batch_output(raw, len(scripts))
+
+    def _command(self, script):
+        """query() for commands whose only output would be an error."""
+        raw = self.query(script)
+        if raw.strip():
+            raise RuntimeError("Unexpected Z3 output: " + raw)
+
+    def _drop_base(self):
+        base, self._base = self._base, None
+        if base is not None and self._proc is not None:
+            self._command("(pop)")
+
+    def check_in_context(self, base, pins, queries):
+        """
+        Solve each of `queries` (Bool terms) under the `base` script plus
+        the `pins` assertions, returning one (sat, model) or RuntimeError
+        per query. The base is asserted once in an outer (push) scope and
+        kept there while consecutive calls pass the same base, so only the
+        pins and the queries are parsed per call:
+            (push) base                       -- when base changes
+              (push) pins
+                (push) (assert q) (check-sat) (get-model) (pop)  -- per query
+              (pop)
+        """
+        try:
+            if base != self._base:
+                self._drop_base()
+                self._command("(push)\n" + split_logic(base)[1])
+                self._base = base
+            script = ["(push)", pins]
+            for q in queries:
+                script += ["(push)", f"(assert {q})", "(check-sat)", "(get-model)",
+                           "(pop)", f'(echo "{BATCH_MARKER}")']
+            script.append("(pop)")
+            raw = self.query("\n".join(script), timeout=self.timeout * len(queries) + 1)
+        except RuntimeError as e:
+            # the process may have been restarted without the base; a
+            # malformed script was never sent and changed nothing
+            if not isinstance(e, MalformedScript):
+                self._base = None
+            return [e] * len(queries)
+        return parse_batch_output(raw, len(queries))
+
+    def iter_models(self, smt_code, variables, limit=None):
+        """
+        Yield up to `limit` (None: all) distinct counterexamples for one
+        script as (assignment, model): assignment lists (variable, value)
+        for each of `variables`, model is the full (get-model) text. After
+        each model a blocking clause over `variables` is asserted and the
+        same solver context is asked again, so no model is rebuilt or
+        re-parsed. Each model costs one round trip: the blocking clause,
+        (check-sat), (get-model) and the (get-value)s are sent together.
+        """
+        self._drop_base()
+        body = _CHECK_TAIL.sub("", split_logic(smt_code)[1].rstrip())
+        self._command(f"(push)\n{body}")
+        proc = self._proc
+        # after unsat the model and values are errors, which are ignored
+        ask = ["(check-sat)", "(get-model)"]
+        for var in variables:
+            ask += [f'(echo "{BATCH_MARKER}")', f"(get-value ({var}))"]
+        ask = "\n".join(ask)
+        block, found = "", 0
+        try:
+            while limit is None or found < limit:
+                answer = self.query(block + ask).split(BATCH_MARKER + "\n")
+                result, _, model = answer[0].strip().partition("\n")
+                if result == "unsat":
+                    return
+                if result == "unknown":
+                    raise SolverUnknown("unknown")
+                if result != "sat":
+                    raise RuntimeError(f"Unexpected Z3 result: {result}")
+                # each value answer looks like ((var value))
+                assignment = [(var, raw.strip()[len(var) + 3:-2].strip())
+                              for var, raw in zip(variables, answer[1:])]
+                found += 1
+                yield assignment, model.strip()
+                if not assignment:
+                    return
+                same = " ".join(f"(= {v} {val})" for v, val in assignment)
+                block = f"(assert (not (and {same})))\n"
+        finally:
+            if self._proc is proc and proc is not None:
+                self._command("(pop)")
+
+    def close(self):
+        if self._proc is not None:
+            try:
+                self._send("(exit)\n")
+                self._proc.wait(timeout=1)
+            except (OSError, subprocess.TimeoutExpired):
+                pass
+            self._kill()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def portfolio_configs(z3_path="z3", rlimit=0):
+    """
+    Solver configurations raced by PortfolioSolver: (label, argv prefix),
+    the script path is appended. z3 with each string solver and a
+    reseeded run, plus cvc5 when it is installed.
+    """
+    configs = [
+        ("z3", _z3_command(z3_path, "-smt2", rlimit=rlimit)),
+        ("z3-z3str3", _z3_command(z3_path, "-smt2", "smt.string_solver=z3str3",
+                                  rlimit=rlimit)),
+        ("z3-seed7", _z3_command(z3_path, "-smt2", "smt.random_seed=7",
+                                 "sat.random_seed=7", rlimit=rlimit)),
+    ]
+    cvc5 = shutil.which("cvc5")
+    if cvc5:
+        cmd = [cvc5, "--lang=smt2", "--produce-models", "--strings-exp"]
+        if rlimit:
+            cmd.append(f"--rlimit-per={rlimit}")
+        configs.append(("cvc5", cmd))
+    return configs
+
+
+class PortfolioSolver:
+    """
+    Races several solver configurations on each query and returns the
+    first definitive (sat/unsat) answer. The losers are killed together
+    with their process group as soon as a winner is known. `unknown`
+    from one configuration just waits for the others; only when all of
+    them give up does check() raise SolverUnknown.
+    """
+    def __init__(self, z3_path="z3", timeout=10, rlimit=0, configs=None):
+        self.z3_path = z3_path
+        self.timeout = timeout
+        self.rlimit = rlimit
+        self.configs = configs or portfolio_configs(z3_path, rlimit)
+        self.statistics = False
+        self.last_statistics = {}
+        self.spawn_time = 0.0
+        self.last_winner = None
+
+    @property
+    def identity(self):
+        labels = ",".join(label for label, _ in self.configs)
+        return f"portfolio[{labels}] {solver_identity(self.z3_path)}"
+
+    @staticmethod
+    def _kill(proc):
+        if proc.poll() is None:
+            try:
+                os.killpg(proc.pid, signal.SIGKILL)
+            except (ProcessLookupError, PermissionError):
+                pass
+        proc.wait()
+        proc.stdout.close()
+
+    def check(self, smt_code):
+        with tempfile.NamedTemporaryFile("w", suffix=".smt2", delete=False) as f:
+            f.write(smt_code)
+            fname = f.name
+        sel = selectors.DefaultSelector()
+        running = {}
+        try:
+            for label, cmd in self.configs:
+                proc = subprocess.Popen(cmd + [fname], stdout=subprocess.PIPE,
+                                        stderr=subprocess.STDOUT,
+                                        start_new_session=True)
+                running[proc] = (label, [])
+                sel.register(proc.stdout, selectors.EVENT_READ, proc)
+            deadline = time.monotonic() + self.timeout
+            failures = []
+            while running:
+                remaining = deadline - time.monotonic()
+                events = sel.select(remaining) if remaining > 0 else []
+                if not events:
+                    raise SolverUnknown(f"portfolio timed out after {self.timeout:g}s")
+                for key, _ in events:
+                    proc = key.data
+                    label, chunks = running[proc]
+                    chunk = os.read(key.fd, 65536)
+                    if chunk:
+                        chunks.append(chunk)
+                        continue
+                    # EOF: this configuration has finished
+                    sel.unregister(key.fileobj)
+                    del running[proc]
+                    self._kill(proc)
+                    try:
+                        answer = _parse_answer(b"".join(chunks).decode(errors="replace"))
+                    except RuntimeError as e:
+                        failures.append(f"{label}: {str(e).splitlines()[0]}")
+                        continue
+                    self.last_winner = label
+                    return answer
+            raise SolverUnknown("no configuration decided the query ("
+                                + "; ".join(sorted(failures)) + ")")
+        finally:
+            for proc in running:
+                self._kill(proc)
+            sel.close()
+            os.unlink(fname)
+
+    def check_batch(self, scripts):
+        results = []
+        for smt in scripts:
+            try:
+                results.append(self.check(smt))
+            except RuntimeError as e:
+                results.append(e)
+        return results
+
+    def iter_models(self, smt_code, variables, limit=None):
+        # Enumeration is incremental, so it runs on a single z3 session.
+        with SolverSession(self.z3_path, self.timeout, self.rlimit) as session:
+            yield from session.iter_models(smt_code, variables, limit)
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+SOLVER_BACKENDS = {
+    "session": SolverSession,
+    "subprocess": SubprocessSolver,
+    "portfolio": PortfolioSolver,
+}
+
+
+def make_solver(backend="session", z3_path="z3", timeout=10, rlimit=0):
+    """Instantiate a solver backend by name (see SOLVER_BACKENDS)."""
+    return SOLVER_BACKENDS[backend](z3_path, timeout, rlimit)
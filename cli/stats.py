@@ -0,0 +1,150 @@
+# cli/stats.py
+
+"""
+Per-fixture, per-phase timing for verify_policies --stats.
+
+A fixture's timing is a plain dict (so --jobs workers can send it back
+with the report):
+    {"name": ..., "case": ..., "phases": {phase: seconds}, "solver": {...}}
+Phases are parse, evaluate (fast path), build (SMT text), cache, spawn
+(starting z3), solve and output. Work done for a whole batch is split
+evenly across the fixtures in it.
+"""
+import json
+import re
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from utils import percentile
+
+PHASES = ("parse", "evaluate", "build", "cache", "spawn", "solve", "output")
+
+_STAT_ENTRY = re.compile(r":([\w.-]+)\s+([-\d.e+]+)")
+
+
+def parse_statistics(raw):
+    """Numbers from z3's (get-info :all-statistics) output, as a dict."""
+    return {k: float(v) if "." in v or "e" in v else int(v)
+            for k, v in _STAT_ENTRY.findall(raw)}
+
+
+def new_timing(fx):
+    return {"name": fx.get("name", "<unnamed>") if isinstance(fx, dict) else "<unnamed>",
+            "case": fx.get("case") if isinstance(fx, dict) else None,
+            "phases": {}, "solver": {}}
+
+
+def add_phase(timing, phase, seconds):
+    timing["phases"][phase] = timing["phases"].get(phase, 0.0) + seconds
+
+
+@contextmanager
+def timed_phase(timings, phase):
+    """Charge the elapsed time of the block to `phase`, shared by timings."""
+    t = time.perf_counter()
+    try:
+        yield
+    finally:
+        if timings:
+            share = (time.perf_counter() - t) / len(timings)
+            for timing in timings:
+                add_phase(timing, phase, share)
+
+
+def timed_parse(docs, parse_times):
+    """
+    Pass documents through, appending the time spent producing each one
+    to the parse_times deque (consumed in order by RunStats.add).
+    """
+    it = iter(docs)
+    while True:
+        t = time.perf_counter()
+        try:
+            doc = next(it)
+        except StopIteration:
+            return
+        parse_times.append(time.perf_counter() - t)
+        yield doc
+
+
+def merge_solver_stats(total, stats):
+    """Sum counters; keep the maximum of memory and max-* figures."""
+    for k, v in stats.items():
+        if "memory" in k or "max" in k:
+            total[k] = max(total.get(k, 0), v)
+        else:
+            total[k] = total.get(k, 0) + v
+
+
+class RunStats:
+    """Collects fixture timings for one run and renders the summary."""
+    def __init__(self):
+        self.fixtures = []
+        self.parse_times = deque()
+        self.started = time.perf_counter()
+
+    def add(self, timing):
+        if self.parse_times:
+            add_phase(timing, "parse", self.parse_times.popleft())
+        timing["total"] = sum(timing["phases"].values())
+        self.fixtures.append(timing)
+
+    def summary(self, slowest=10):
+        phases = {}
+        for phase in PHASES:
+            values = [t["phases"][phase] for t in self.fixtures if phase in t["phases"]]
+            if not values:
+                continue
+            phases[phase] = {
+                "total_s": sum(values),
+                "mean_ms": sum(values) / len(values) * 1000,
+                "p50_ms": percentile(values, 50) * 1000,
+                "p95_ms": percentile(values, 95) * 1000,
+                "p99_ms": percentile(values, 99) * 1000,
+                "max_ms": max(values) * 1000,
+            }
+        solver = {}
+        for t in self.fixtures:
+            merge_solver_stats(solver, t["solver"])
+        ranked = sorted(self.fixtures, key=lambda t: t["total"], reverse=True)
+        return {
+            "fixtures": len(self.fixtures),
+            "wall_s": time.perf_counter() - self.started,
+            "phases": phases,
+            "solver": solver,
+            "slowest": [{"name": t["name"], "case": t["case"],
+                         "total_ms": t["total"] * 1000} for t in ranked[:slowest]],
+        }
+
+    def render(self, slowest=10):
+        s = self.summary(slowest)
+        lines = [f"=== Verification statistics: {s['fixtures']} fixtures "
+                 f"in {s['wall_s']:.3f}s ===",
+                 f"{'phase':9} {'total s':>9} {'mean ms':>9} {'p50 ms':>9} "
+                 f"{'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}"]
+        for phase, p in s["phases"].items():
+            lines.append(f"{phase:9} {p['total_s']:>9.3f} {p['mean_ms']:>9.3f} "
+                         f"{p['p50_ms']:>9.3f} {p['p95_ms']:>9.3f} "
+                         f"{p['p99_ms']:>9.3f} {p['max_ms']:>9.3f}")
+        if s["solver"]:
+            lines.append("solver: " + ", ".join(
+                f"{k}={v:g}" for k, v in sorted(s["solver"].items())
+                if k in ("rlimit-count", "max-memory", "decisions", "conflicts",
+                         "time", "num-checks")))
+        lines.append(f"slowest {len(s['slowest'])}:")
+        for t in s["slowest"]:
+            lines.append(f"  {t['total_ms']:>9.3f} ms  {t['name']} ({t['case']})")
+        return "\n".join(lines)
+
+    def write(self, path, slowest=10):
+        """JSON Lines (one fixture per line, then the summary) for *.jsonl,
+        a single JSON document otherwise."""
+        summary = self.summary(slowest)
+        with open(path, "w") as f:
+            if str(path).endswith(".jsonl"):
+                for t in self.fixtures:
+                    f.write(json.dumps(t) + "\n")
+                f.write(json.dumps({"summary": summary}) + "\n")
+            else:
+                json.dump({"summary": summary, "fixtures": self.fixtures}, f, indent=2)
@@ -1,19 +1,90 @@
+import itertools
+import math
+import os
+import queue
+import threading
 import yaml
 from pathlib import Path
 
-def load_fixtures(path):
+FIXTURE_SUFFIXES = (".yaml", ".yml")
+
+def iter_fixture_files(path, recursive=True):
+    """
+    Yield fixture file paths under `path` (a file or directory) in a
+    stable, sorted order, descending into subdirectories if recursive.
+    """
+    p = Path(path)
+    if not p.is_dir():
+        yield p
+        return
+    for root, dirs, files in os.walk(p):
+        dirs.sort()
+        if not recursive:
+            dirs.clear()
+        for name in sorted(files):
+            if name.endswith(FIXTURE_SUFFIXES):
+                yield Path(root) / name
+
+def iter_fixtures(path, recursive=True):
+    """
+    Lazily yield parsed YAML documents from a file or directory, one file
+    and one document at a time. Empty documents are skipped.
+    """
+    for f in iter_fixture_files(path, recursive):
+        with open(f) as fh:
+            for doc in yaml.safe_load_all(fh):
+                if doc is not None:
+                    yield doc
+
+def load_fixtures(path, recursive=True):
     """
     Load one or more YAML files from a file or directory.
     Returns a list of dicts (parsed YAML documents).
     """
-    p = Path(path)
-    yamls = []
-    if p.is_dir():
-        for f in sorted(p.glob("*.yaml")):
-            yamls.extend(yaml.safe_load_all(f.read_text()))
-    else:
-        yamls.extend(yaml.safe_load_all(p.read_text()))
-    return yamls
+    return list(iter_fixtures(path, recursive))
 
 def dump_smt_to_file(smt_code, out_path):
     Path(out_path).write_text(smt_code)
+
+def chunked(iterable, size):
+    """Yield lists of up to `size` consecutive items from iterable."""
+    it = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(it, max(size, 1)))
+        if not chunk:
+            return
+        yield chunk
+
+_DONE = object()
+
+def prefetch(iterable, depth=64):
+    """
+    Consume iterable in a background thread, up to `depth` items ahead of
+    the caller. Lets YAML parsing run while the main thread waits on the
+    solver; an exception from iterable is re-raised in the caller.
+    """
+    q = queue.Queue(depth)
+
+    def feed():
+        try:
+            for item in iterable:
+                q.put((item, None))
+        except BaseException as e:
+            q.put((_DONE, e))
+            return
+        q.put((_DONE, None))
+
+    threading.Thread(target=feed, daemon=True).start()
+    while True:
+        item, err = q.get()
+        if item is _DONE:
+            if err is not None:
+                raise err
+            return
+        yield item
+
+def percentile(values, q):
+    """Nearest-rank q-th percentile (0-100) of a non-empty sequence."""
+    ordered = sorted(values)
+    k = math.ceil(q / 100 * len(ordered)) - 1
+    return ordered[max(0, min(len(ordered) - 1, k))]
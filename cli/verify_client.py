@@ -0,0 +1,84 @@
+# cli/verify_client.py
+
+"""
+Thin client for verify_server.py.
+
+The protocol is JSON Lines over a Unix socket. The client sends one
+request line:
+    {"input": "/abs/path", "options": {...}}
+and the server streams back one line per message:
+    {"report": {"failed": bool, "lines": [...]}}   -- one per fixture
+    {"stderr": "..."}                              -- diagnostics
+    {"fallback": "reason"}                         -- cannot serve this request
+    {"status": n}                                  -- last line: exit status
+"""
+import json
+import os
+import socket
+import sys
+from pathlib import Path
+
+from result_cache import default_cache_dir
+
+# Options of a verify_policies run that the server applies per request.
+FORWARDED = ("recursive", "fast_path", "cross_check", "counterexamples", "verbose",
+             "equivalence", "xacml", "batch_size", "timeout", "time_budget",
+             "bundle", "no_bundle")
+
+# Options fixed when the server starts; a request that asks for different
+# values is verified in-process instead.
+SERVER_FIXED = ("solver", "z3", "rlimit", "cache_dir", "cache_max_mb", "no_cache")
+
+
+def default_socket_path():
+    return Path(os.environ.get("K8S_ABAC_VERIFY_SOCKET")
+                or default_cache_dir() / "verify.sock")
+
+
+def make_request(args):
+    """The request line for a parsed verify_policies command line."""
+    options = {k: getattr(args, k) for k in FORWARDED + SERVER_FIXED}
+    if options["xacml"]:
+        options["xacml"] = os.path.abspath(options["xacml"])
+    if options["bundle"]:
+        options["bundle"] = os.path.abspath(options["bundle"])
+    if options["cache_dir"]:
+        options["cache_dir"] = os.path.abspath(options["cache_dir"])
+    return {"input": os.path.abspath(args.input), "options": options}
+
+
+def verify_remote(args, socket_path=None):
+    """
+    Run a verification on the server and print its verdicts as they
+    arrive. Returns the exit status, or None when no server is listening
+    or the server declined the request before reporting anything, in
+    which case the caller verifies in-process.
+    """
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(str(socket_path or default_socket_path()))
+    except OSError:
+        sock.close()
+        return None
+    reported = False
+    with sock, sock.makefile("rwb") as conn:
+        try:
+            conn.write(json.dumps(make_request(args), default=str).encode() + b"\n")
+            conn.flush()
+            for line in conn:
+                msg = json.loads(line)
+                if "report" in msg:
+                    print("\n".join(msg["report"]["lines"]), flush=True)
+                    reported = True
+                elif "stderr" in msg:
+                    print(msg["stderr"], file=sys.stderr)
+                elif "fallback" in msg and not reported:
+                    return None
+                elif "status" in msg:
+                    return msg["status"]
+        except (OSError, ValueError):
+            pass
+    if not reported:
+        return None
+    print("ERROR: verification server closed the connection", file=sys.stderr)
+    return 1
@@ -1,13 +1,35 @@
 #!/usr/bin/env python3
 import argparse
+import cProfile
+import itertools
+import multiprocessing
+import pstats
+import random
 import sys
-from utils import load_fixtures
+import threading
+import time
+import yaml
+from utils import chunked, iter_fixtures, prefetch
 from model_builder import (
 	build_smt_for_registry,
 	build_smt_for_wildcard,
-	build_smt_for_tenant
+	build_smt_for_tenant,
+	build_equivalence_base,
+	build_equivalence_pins,
+	build_xacml_query,
+	EQUIVALENCE_QUERIES
 )
-from solver_interface import run_smt
+from evaluator import evaluate
+from fixture_bundle import iter_bundled_fixtures
+from solver_interface import SOLVER_BACKENDS, SolverSession, SolverUnknown, make_solver
+from result_cache import ResultCache, default_cache_dir
+from policy_ir import from_fixture
+from schema import SchemaError
+from stats import RunStats, add_phase, new_timing, timed_parse, timed_phase
+from verify_client import default_socket_path, verify_remote
+from watcher import FixtureWatcher, document_key
+from xacml_compiler import XacmlError, compile_policies
+from xml.etree.ElementTree import ParseError
 
 def detect_case(fixture):
 	"""Heuristic: decide which case this fixture is for."""
@@ -17,70 +39,597 @@ def detect_case(fixture):
 	if kind == "tenant":   return "tenant"
 	raise ValueError("Unknown case in fixture: " + repr(kind))
 
-def main():
+class BudgetExhausted(RuntimeError):
+	"""The --time-budget ran out before this fixture reached the solver."""
+
+def build_parser():
+	"""The CLI's argument parser (verify_server reuses it for defaults)."""
 	p = argparse.ArgumentParser()
 	p.add_argument("--input", "-i", required=True,
 				   help="Path to fixture YAML (file or dir)")
+	p.add_argument("--no-recursive", dest="recursive", action="store_false",
+				   help="Only read fixtures directly inside --input")
 	p.add_argument("--equivalence", action="store_true",
 				   help="Also check ABAC⊂RBAC and RBAC⊂ABAC")
+	p.add_argument("--xacml", metavar="PATH",
+				   help="Also check each fixture against the XACML policies "
+						"in PATH (file or dir, e.g. ../runtime/policies)")
 	p.add_argument("--verbose", "-v", action="store_true")
+	p.add_argument("--solver", choices=sorted(SOLVER_BACKENDS), default="session",
+				   help="session: one warm z3 reused via push/pop (default); "
+						"subprocess: fresh z3 per fixture; portfolio: race "
+						"several solver configurations per query")
+	p.add_argument("--z3", default="z3", help="Path to the z3 binary")
+	p.add_argument("--timeout", type=float, default=10, metavar="SECONDS",
+				   help="Wall-clock limit per solver query (default: 10)")
+	p.add_argument("--rlimit", type=int, default=0, metavar="N",
+				   help="z3 resource limit per query; deterministic across "
+						"machines, unlike --timeout (default: none)")
+	p.add_argument("--time-budget", type=float, default=None, metavar="SECONDS",
+				   help="Stop sending fixtures to the solver after this long; "
+						"the rest are reported as SKIPPED")
+	p.add_argument("--jobs", "-j", type=int, default=1,
+				   help="Verify fixtures in N worker processes (default: 1)")
+	p.add_argument("--batch-size", "-b", type=int, default=1,
+				   help="Solve up to N fixtures of the same case per solver "
+						"script (default: 1)")
+	p.add_argument("--counterexamples", "-k", type=int, default=1, metavar="K",
+				   help="For fixtures with free variables (registry fixtures "
+						"without test_registry), list up to K distinct "
+						"counterexamples")
+	p.add_argument("--all-models", action="store_true",
+				   help="For fixtures with free variables, stream every "
+						"distinct counterexample as the solver finds it")
+	p.add_argument("--limit", type=int, default=100, metavar="K",
+				   help="Stop --all-models after K counterexamples per "
+						"fixture; 0 for no limit (default: 100)")
+	p.add_argument("--no-fast-path", dest="fast_path", action="store_false",
+				   help="Send fully ground fixtures to the solver too instead "
+						"of evaluating them directly")
+	p.add_argument("--cross-check", type=float, default=0.0, metavar="RATE",
+				   help="Also solve this fraction (0-1) of fast-path fixtures "
+						"and fail on any disagreement")
+	p.add_argument("--cache-dir", default=None,
+				   help=f"Verdict cache directory (default: {default_cache_dir()})")
+	p.add_argument("--cache-max-mb", type=int, default=256,
+				   help="Evict least recently used verdicts beyond this size")
+	p.add_argument("--no-cache", action="store_true",
+				   help="Always run the solver; neither read nor write the cache")
+	p.add_argument("--bundle", metavar="PATH", default=None,
+				   help="Precompiled fixture bundle to read and refresh "
+						"(default: one per input in the cache directory)")
+	p.add_argument("--no-bundle", action="store_true",
+				   help="Parse every fixture file instead of using a bundle")
+	p.add_argument("--stats", action="store_true",
+				   help="Print per-phase timing and solver statistics to stderr")
+	p.add_argument("--stats-file", metavar="PATH",
+				   help="Write per-fixture timings (JSON, or JSON Lines if "
+						"PATH ends in .jsonl); implies --stats collection")
+	p.add_argument("--slowest", type=int, default=10, metavar="N",
+				   help="Number of slowest fixtures listed by --stats (default: 10)")
+	p.add_argument("--watch", action="store_true",
+				   help="Keep running; re-verify fixture documents as their "
+						"files change")
+	p.add_argument("--watch-interval", type=float, default=0.05, metavar="SECONDS",
+				   help="How often --watch polls for changes (default: 0.05)")
+	p.add_argument("--profile", metavar="PATH",
+				   help="Run under cProfile and dump the profile to PATH")
+	p.add_argument("--server", metavar="SOCKET", default=None,
+				   help="Socket of a running verify_server.py (default: "
+						f"{default_socket_path()})")
+	p.add_argument("--no-server", action="store_true",
+				   help="Always verify in this process, even if a "
+						"verify_server.py is running")
+	return p
+
+def main():
+	p = build_parser()
 	args = p.parse_args()
+	args.stats = args.stats or bool(args.stats_file)
+	if args.all_models and args.jobs > 1:
+		# streamed counterexamples come from this process's solver session
+		p.error("--all-models cannot be combined with --jobs")
+
+	if args.profile:
+		profiler = cProfile.Profile()
+		status = profiler.runcall(run, args)
+		profiler.dump_stats(args.profile)
+		pstats.Stats(profiler, stream=sys.stderr).sort_stats("cumulative").print_stats(25)
+	else:
+		status = run(args)
+	sys.exit(status)
 
+def run(args):
+	"""Verify everything under args.input; return the exit status."""
+	if not (args.no_server or args.stats or args.watch or args.jobs > 1
+			or args.all_models):
+		# a running verify_server.py has warm solvers; use it if it answers
+		status = verify_remote(args, args.server)
+		if status is not None:
+			return status
+	stats = RunStats() if args.stats else None
+	args.deadline = (time.monotonic() + args.time_budget
+					 if args.time_budget is not None else None)
+	args.xacml_policies = None
+	if args.xacml:
+		try:
+			args.xacml_policies = compile_policies(args.xacml)
+		except (OSError, ParseError, XacmlError) as e:
+			print(f"REJECTED: XACML policies ({e})", file=sys.stderr)
+			return 1
+	if args.watch:
+		return watch(args, stats)
+	# Fixtures are parsed lazily, ahead of the solver, and each verdict is
+	# printed as soon as it is known.
+	docs = iter_input(args)
+	if stats:
+		docs = timed_parse(docs, stats.parse_times)
+	fixtures = prefetch(docs)
 	try:
-		fixtures = load_fixtures(args.input)
-	except Exception as e:
+		first = next(fixtures, None)
+		if first is None:
+			print("No fixtures found in", args.input, file=sys.stderr)
+			return 1
+		fixtures = itertools.chain([first], fixtures)
+
+		if args.jobs > 1:
+			status = verify_parallel(fixtures, args, stats)
+		else:
+			with make_solver(args.solver, args.z3, args.timeout, args.rlimit) as solver:
+				status = verify_all(fixtures, solver, args, stats)
+	except BrokenPipeError:
+		# stdout closed early (e.g. piped into head); nothing left to report
+		return 1
+	except (OSError, yaml.YAMLError) as e:
 		print(f"REJECTED: malformed input file ({e})", file=sys.stderr)
-		sys.exit(1)
-	if not fixtures:
-		print("No fixtures found in", args.input, file=sys.stderr)
-		sys.exit(1)
+		return 1
+	if stats:
+		print(stats.render(args.slowest), file=sys.stderr)
+		if args.stats_file:
+			stats.write(args.stats_file, args.slowest)
+	return status
+
+def iter_input(args):
+	"""The fixture documents under args.input, through a bundle unless --no-bundle."""
+	if args.no_bundle:
+		return iter_fixtures(args.input, args.recursive)
+	return iter_bundled_fixtures(args.input, args.recursive, args.bundle, args.cache_dir)
+
+BUILDERS = {
+	"registry": build_smt_for_registry,
+	"wildcard": build_smt_for_wildcard,
+	"tenant":   build_smt_for_tenant,
+}
 
+def build_model(fx, fast_path=False, cross_check=0.0, timing=None):
+	"""
+	Build the SMT model for one fixture. Returns (ir, smt, verdict, lines):
+	ir is the fixture's validated, interned policy IR; lines opens the
+	fixture's report; verdict is set when the fast path decided the
+	fixture without the solver (smt is then only built for the
+	--cross-check sample); ir, smt and verdict are None if the fixture was
+	rejected, in which case lines already holds the complete report.
+	"""
+	case = detect_case(fx)
+	out = [f"--- Checking {fx.get('name','<unnamed>')} ({case}) ---"]
+	timings = [timing] if timing else []
+	# ──────── Attempt to build the SMT model ────────
+	try:
+		with timed_phase(timings, "evaluate"):
+			ir = from_fixture(fx, case)
+			verdict = evaluate(case, ir) if fast_path else None
+		smt = None
+		if verdict is None or random.random() < cross_check:
+			with timed_phase(timings, "build"):
+				smt = BUILDERS[case](ir)
+	except SchemaError as e:
+		# Missing or wrongly typed field in the fixture
+		out += [f"REJECTED: malformed policy ({e})", ""]
+		return None, None, None, out
+	except Exception as e:
+		# Any other parse/model‐building error
+		out += [f"REJECTED: malformed policy ({e})", ""]
+		return None, None, None, out
+	return ir, smt, verdict, out
+
+# Bound on a run's `solved` memo (see solve); it is emptied when full.
+_SOLVED_MAX = 1 << 16
+
+def solve(smts, solver, cache=None, timings=None, solved=None):
+	"""
+	Solve a list of SMT scripts of one case. Returns one (sat, model) or
+	RuntimeError per script. `solved`, if given, memoises verdicts by SMT
+	text for one run on this solver: semantically identical fixtures share
+	one interned IR object and so one script, which makes every repeat a
+	lookup there (even with --no-cache). Scripts already in `solved`, or
+	repeated within the list, are solved once; cached verdicts skip the
+	solver; several misses go to the solver together as one batch
+	script. timings, if given, holds one stats timing dict per script.
+	"""
+	timings = timings or [None] * len(smts)
+	if solved is None:
+		results = [None] * len(smts)
+	else:
+		results = [solved.get(smt) for smt in smts]
+	with timed_phase([t for t in timings if t], "cache"):
+		keys = [cache.key(smt, solver.identity) if r is None else None
+				for smt, r in zip(smts, results)] if cache else []
+		if cache:
+			results = [r or (cache.get(k) if k else None) for r, k in zip(results, keys)]
+	first = {}		# script -> index of its first unsolved occurrence
+	for i, r in enumerate(results):
+		if r is None:
+			first.setdefault(smts[i], i)
+	misses = sorted(first.values())
+	charged = [timings[i] for i in misses if timings[i]]
+	spawn_before = solver.spawn_time
+	with timed_phase(charged, "solve"):
+		if len(misses) == 1:
+			try:
+				results[misses[0]] = solver.check(smts[misses[0]])
+			except RuntimeError as e:
+				results[misses[0]] = e
+			if charged and solver.last_statistics:
+				charged[0]["solver"] = dict(solver.last_statistics)
+		elif misses:
+			for i, r in zip(misses, solver.check_batch([smts[i] for i in misses])):
+				results[i] = r
+	spawned = solver.spawn_time - spawn_before
+	for t in charged:
+		# starting z3 is reported as its own phase, not as solving
+		add_phase(t, "solve", -spawned / len(charged))
+		add_phase(t, "spawn", spawned / len(charged))
+	if cache:
+		with timed_phase(charged, "cache"):
+			for i in misses:
+				if not isinstance(results[i], RuntimeError):
+					cache.put(keys[i], *results[i])
+	if solved is not None and len(solved) + len(smts) > _SOLVED_MAX:
+		solved.clear()
+	for i, smt in enumerate(smts):
+		if results[i] is None:
+			results[i] = results[first[smt]]
+		if solved is not None and not isinstance(results[i], RuntimeError):
+			solved[smt] = results[i]
+	return results
+
+def enumerate_counterexamples(ir, smt, solver, limit):
+	"""
+	Up to `limit` distinct counterexamples for a fixture with free
+	variables, as (assignment, model) pairs; a RuntimeError on failure.
+	"""
+	try:
+		return [(ir.decode(assignment), model) for assignment, model
+				in solver.iter_models(smt, ir.free_variables(), limit)]
+	except RuntimeError as e:
+		return e
+
+def stream_counterexamples(models, limit=None, verbose=False):
+	"""
+	Report lines for --all-models, produced as the solver finds each
+	counterexample so they can be printed before enumeration finishes.
+	"""
+	n = 0
+	try:
+		for n, (assignment, model) in enumerate(models, 1):
+			yield f"  #{n}: " + ", ".join(f"{var} = {val}" for var, val in assignment)
+			if verbose:
+				yield model
+	except RuntimeError as e:
+		yield f"  enumeration stopped after {n}: {e}"
+		return
+	complete = "stopped at --limit" if n == limit else "no more exist"
+	yield f"  {n} distinct counterexample{'' if n == 1 else 's'} ({complete})"
+
+def finish_report(out, result, verbose=False, counterexamples=None):
+	"""
+	Append the verdict for `result` to out; return (failed, out).
+	counterexamples, if given, replaces the single model of a sat result.
+	"""
+	# ──────── Interpret SMT results ────────
+	if isinstance(counterexamples, RuntimeError):
+		result = counterexamples
+	if isinstance(result, BudgetExhausted):
+		out += ["SKIPPED: time budget exhausted", ""]
+		return True, out
+	if isinstance(result, SolverUnknown):
+		# Z3 returned “unknown”, hit --rlimit or timed out
+		out += [f"UNKNOWN: solver could not decide ({result})", ""]
+		return True, out
+	if isinstance(result, RuntimeError):
+		# any other unexpected solver output
+		out += [f"ERROR: SMT solver failed ({result})", ""]
+		return True, out
+
+	sat, model = result
+	if sat and counterexamples:
+		count = len(counterexamples)
+		out.append(f"INVALID: {count} counterexample{'' if count == 1 else 's'} found")
+		for n, (assignment, model) in enumerate(counterexamples, 1):
+			values = ", ".join(f"{var} = {val}" for var, val in assignment)
+			out.append(f"  #{n}: {values}")
+			if verbose:
+				out.append(model)
+	elif sat:
+		# solver found a violation
+		out.append("INVALID: counterexample found")
+		if verbose:
+			out.append(model)
+	else:
+		# unsat ⇒ no violation
+		out.append("VALID (no violation)")
+	out.append("")
+	return sat, out
+
+def check_equivalence(ir, session, verbose=False):
+	"""
+	Check ABAC⊂RBAC and RBAC⊂ABAC for one fixture's IR in the shared
+	incremental context of `session` (see SolverSession.check_in_context).
+	Returns (failed, lines).
+	"""
+	results = session.check_in_context(build_equivalence_base(ir),
+									   build_equivalence_pins(ir),
+									   [q for _, q in EQUIVALENCE_QUERIES])
+	if all(not isinstance(r, RuntimeError) and not r[0] for r in results):
+		return False, ["EQUIVALENT (ABAC⊂RBAC and RBAC⊂ABAC hold)"]
+	lines = ["NOT EQUIVALENT"]
+	for (name, _), r in zip(EQUIVALENCE_QUERIES, results):
+		if isinstance(r, SolverUnknown):
+			lines.append(f"  {name}: UNKNOWN ({r})")
+		elif isinstance(r, RuntimeError):
+			lines.append(f"  {name}: ERROR ({r})")
+		elif r[0]:
+			lines.append(f"  {name}: violated")
+			if verbose:
+				lines.append(r[1])
+		else:
+			lines.append(f"  {name}: holds")
+	return True, lines
+
+def check_xacml(ir, policies, session, verbose=False):
+	"""
+	Can the violation of a fixture (its IR) still happen once the compiled XACML
+	`policies` are enforced? The policy set is the shared base of the
+	session's context, so each fixture only adds its request attributes.
+	Returns (failed, lines).
+	"""
+	script, query = build_xacml_query(ir, policies.attributes)
+	r, = session.check_in_context(policies.smt, script, [query])
+	if isinstance(r, SolverUnknown):
+		return True, [f"XACML: UNKNOWN ({r})"]
+	if isinstance(r, RuntimeError):
+		return True, [f"XACML: ERROR ({r})"]
+	if not r[0]:
+		return False, ["XACML: violation denied by the deployed policies"]
+	lines = ["XACML: INVALID, the deployed policies permit the violation"]
+	if verbose:
+		lines.append(r[1])
+	return True, lines
+
+def check_fixtures(fixtures, solver, args, cache=None, contexts=None, solved=None):
+	"""
+	Build and solve a group of fixtures; fixtures of the same case are
+	solved together. Returns one (failed:bool, lines, timing) per fixture,
+	in input order, so callers decide when to print. `contexts` holds the
+	sessions for the --equivalence and --xacml checks (see open_contexts);
+	`solved` is the run's verdict memo (see solve), ignored with
+	--cross-check so that every sampled fixture reaches the solver.
+	"""
+	contexts = contexts or {}
+	if args.cross_check:
+		solved = None
+	timings = [new_timing(fx) for fx in fixtures]
+	built = [build_model(fx, args.fast_path, args.cross_check, t)
+			 for fx, t in zip(fixtures, timings)]
+	results = [verdict for _, _, verdict, _ in built]
+	by_case = {}
+	for i, (fx, (_, smt, _, _)) in enumerate(zip(fixtures, built)):
+		if smt is not None:
+			by_case.setdefault(fx["case"], []).append(i)
+	for idxs in by_case.values():
+		remaining = budget_left(args)
+		if remaining is not None:
+			if remaining <= 0:
+				for i in idxs:
+					results[i] = BudgetExhausted()
+				continue
+			# no single query may run past the end of the budget
+			solver.timeout = min(args.timeout, remaining)
+			for session in contexts.values():
+				session.timeout = solver.timeout
+		smts = [built[i][1] for i in idxs]
+		for i, r in zip(idxs, solve(smts, solver, cache, [timings[i] for i in idxs], solved)):
+			fast = results[i]
+			if fast is not None and not isinstance(r, RuntimeError) and fast[0] != r[0]:
+				r = RuntimeError(f"cross-check: fast path said {'sat' if fast[0] else 'unsat'}"
+								 f" but the solver said {'sat' if r[0] else 'unsat'}")
+			results[i] = r
+	reports = []
+	for fx, (ir, smt, verdict, out), r, t in zip(fixtures, built, results, timings):
+		if ir is None:
+			reports.append((True, out, t))
+			continue
+		more = stream = None
+		enumerate_more = (not isinstance(r, RuntimeError) and r[0]
+						  and ir.free_variables() and (budget_left(args) or 1) > 0)
+		if enumerate_more and smt is None:
+			# decided by the fast path, but enumeration needs the model
+			smt = BUILDERS[ir.case](ir)
+		if enumerate_more and args.all_models:
+			# lazy: the solver is only asked for models while they are printed
+			models = solver.iter_models(smt, ir.free_variables(), args.limit or None)
+			stream = stream_counterexamples(
+				((ir.decode(a), m) for a, m in models), args.limit, args.verbose)
+		elif enumerate_more and args.counterexamples > 1:
+			with timed_phase([t], "solve"):
+				more = enumerate_counterexamples(ir, smt, solver, args.counterexamples)
+		failed, out = finish_report(out, r, args.verbose and not stream, more)
+		verdict_end = len(out) - 1
+		for name, session in contexts.items():
+			if (budget_left(args) or 1) <= 0:
+				break
+			with timed_phase([t], "solve"):
+				if name == "equivalence":
+					extra_failed, lines = check_equivalence(ir, session, args.verbose)
+				else:
+					extra_failed, lines = check_xacml(ir, args.xacml_policies, session,
+													  args.verbose)
+			out[-1:-1] = lines
+			failed |= extra_failed
+		if stream:
+			out = itertools.chain(out[:verdict_end], stream, out[verdict_end:])
+		reports.append((failed, out, t))
+	return reports
+
+def budget_left(args):
+	"""Seconds left of --time-budget, or None without one."""
+	deadline = getattr(args, "deadline", None)
+	return None if deadline is None else deadline - time.monotonic()
+
+def check_fixture(fx, solver, args, cache=None, contexts=None, solved=None):
+	"""Single-fixture check_fixtures; returns (failed, lines, timing)."""
+	return check_fixtures([fx], solver, args, cache, contexts, solved)[0]
+
+def open_cache(args):
+	"""ResultCache from the CLI options, or None with --no-cache."""
+	if args.no_cache:
+		return None
+	return ResultCache(args.cache_dir, args.cache_max_mb * 1024 * 1024)
+
+def open_contexts(args):
+	"""
+	One dedicated z3 session per enabled --equivalence/--xacml check.
+	Keeping them apart from the verdict solver, and from each other, lets
+	each check's shared base formula stay asserted across fixtures.
+	"""
+	contexts = {}
+	if args.equivalence:
+		contexts["equivalence"] = SolverSession(args.z3, args.timeout, args.rlimit)
+	if args.xacml_policies:
+		contexts["xacml"] = SolverSession(args.z3, args.timeout, args.rlimit)
+	return contexts
+
+def emit(reports, stats=None):
+	"""
+	Print fixture reports in order; return their combined status. Lines
+	that are not a list (--all-models) are printed one by one as they are
+	produced.
+	"""
 	status = 0
-	for fx in fixtures:
-		case = detect_case(fx)
-		print(f"--- Checking {fx.get('name','<unnamed>')} ({case}) ---")
-		# ──────── Attempt to build the SMT model ────────
-		try:
-			if case == "registry":
-				smt = build_smt_for_registry(fx)
-			elif case == "wildcard":
-				smt = build_smt_for_wildcard(fx)
+	for failed, lines, timing in reports:
+		with timed_phase([timing], "output"):
+			if isinstance(lines, list):
+				print("\n".join(lines), flush=True)
 			else:
-				smt = build_smt_for_tenant(fx)
-		except KeyError as e:
-			# Missing required field in the fixture
-			print(f"REJECTED: malformed policy (missing key {e})")
-			status = 1
-			print()
-			continue
-		except Exception as e:
-			# Any other parse/model‐building error
-			print(f"REJECTED: malformed policy ({e})")
-			status = 1
-			print()
-			continue
+				for line in lines:
+					print(line, flush=True)
+		if stats:
+			stats.add(timing)
+		status |= failed
+	return status
 
-		# ──────── Run SMT and interpret results ────────
-		try:
-			sat, model = run_smt(smt)
-		except RuntimeError as e:
-			# Z3 returned “unknown” or another unexpected result
-			print(f"ERROR: SMT solver failed ({e})")
-			status = 1
-			print()
-			continue
+def verify_all(fixtures, solver, args, stats=None):
+	"""Check every fixture against `solver`; return the exit status."""
+	status = 0
+	cache = open_cache(args)
+	contexts = open_contexts(args)
+	solved = {}
+	solver.statistics = stats is not None
+	try:
+		for group in chunked(fixtures, args.batch_size):
+			status |= emit(check_fixtures(group, solver, args, cache, contexts, solved), stats)
+	finally:
+		for session in contexts.values():
+			session.close()
+	return status
 
-		if sat:
-			# solver found a violation
-			print("INVALID: counterexample found")
-			if args.verbose:
-				print(model)
-			status = 1
-		else:
-			# unsat ⇒ no violation
-			print("VALID (no violation)")
-		print()      
-	sys.exit(status)
+def watch(args, stats=None):
+	"""
+	--watch: verify everything under args.input, then poll for changes and
+	re-verify only the documents that changed, on the same warm solver,
+	contexts and cache. Runs until interrupted; the exit status reflects
+	the latest verdict of every document still present.
+	"""
+	watcher = FixtureWatcher(args.input, args.recursive)
+	cache = open_cache(args)
+	contexts = open_contexts(args)
+	solved = {}
+	failing = {}	# file -> keys of its documents whose last check failed
+	try:
+		with make_solver(args.solver, args.z3, args.timeout, args.rlimit) as solver:
+			solver.statistics = stats is not None
+			while True:
+				changed, removed, errors = watcher.poll()
+				t = time.perf_counter()
+				for f, e in errors:
+					print(f"REJECTED: malformed input file ({f}: {e})", file=sys.stderr)
+				for f in removed:
+					failing.pop(f, None)
+					print(f"[watch] {f} removed", file=sys.stderr)
+				count = 0
+				for f, docs in changed:
+					# only documents still in the file can keep it failing; a file
+					# is listed even if documents were only deleted from it
+					kept = failing.get(f, set()) & watcher.documents(f)
+					for group in chunked(docs, args.batch_size):
+						reports = check_fixtures(group, solver, args, cache, contexts, solved)
+						emit(reports, stats)
+						kept |= {document_key(d) for d, r in zip(group, reports) if r[0]}
+					failing[f] = kept
+					count += len(docs)
+				if count:
+					print(f"[watch] {count} document(s) verified in "
+						  f"{(time.perf_counter() - t) * 1000:.0f} ms; watching "
+						  f"{args.input}", file=sys.stderr, flush=True)
+				time.sleep(args.watch_interval)
+	except KeyboardInterrupt:
+		pass
+	finally:
+		for session in contexts.values():
+			session.close()
+	return int(any(failing.values()))
+
+# Per-process state for --jobs workers, created by _init_worker.
+_worker_args = None
+_worker_solver = None
+_worker_cache = None
+_worker_contexts = None
+_worker_solved = None
+
+def _init_worker(args):
+	global _worker_args, _worker_solver, _worker_cache, _worker_contexts, _worker_solved
+	_worker_args = args
+	_worker_solver = make_solver(args.solver, args.z3, args.timeout, args.rlimit)
+	_worker_solver.statistics = args.stats
+	_worker_cache = open_cache(args)
+	_worker_contexts = open_contexts(args)
+	_worker_solved = {}
+
+def _check_in_worker(group):
+	return check_fixtures(group, _worker_solver, _worker_args, _worker_cache,
+						  _worker_contexts, _worker_solved)
+
+def verify_parallel(fixtures, args, stats=None):
+	"""
+	Spread fixtures over args.jobs worker processes, each with its own
+	warm solver. imap keeps results in input order; a slow fixture only
+	holds back printing, never the other workers, and is bounded by the
+	solver timeout.
+	"""
+	status = 0
+	# Pool.imap feeds tasks as fast as it can read them; the semaphore keeps
+	# at most a few groups per worker in flight so memory stays flat.
+	window = threading.Semaphore(args.jobs * 4)
+	def work():
+		for group in chunked(fixtures, args.batch_size):
+			window.acquire()
+			yield group
+	with multiprocessing.Pool(args.jobs, initializer=_init_worker,
+							  initargs=(args,)) as pool:
+		for reports in pool.imap(_check_in_worker, work()):
+			window.release()
+			status |= emit(reports, stats)
+	return status
 
 if __name__ == "__main__":
 	main()
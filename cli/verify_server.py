@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+# cli/verify_server.py
+
+"""
+Local verification service for CI jobs and pre-commit hooks.
+
+Keeps Python, PyYAML and a pool of warm z3 sessions loaded, and serves
+verify_policies requests over a Unix socket (protocol: see
+verify_client.py). Each connection borrows one pooled worker -- a solver
+plus its --equivalence/--xacml contexts -- so up to --pool requests run
+at once; all of them share one verdict cache and the compiled XACML
+policy sets.
+
+    python verify_server.py --pool 4 &
+    python verify_policies.py -i fixtures/     # now served by the daemon
+"""
+import argparse
+import json
+import os
+import queue
+import signal
+import socket
+import socketserver
+import sys
+import threading
+import time
+from pathlib import Path
+
+import yaml
+
+import verify_policies as vp
+from solver_interface import SOLVER_BACKENDS, SolverSession, make_solver
+from utils import chunked, prefetch
+from verify_client import FORWARDED, SERVER_FIXED, default_socket_path
+from xacml_compiler import XacmlError, compile_policies
+from xml.etree.ElementTree import ParseError
+
+
+class Worker:
+    """A warm solver and the incremental contexts created for it so far."""
+    def __init__(self, config):
+        self.config = config
+        self.solver = make_solver(config.solver, config.z3, config.timeout, config.rlimit)
+        self._contexts = {}
+
+    def contexts(self, args):
+        """Sessions for the checks `args` enables, created on first use."""
+        wanted = [name for name, on in (("equivalence", args.equivalence),
+                                        ("xacml", args.xacml_policies)) if on]
+        for name in wanted:
+            if name not in self._contexts:
+                self._contexts[name] = SolverSession(self.config.z3, args.timeout,
+                                                     self.config.rlimit)
+        return {name: self._contexts[name] for name in wanted}
+
+    def close(self):
+        self.solver.close()
+        for session in self._contexts.values():
+            session.close()
+
+
+class VerifyHandler(socketserver.StreamRequestHandler):
+    def send(self, msg):
+        self.wfile.write(json.dumps(msg).encode() + b"\n")
+        self.wfile.flush()
+
+    def handle(self):
+        try:
+            request = json.loads(self.rfile.readline())
+            args = self.server.request_args(request)
+        except (ValueError, KeyError, TypeError) as e:
+            self.send({"fallback": f"bad request ({e})"})
+            return
+        if isinstance(args, str):
+            self.send({"fallback": args})
+            return
+        worker = self.server.pool.get()
+        try:
+            status = self.verify(args, worker)
+            self.send({"status": status})
+        except (BrokenPipeError, ConnectionResetError):
+            pass        # client went away; the worker is still usable
+        finally:
+            self.server.pool.put(worker)
+
+    def verify(self, args, worker):
+        """verify_policies.run() with output sent over the connection."""
+        args.deadline = (time.monotonic() + args.time_budget
+                         if args.time_budget is not None else None)
+        args.xacml_policies = None
+        if args.xacml:
+            try:
+                args.xacml_policies = compile_policies(args.xacml)
+            except (OSError, ParseError, XacmlError) as e:
+                self.send({"stderr": f"REJECTED: XACML policies ({e})"})
+                return 1
+        contexts = worker.contexts(args)
+        for session in contexts.values():
+            session.timeout = args.timeout
+        worker.solver.timeout = args.timeout
+        status, seen = 0, False
+        solved = {}     # this request's verdict memo, on this worker's solver
+        try:
+            fixtures = prefetch(vp.iter_input(args))
+            for group in chunked(fixtures, args.batch_size):
+                seen = True
+                for failed, lines, _ in vp.check_fixtures(group, worker.solver, args,
+                                                          self.server.cache, contexts,
+                                                          solved):
+                    self.send({"report": {"failed": failed, "lines": lines}})
+                    status |= failed
+        except (OSError, yaml.YAMLError) as e:
+            if isinstance(e, (BrokenPipeError, ConnectionResetError)):
+                raise
+            self.send({"stderr": f"REJECTED: malformed input file ({e})"})
+            return 1
+        if not seen:
+            self.send({"stderr": f"No fixtures found in {args.input}"})
+            return 1
+        return status
+
+
+class VerifyServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path, config):
+        self.config = config
+        self.cache = vp.open_cache(config)
+        self.pool = queue.Queue()
+        for _ in range(config.pool):
+            self.pool.put(Worker(config))
+        super().__init__(str(path), VerifyHandler)
+
+    def request_args(self, request):
+        """
+        verify_policies arguments for a request: the CLI defaults, the
+        request's per-run options, and this server's fixed settings. A
+        string is returned instead when the request needs settings the
+        server was not started with.
+        """
+        options = request["options"]
+        for key in SERVER_FIXED:
+            if options.get(key) != getattr(self.config, key):
+                return f"server runs with {key}={getattr(self.config, key)!r}"
+        args = vp.build_parser().parse_args(["--input", request["input"]])
+        for key in FORWARDED:
+            setattr(args, key, options[key])
+        for key in SERVER_FIXED:
+            setattr(args, key, getattr(self.config, key))
+        return args
+
+    def close_workers(self):
+        while not self.pool.empty():
+            self.pool.get().close()
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    p.add_argument("--socket", default=None,
+                   help=f"Unix socket to listen on (default: {default_socket_path()})")
+    p.add_argument("--pool", type=int, default=os.cpu_count() or 1,
+                   help="Warm solvers, i.e. requests served at once (default: CPUs)")
+    # these must match the client's options for it to use the server
+    p.add_argument("--solver", choices=sorted(SOLVER_BACKENDS), default="session")
+    p.add_argument("--z3", default="z3")
+    p.add_argument("--rlimit", type=int, default=0)
+    p.add_argument("--cache-dir", default=None)
+    p.add_argument("--cache-max-mb", type=int, default=256)
+    p.add_argument("--no-cache", action="store_true")
+    config = p.parse_args()
+    config.timeout = 10
+    if config.cache_dir:
+        config.cache_dir = os.path.abspath(config.cache_dir)
+
+    path = Path(config.socket) if config.socket else default_socket_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if os.path.exists(path):
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(str(path))
+            print(f"verify_server is already running on {path}", file=sys.stderr)
+            sys.exit(1)
+        except OSError:
+            os.unlink(path)         # stale socket from a server that died
+        finally:
+            probe.close()
+
+    server = VerifyServer(path, config)
+    # SIGTERM (e.g. from a CI job's cleanup) shuts down like Ctrl-C
+    signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=server.shutdown).start())
+    print(f"verify_server listening on {path} with {config.pool} warm solver(s)",
+          file=sys.stderr, flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.close_workers()
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+
+if __name__ == "__main__":
+    main()
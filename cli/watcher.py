@@ -0,0 +1,80 @@
+# cli/watcher.py
+
+"""
+Change tracking for verify_policies --watch.
+
+FixtureWatcher polls the fixture tree with os.stat, which for a few
+hundred files takes well under a millisecond, re-parses only files whose
+mtime or size changed, and within those reports only the YAML documents
+that are new or different from the previous version. Documents are
+compared by a canonical JSON key, so reordering or touching a file does
+not trigger any re-verification.
+"""
+import json
+import os
+
+import yaml
+
+from utils import iter_fixture_files
+
+
+def document_key(doc):
+    """Canonical text of a parsed YAML document, for change detection."""
+    return json.dumps(doc, sort_keys=True, default=str)
+
+
+class FixtureWatcher:
+    """
+    Tracks the fixture files under `path`. Each poll() returns
+    (changed, removed, errors):
+      changed: [(file, [documents that are new or were edited])] for
+               every file re-parsed, even if none is: documents may also
+               have been deleted from it (see documents())
+      removed: files that disappeared since the last poll
+      errors:  [(file, exception)] for files that could not be parsed;
+               their previous documents are kept, so fixing the file
+               only re-verifies what actually changed
+    """
+    def __init__(self, path, recursive=True):
+        self.path = path
+        self.recursive = recursive
+        self._stat = {}     # file -> (mtime_ns, size)
+        self._docs = {}     # file -> {document_key}
+
+    def documents(self, f):
+        """Keys (see document_key) of the documents currently in file f."""
+        return self._docs.get(f, set())
+
+    def _snapshot(self):
+        snap = {}
+        for f in iter_fixture_files(self.path, self.recursive):
+            try:
+                st = os.stat(f)
+            except FileNotFoundError:
+                continue        # removed while we were listing
+            snap[f] = (st.st_mtime_ns, st.st_size)
+        return snap
+
+    def poll(self):
+        snap = self._snapshot()
+        changed, errors = [], []
+        for f, sig in snap.items():
+            if self._stat.get(f) == sig:
+                continue
+            self._stat[f] = sig
+            try:
+                with open(f) as fh:
+                    docs = [d for d in yaml.safe_load_all(fh) if d is not None]
+            except (OSError, yaml.YAMLError) as e:
+                errors.append((f, e))
+                continue
+            old = self._docs.get(f, set())
+            keys = [document_key(d) for d in docs]
+            fresh = [d for d, k in zip(docs, keys) if k not in old]
+            self._docs[f] = set(keys)
+            changed.append((f, fresh))
+        removed = [f for f in self._stat if f not in snap]
+        for f in removed:
+            del self._stat[f]
+            self._docs.pop(f, None)
+        return changed, removed, errors
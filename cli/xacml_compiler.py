@@ -0,0 +1,236 @@
+# cli/xacml_compiler.py
+
+"""
+Compile the deployed XACML 3.0 policies (runtime/policies/*.xml) into one
+SMT-LIB encoding of the whole policy set.
+
+Compilation has two steps:
+  - parse_policy() (webhook/xacml_parser.py, shared with the webhook's
+    local PDP) turns a <Policy> or <PolicySet> element into a small
+    intermediate form of tuples, so the XML is only walked once
+  - compile_policies() declares one SMT constant per attribute and emits
+    define-funs for every rule, policy and the root decision, ending in
+    `xacml.permit` and `xacml.deny`
+
+Attributes are modelled as single-valued strings, except those used as a
+bag by string-is-in, which become membership predicates (String -> Bool).
+Missing attributes and Indeterminate results are not modelled: every
+attribute is assumed present. The policy files are combined with
+deny-overrides, like the PDP's root policy set.
+
+Compiled sets are cached by the sha256 of the policy files, so a run
+compiles once however many fixtures or queries use the result.
+"""
+import hashlib
+import sys
+from pathlib import Path
+
+# The XML parsing is shared with the webhook's local PDP, which ships it
+sys.path.append(str(Path(__file__).resolve().parent.parent / "webhook"))
+from xacml_parser import STRING, XacmlError, parse_policy_bytes, policy_files  # noqa: E402,F401
+
+# Combining algorithms by the last segment of their URN (rule- and
+# policy-combining variants share the semantics modelled here).
+COMBINING = ("deny-overrides", "permit-overrides", "first-applicable",
+             "deny-unless-permit", "permit-unless-deny")
+
+# Two-argument string functions: name -> SMT template over the arguments.
+_STRING_FUNCTIONS = {
+    "string-equal": "(= {0} {1})",
+    "string-starts-with": "(str.prefixof {0} {1})",
+    "string-ends-with": "(str.suffixof {0} {1})",
+    "string-contains": "(str.contains {1} {0})",
+}
+
+
+def attribute_symbol(category, attribute_id):
+    """
+    SMT symbol for an attribute, e.g. |resource/urn:k8s:resource:kind|.
+    The category is shortened to its last segment (subject, resource, ...).
+    """
+    short = category.rsplit(":", 1)[-1].replace("access-subject", "subject")
+    return f"|{short}/{attribute_id}|"
+
+
+def smt_string(text):
+    """
+    SMT-LIB string literal for `text`: '"' is doubled, and a backslash or
+    any character outside printable ASCII becomes a \\u{...} escape, so
+    z3 reads back exactly `text` (a literal backslash followed by u{41}
+    would otherwise be the letter A). Every literal built from fixture or
+    policy values goes through here.
+    """
+    out = []
+    for ch in text or "":
+        if ch == '"':
+            out.append('""')
+        elif ch == "\\" or not " " <= ch <= "~":
+            out.append(f"\\u{{{ord(ch):x}}}")
+        else:
+            out.append(ch)
+    return '"' + "".join(out) + '"'
+
+
+def _and(terms):
+    terms = [t for t in terms if t != "true"]
+    if "false" in terms:
+        return "false"
+    if len(terms) < 2:
+        return terms[0] if terms else "true"
+    return f"(and {' '.join(terms)})"
+
+
+def _or(terms):
+    terms = [t for t in terms if t != "false"]
+    if "true" in terms:
+        return "true"
+    if len(terms) < 2:
+        return terms[0] if terms else "false"
+    return f"(or {' '.join(terms)})"
+
+
+def _not(term):
+    return {"true": "false", "false": "true"}.get(term, f"(not {term})")
+
+
+def _algorithm(urn):
+    alg = urn.rsplit(":", 1)[-1]
+    for name in COMBINING:
+        # ordered-deny-overrides etc. behave the same without Indeterminate
+        if alg == name or alg == "ordered-" + name:
+            return name
+    raise XacmlError(f"unsupported combining algorithm {urn!r}")
+
+
+# ──────── intermediate form -> SMT ────────
+
+class CompiledPolicySet:
+    """
+    SMT encoding of a policy set. `smt` declares the attributes (listed in
+    `attributes`: symbol -> "String" or "Bag") and defines xacml.permit and
+    xacml.deny; `digest` identifies the policy files it came from.
+    """
+    def __init__(self, digest, policies):
+        self.digest = digest
+        self.policies = policies
+        self.attributes = {}
+        self._defs = []
+        self._names = set()
+        # defines xacml.permit and xacml.deny
+        self._decision(("policyset", "xacml", "deny-overrides", [], policies))
+        decls = [f"(declare-fun {sym} () String)" if kind == "String"
+                 else f"(declare-fun {sym} (String) Bool)"
+                 for sym, kind in sorted(self.attributes.items())]
+        self.smt = "\n".join(
+            [f"; XACML policy set {digest[:12]}", "(set-logic QF_S)"] + decls + self._defs)
+
+    def _attribute(self, symbol, kind):
+        seen = self.attributes.setdefault(symbol, kind)
+        if seen != kind:
+            raise XacmlError(f"attribute {symbol} used both as a string and as a bag")
+        return symbol
+
+    def _define(self, name, term):
+        base, n = name, 1
+        while name in self._names:
+            n += 1
+            name = f"{base}~{n}"
+        self._names.add(name)
+        symbol = f"|{name}|"
+        self._defs.append(f"(define-fun {symbol} () Bool {term})")
+        return symbol
+
+    def _target(self, target):
+        """AnyOfs conjoined, AllOfs disjoined, Matches conjoined; [] is true."""
+        return _and([_or([_and([self._expr(("apply", fn, [value, attr]))
+                                for _, fn, value, attr in all_of])
+                          for all_of in any_of])
+                     for any_of in target])
+
+    def _expr(self, e):
+        kind = e[0]
+        if kind == "value":
+            if e[1] == STRING:
+                return smt_string(e[2])
+            return "true" if e[2] else "false"
+        if kind == "attr":
+            return self._attribute(attribute_symbol(e[1], e[2]), "String")
+        fn, args = e[1], e[2]
+        if fn in ("and", "or"):
+            terms = [self._expr(x) for x in args]
+            return _and(terms) if fn == "and" else _or(terms)
+        if fn == "not" and len(args) == 1:
+            return _not(self._expr(args[0]))
+        if fn in ("string-one-and-only", "string-bag") and len(args) == 1:
+            return self._expr(args[0])
+        if fn == "string-is-in" and len(args) == 2:
+            value, bag = args
+            if bag[0] != "attr" or value[0] == "attr":
+                raise XacmlError("string-is-in needs a value and one attribute bag")
+            symbol = self._attribute(attribute_symbol(bag[1], bag[2]), "Bag")
+            return f"({symbol} {self._expr(value)})"
+        if fn in _STRING_FUNCTIONS and len(args) == 2:
+            return _STRING_FUNCTIONS[fn].format(*(self._expr(a) for a in args))
+        raise XacmlError(f"unsupported function {fn!r} with {len(args)} argument(s)")
+
+    def _combine(self, algorithm, children):
+        """(permit, deny) terms for the children's (permit, deny) pairs."""
+        any_permit = _or([p for p, _ in children])
+        any_deny = _or([d for _, d in children])
+        if algorithm == "deny-overrides":
+            return _and([_not(any_deny), any_permit]), any_deny
+        if algorithm == "permit-overrides":
+            return any_permit, _and([_not(any_permit), any_deny])
+        if algorithm == "deny-unless-permit":
+            return any_permit, _not(any_permit)
+        if algorithm == "permit-unless-deny":
+            return _not(any_deny), any_deny
+        # first-applicable: the first child with a decision wins
+        permit, deny = "false", "false"
+        for p, d in reversed(children):
+            permit = _or([p, _and([_not(d), permit])])
+            deny = _or([d, _and([_not(p), deny])])
+        return permit, deny
+
+    def _decision(self, node):
+        """Define and return the (permit, deny) symbols of a policy node."""
+        kind, name, algorithm, target, children = node
+        algorithm = _algorithm(algorithm)
+        if kind == "policy":
+            decided = []
+            for rule_id, effect, rule_target, cond in children:
+                applies = self._target(rule_target)
+                if cond is not None:
+                    applies = _and([applies, self._expr(cond)])
+                applies = self._define(f"{name}.{rule_id}", applies)
+                decided.append((applies, "false") if effect == "Permit"
+                               else ("false", applies))
+        else:
+            decided = [self._decision(child) for child in children]
+        applicable = self._target(target)
+        permit, deny = self._combine(algorithm, decided)
+        return (self._define(f"{name}.permit", _and([applicable, permit])),
+                self._define(f"{name}.deny", _and([applicable, deny])))
+
+
+_COMPILED = {}
+
+
+def compile_policies(path):
+    """
+    Compile every policy under `path` into one CompiledPolicySet, reusing
+    an earlier compile of identical files. Raises XacmlError for policies
+    outside the modelled subset and OSError/ParseError for unreadable ones.
+    """
+    files = policy_files(path)
+    if not files:
+        raise XacmlError(f"no XACML policies found in {path}")
+    contents = [f.read_bytes() for f in files]
+    h = hashlib.sha256()
+    for data in contents:
+        h.update(hashlib.sha256(data).digest())
+    digest = h.hexdigest()
+    if digest not in _COMPILED:
+        policies = [parse_policy_bytes(data) for data in contents]
+        _COMPILED[digest] = CompiledPolicySet(digest, policies)
+    return _COMPILED[digest]
@@ -0,0 +1,178 @@
+"""
+AdmissionReview <-> XACML translation shared by the webhook servers
+(main.py on Flask, async_main.py on aiohttp).
+
+A Pod is checked once per distinct image registry across all its
+containers, init containers and ephemeral containers. make_xacml_requests
+returns one individual XACML request per registry. The servers answer
+what they can from the local PDP and the decision cache. They send the
+rest to AuthzForce as a single Multiple Decision Profile request
+(multi_request), whose results response_decisions maps back to the
+individual requests. The Pod is admitted only if every registry is
+permitted.
+"""
+
+IMAGE_REGISTRY = "urn:k8s:resource:imageRegistry"
+CONTAINER_LISTS = ("containers", "initContainers", "ephemeralContainers")
+DEFAULT_REGISTRY = "docker.io"
+
+# Precedence of the non-Permit decisions when combining several
+DECISION_PRECEDENCE = ("Deny", "Indeterminate", "NotApplicable")
+
+
+def image_registry(image):
+    """
+    The registry of an image reference, following the reference grammar
+    of the container runtimes: the first path component is a registry
+    only if it contains "." or ":" (a port) or is "localhost"; otherwise
+    the image is on Docker Hub. Tags and digests are ignored.
+      nginx:1.25                   -> docker.io
+      library/nginx@sha256:...     -> docker.io
+      myregistry.com:5000/app:1    -> myregistry.com:5000
+      localhost/app                -> localhost
+    """
+    name = image.split("@", 1)[0]
+    first, slash, _ = name.partition("/")
+    if not slash or not ("." in first or ":" in first or first == "localhost"):
+        return DEFAULT_REGISTRY
+    registry = first.lower()
+    return DEFAULT_REGISTRY if registry == "index.docker.io" else registry
+
+
+def pod_registries(pod):
+    """The distinct image registries of every container of a Pod, in order."""
+    spec = pod.get("spec") or {}
+    registries = []
+    for field in CONTAINER_LISTS:
+        for container in spec.get(field) or []:
+            if container.get("image"):
+                registry = image_registry(container["image"])
+                if registry not in registries:
+                    registries.append(registry)
+    return registries
+
+
+def make_xacml_requests(ar):
+    """
+    Individual XACML-JSON requests for an AdmissionReview: one per
+    distinct image registry of a Pod being created (or getting ephemeral
+    containers), otherwise exactly one.
+    """
+    req = ar["request"]
+    kind = req["object"]["kind"]
+    namespace = req["requestNamespace"] or ""
+    op = req["operation"].lower()
+    registries = [None]
+    if kind == "Pod" and (op == "create" or req.get("subResource") == "ephemeralcontainers"):
+        registries = pod_registries(req["object"]) or [None]
+    return [_xacml_request(kind, namespace, op, registry) for registry in registries]
+
+
+def _xacml_request(kind, namespace, op, registry):
+    attrs = {
+        "Request": {
+            "AccessSubject": {
+                "attributes": [{
+                    "AttributeId": "urn:k8s:subject:namespace",
+                    "Value": namespace
+                }]
+            },
+            "Action": {
+                "attributes": [{
+                    "AttributeId": "urn:k8s:action:operation",
+                    "Value": op
+                }]
+            },
+            "Resource": {
+                "attributes": [
+                    { "AttributeId": "urn:k8s:resource:kind", "Value": kind }
+                ]
+            },
+            "Environment": { "attributes": [] }
+        }
+    }
+    if registry is not None:
+        # echoed back in the result, to tell a multi-request's results apart
+        attrs["Request"]["Resource"]["attributes"].append({
+            "AttributeId": IMAGE_REGISTRY,
+            "Value": registry,
+            "IncludeInResult": True
+        })
+    return attrs
+
+
+def registry_of(xacml):
+    """The image registry an individual request checks, or None."""
+    for a in xacml["Request"]["Resource"]["attributes"]:
+        if a["AttributeId"] == IMAGE_REGISTRY:
+            return a["Value"]
+    return None
+
+
+def multi_request(xacmls):
+    """
+    Individual requests from make_xacml_requests as one request: with
+    several, the Resource category is repeated (Multiple Decision
+    Profile), one entry per registry; the other categories are shared.
+    """
+    if len(xacmls) == 1:
+        return xacmls[0]
+    request = dict(xacmls[0]["Request"])
+    request["Resource"] = [x["Request"]["Resource"] for x in xacmls]
+    return {"Request": request}
+
+
+def _result_registry(result):
+    for category in result.get("Category") or []:
+        for a in category.get("Attribute") or category.get("attributes") or []:
+            if a.get("AttributeId") == IMAGE_REGISTRY:
+                return a["Value"]
+    return None
+
+
+def response_decisions(body, xacmls):
+    """
+    The decisions of a PDP response to multi_request(xacmls), in the
+    order of xacmls. Results are matched by their echoed image registry;
+    if the PDP echoes none, they are taken in request order. A request
+    left without a result is Indeterminate.
+    """
+    results = body["Response"]
+    if isinstance(results, dict):
+        results = [results]
+    if len(xacmls) == 1 and len(results) == 1:
+        return [results[0]["Decision"]]
+    by_registry = {}
+    for result in results:
+        registry = _result_registry(result)
+        if registry is not None:
+            by_registry[registry] = result["Decision"]
+    if not by_registry and len(results) == len(xacmls):
+        return [result["Decision"] for result in results]
+    return [by_registry.get(registry_of(x), "Indeterminate") for x in xacmls]
+
+
+def review_response(uid, xacmls, decisions):
+    """
+    The AdmissionReview answer: allowed only if every individual request
+    was permitted; a denial names the registries that were not.
+    """
+    allow = all(d == "Permit" for d in decisions)
+    decision = "Permit" if allow else next(
+        d for d in DECISION_PRECEDENCE + tuple(decisions) if d in decisions)
+    message = "Allowed" if allow else f"Denied by ABAC policy: {decision}"
+    denied = [registry_of(x) for x, d in zip(xacmls, decisions) if d != "Permit"]
+    if not allow and any(denied):
+        message += f" (image registry: {', '.join(r for r in denied if r)})"
+    return {
+        "apiVersion": "admission.k8s.io/v1",
+        "kind": "AdmissionReview",
+        "response": {
+            "uid": uid,
+            "allowed": allow,
+            "status": {
+                "code": 403 if not allow else 200,
+                "message": message
+            }
+        }
+    }
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Asyncio serving mode of the webhook (aiohttp), for clusters where bursts
+of admissions (node drains, large rollouts) would queue up behind the
+Flask server's blocking PDP calls.
+
+Every AdmissionReview is handled as a coroutine and the PDP call is
+awaited on a pooled keep-alive aiohttp session, so many reviews can be
+in flight at once. At most MAX_CONCURRENCY PDP calls run at a time; the
+rest wait for a slot. Concurrent reviews with the same attribute set
+share one PDP call. Only failed connects and pooled connections the PDP
+already closed are retried; a read timeout is not. Policy files are
+re-hashed, and the local PDP recompiled, by a background task in a
+worker thread, never on the event loop. On SIGTERM the server stops
+accepting connections and gives in-flight reviews up to
+SHUTDOWN_TIMEOUT seconds to finish before the PDP session is closed.
+
+Same endpoint, local PDP, decision cache and environment variables as
+main.py:
+
+    python async_main.py
+"""
+import asyncio
+import contextlib
+import json
+import os
+import ssl
+import time
+
+import aiohttp
+from aiohttp import web
+
+from admission import make_xacml_requests, multi_request, response_decisions, review_response
+from decision_cache import attribute_key, cache_from_env, policy_version_from_env
+from local_pdp import LocalPdp
+
+PDP_URL = os.getenv("PDP_URL", "https://authzforce-pdp-service.authzforce.svc/services/pdp")
+VERIFY_TLS = os.getenv("VERIFY_TLS", "/etc/webhook/ca.crt")  # CA to trust
+PORT = int(os.getenv("PORT", "8443"))
+# Serving certificate; TLS_CERT="" serves plain HTTP (local benchmarks only)
+TLS_CERT = os.getenv("TLS_CERT", "/etc/webhook/tls.crt")
+TLS_KEY = os.getenv("TLS_KEY", "/etc/webhook/tls.key")
+
+PDP_POOL_SIZE = int(os.getenv("PDP_POOL_SIZE", "10"))
+PDP_CONNECT_TIMEOUT = float(os.getenv("PDP_CONNECT_TIMEOUT", "1"))
+PDP_READ_TIMEOUT = float(os.getenv("PDP_READ_TIMEOUT", "5"))
+PDP_RETRIES = int(os.getenv("PDP_RETRIES", "2"))
+MAX_CONCURRENCY = int(os.getenv("MAX_CONCURRENCY", "100"))
+SHUTDOWN_TIMEOUT = float(os.getenv("SHUTDOWN_TIMEOUT", "20"))
+
+# refreshed by policy_refresh(); the request path only reads the result
+POLICIES = policy_version_from_env(background=True)
+CACHE = cache_from_env(POLICIES)
+LOCAL = LocalPdp(POLICIES.policy_dir, POLICIES, mode=os.getenv("LOCAL_PDP", "on"),
+                 background=True)
+
+# Retried PDP errors: failures to connect (refused or timed out) and a
+# pooled connection the PDP already closed. Read timeouts
+# (SocketTimeoutError) are not.
+RETRIED = (aiohttp.ClientConnectorError, aiohttp.ConnectionTimeoutError,
+           aiohttp.ServerDisconnectedError)
+
+PDP_SESSION = web.AppKey("pdp_session", aiohttp.ClientSession)
+PDP_SLOTS = web.AppKey("pdp_slots", asyncio.Semaphore)
+PENDING = web.AppKey("pending", dict)   # attribute keys -> PDP call in flight
+
+
+async def pdp_session(app):
+    """cleanup_ctx: the pooled PDP session, closed after in-flight reviews end."""
+    tls = ssl.create_default_context(cafile=VERIFY_TLS) if PDP_URL.startswith("https") else None
+    connector = aiohttp.TCPConnector(limit=PDP_POOL_SIZE, ssl=tls)
+    timeout = aiohttp.ClientTimeout(sock_connect=PDP_CONNECT_TIMEOUT,
+                                    sock_read=PDP_READ_TIMEOUT)
+    app[PDP_SESSION] = aiohttp.ClientSession(
+        connector=connector, timeout=timeout,
+        headers={"Content-Type": "application/xacml+json"})
+    app[PDP_SLOTS] = asyncio.Semaphore(MAX_CONCURRENCY)
+    app[PENDING] = {}
+    yield
+    await app[PDP_SESSION].close()
+
+
+def refresh_policies():
+    POLICIES.refresh()
+    LOCAL.refresh()
+
+
+async def policy_refresh(app):
+    """cleanup_ctx: re-hash the policies every POLICIES.interval, in a worker thread."""
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, refresh_policies)
+
+    async def run():
+        while True:
+            await asyncio.sleep(POLICIES.interval)
+            await loop.run_in_executor(None, refresh_policies)
+    task = asyncio.ensure_future(run())
+    yield
+    task.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await task
+
+
+async def query_pdp(app, batch, keys):
+    """
+    One (multi-decision) PDP round trip for a batch of individual
+    requests, retried on RETRIED errors (it is idempotent).
+    """
+    body = json.dumps(multi_request(batch))
+    async with app[PDP_SLOTS]:
+        for attempt in range(PDP_RETRIES + 1):
+            start = time.monotonic()
+            try:
+                async with app[PDP_SESSION].post(PDP_URL, data=body) as resp:
+                    resp.raise_for_status()
+                    result = await resp.json(content_type=None)
+                break
+            except RETRIED as e:
+                # a disconnect after the PDP had the request for a while
+                # is a lost answer, not a stale socket: not worth a retry
+                late = (isinstance(e, aiohttp.ServerDisconnectedError)
+                        and time.monotonic() - start > PDP_CONNECT_TIMEOUT)
+                if attempt == PDP_RETRIES or late:
+                    raise
+                await asyncio.sleep(0.05 * 2 ** attempt)
+    decisions = response_decisions(result, batch)
+    for key, decision in zip(keys, decisions):
+        CACHE.put(key, decision)
+    return decisions
+
+
+async def decide(app, xacmls):
+    """As main.decide, sharing identical in-flight PDP calls."""
+    decisions = [LOCAL.decide(x) for x in xacmls]
+    remote = [i for i, d in enumerate(decisions) if d is None]
+    keys = {i: attribute_key(xacmls[i]) for i in remote}
+    missing = []
+    for i in remote:
+        decisions[i] = CACHE.get(keys[i])
+        if decisions[i] is None:
+            missing.append(i)
+    if missing:
+        pending = app[PENDING]
+        batch_keys = tuple(keys[i] for i in missing)
+        call = pending.get(batch_keys)
+        if call is None:
+            call = asyncio.ensure_future(
+                query_pdp(app, [xacmls[i] for i in missing], batch_keys))
+            pending[batch_keys] = call
+            call.add_done_callback(lambda _: pending.pop(batch_keys, None))
+        # shielded: an API server that hangs up must not cancel a shared call
+        for i, decision in zip(missing, await asyncio.shield(call)):
+            decisions[i] = decision
+    for i in remote:
+        LOCAL.shadow(xacmls[i], decisions[i])
+    return decisions
+
+
+async def validate(request):
+    review = await request.json()
+    xacmls = make_xacml_requests(review)
+    decisions = await decide(request.app, xacmls)
+    return web.json_response(review_response(review["request"]["uid"], xacmls, decisions))
+
+
+def make_app():
+    app = web.Application()
+    app.router.add_post("/validate", validate)
+    app.cleanup_ctx.append(policy_refresh)
+    app.cleanup_ctx.append(pdp_session)
+    return app
+
+
+if __name__ == "__main__":
+    tls = None
+    if TLS_CERT:
+        # TLS key/cert mounted at /etc/webhook/tls.crt, tls.key
+        tls = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        tls.load_cert_chain(TLS_CERT, TLS_KEY)
+    web.run_app(make_app(), host="0.0.0.0", port=PORT, ssl_context=tls,
+                shutdown_timeout=SHUTDOWN_TIMEOUT)
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Decision latency of the in-process evaluator (local_pdp.py) on the
+deployed policies.
+
+Compiles runtime/policies (or --policies) and evaluates a few
+representative XACML-JSON requests --rounds times each, reporting the
+decision and microseconds per evaluation with and without parsing the
+request:
+
+    python benchmarks/bench_local_pdp.py --rounds 100000
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from local_pdp import compile_policy_dir, request_attributes     # noqa: E402
+
+RESOURCE = "urn:oasis:names:tc:xacml:3.0:attribute-category:resource"
+SUBJECT = "urn:oasis:names:tc:xacml:3.0:attribute-category:subject"
+
+
+def request(resource, subject):
+    return {"Request": {"Category": [
+        {"CategoryId": RESOURCE,
+         "Attribute": [{"AttributeId": f"urn:k8s:resource:{k}", "Value": v}
+                       for k, v in resource.items()]},
+        {"CategoryId": SUBJECT,
+         "Attribute": [{"AttributeId": f"urn:k8s:subject:{k}", "Value": v}
+                       for k, v in subject.items()]},
+    ]}}
+
+
+REQUESTS = {
+    "approved image": request({"kind": "Pod", "imageRegistry": "myregistry.com",
+                               "namespace": "team-a"}, {"namespace": "team-a"}),
+    "unapproved image": request({"kind": "Pod", "imageRegistry": "evil.com",
+                                 "namespace": "team-a"}, {"namespace": "team-a"}),
+    "cross-tenant": request({"kind": "ConfigMap", "namespace": "team-b"},
+                            {"namespace": "team-a"}),
+    "wildcard binding": request({"kind": "RoleBinding", "roleRefName": "cluster-admin",
+                                 "namespace": "team-a"},
+                                {"namespace": "team-a", "groups": ["dev"]}),
+}
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    p.add_argument("--policies", default=str(Path(__file__).resolve().parents[2]
+                                             / "runtime" / "policies"))
+    p.add_argument("--rounds", type=int, default=100000)
+    args = p.parse_args()
+
+    t0 = time.perf_counter()
+    decide = compile_policy_dir(args.policies)
+    print(f"compiled {args.policies} in {(time.perf_counter() - t0) * 1000:.1f} ms")
+    print(f"{'request':18} {'decision':14} {'eval us':>8} {'parse+eval us':>14}")
+    for name, xacml in REQUESTS.items():
+        attrs = request_attributes(xacml)
+        t0 = time.perf_counter()
+        for _ in range(args.rounds):
+            decision = decide(attrs)
+        t1 = time.perf_counter()
+        for _ in range(args.rounds):
+            decide(request_attributes(xacml))
+        t2 = time.perf_counter()
+        print(f"{name:18} {decision:14} {(t1 - t0) / args.rounds * 1e6:>8.2f} "
+              f"{(t2 - t1) / args.rounds * 1e6:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Admission throughput of the Flask server (main.py) vs the asyncio server
+(async_main.py).
+
+Starts a stand-in PDP that answers Permit after --pdp-latency ms, runs
+each server against it over plain HTTP with the decision cache and the
+local PDP disabled, and sends --requests AdmissionReviews from
+--concurrency client threads (every review has its own namespace, so
+none is answered from the cache or shares a PDP call). Prints throughput and latency percentiles:
+
+    python benchmarks/bench_servers.py --requests 2000 --concurrency 64
+"""
+import argparse
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+WEBHOOK = Path(__file__).resolve().parent.parent
+SERVERS = {"flask": "main.py", "async": "async_main.py"}
+
+
+class FakePdp(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"       # keep-alive, like the nginx sidecar
+    latency = 0.0
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        time.sleep(self.latency)
+        body = json.dumps({"Response": {"Decision": "Permit"}}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/xacml+json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for_port(port, proc, timeout=15):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"server exited with {proc.returncode}")
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f"server did not listen on {port}")
+
+
+def review(i):
+    return json.dumps({"request": {
+        "uid": f"uid-{i}", "operation": "CREATE", "requestNamespace": f"ns-{i}",
+        "object": {"kind": "Pod", "spec": {"containers": [{"image": "registry.local/app:1"}]}},
+    }}).encode()
+
+
+def run_load(port, n, concurrency):
+    """Send n reviews over `concurrency` keep-alive connections; returns latencies."""
+    local = threading.local()
+
+    def send(i):
+        if not hasattr(local, "conn"):
+            local.conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        t0 = time.perf_counter()
+        local.conn.request("POST", "/validate", body=review(i),
+                           headers={"Content-Type": "application/json"})
+        resp = local.conn.getresponse()
+        body = resp.read()
+        if resp.status != 200 or not json.loads(body)["response"]["allowed"]:
+            raise RuntimeError(f"unexpected answer {resp.status}: {body[:200]!r}")
+        return time.perf_counter() - t0
+
+    with ThreadPoolExecutor(concurrency) as pool:
+        return list(pool.map(send, range(n)))
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    p.add_argument("--servers", nargs="+", choices=sorted(SERVERS), default=["flask", "async"])
+    p.add_argument("--requests", type=int, default=2000)
+    p.add_argument("--concurrency", type=int, default=64)
+    p.add_argument("--pdp-latency", type=float, default=5.0,
+                   help="Milliseconds the stand-in PDP takes per decision (default: 5)")
+    p.add_argument("--json", help="Also write the rows to this JSON file")
+    args = p.parse_args()
+
+    FakePdp.latency = args.pdp_latency / 1000
+    pdp = ThreadingHTTPServer(("127.0.0.1", 0), FakePdp)
+    pdp.daemon_threads = True
+    threading.Thread(target=pdp.serve_forever, daemon=True).start()
+
+    rows = []
+    print(f"{'server':8} {'requests':>8} {'conc':>5} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8}")
+    for name in args.servers:
+        port = free_port()
+        env = dict(os.environ, PORT=str(port), TLS_CERT="", DECISION_CACHE_SIZE="0",
+                   LOCAL_PDP="off",
+                   PDP_URL=f"http://127.0.0.1:{pdp.server_address[1]}/services/pdp",
+                   PDP_POOL_SIZE=str(args.concurrency),
+                   MAX_CONCURRENCY=str(args.concurrency))
+        proc = subprocess.Popen([sys.executable, SERVERS[name]], cwd=WEBHOOK, env=env,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            wait_for_port(port, proc)
+            run_load(port, min(100, args.requests), args.concurrency)     # warm-up
+            t0 = time.perf_counter()
+            latencies = sorted(run_load(port, args.requests, args.concurrency))
+            elapsed = time.perf_counter() - t0
+        finally:
+            proc.terminate()
+            proc.wait()
+        row = dict(server=name, requests=args.requests, concurrency=args.concurrency,
+                   pdp_latency_ms=args.pdp_latency, rps=args.requests / elapsed,
+                   p50_ms=latencies[len(latencies) // 2] * 1000,
+                   p99_ms=latencies[int(len(latencies) * 0.99) - 1] * 1000)
+        rows.append(row)
+        print(f"{name:8} {args.requests:>8} {args.concurrency:>5} {row['rps']:>9.0f} "
+              f"{row['p50_ms']:>8.1f} {row['p99_ms']:>8.1f}", flush=True)
+    pdp.shutdown()
+    if args.json:
+        Path(args.json).write_text(json.dumps(rows, indent=2))
+
+
+if __name__ == "__main__":
+    main()
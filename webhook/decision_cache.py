@@ -0,0 +1,149 @@
+"""
+In-process cache of PDP decisions for the admission webhook.
+
+A decision depends only on the attributes of the XACML request, so the
+cache is keyed on those (order-independent, see attribute_key). Entries
+expire after a TTL that differs for Permit and Deny, the least recently
+used entry is evicted beyond max_size, and the whole cache is dropped
+when the policy version changes.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Only definitive decisions are cached; NotApplicable/Indeterminate always
+# go back to the PDP.
+CACHED_DECISIONS = ("Permit", "Deny")
+
+
+def attribute_key(xacml):
+    """Order-independent key of a XACML-JSON request's attributes."""
+    attrs = []
+    for category, body in xacml["Request"].items():
+        for entries in body if isinstance(body, list) else [body]:
+            for a in entries.get("attributes", []):
+                attrs.append((category, a["AttributeId"],
+                              json.dumps(a["Value"], sort_keys=True)))
+    return tuple(sorted(attrs))
+
+
+class PolicyVersion:
+    """
+    Version of the deployed policies: POLICY_VERSION if set, otherwise a
+    digest of the policy files in `policy_dir` (the authzforce-policies
+    ConfigMap mounted into the webhook). The directory is re-hashed at
+    most every `interval` seconds, so a ConfigMap update is picked up
+    shortly after the kubelet syncs it. With `background`, calls never
+    hash: they return the version of the last refresh(), which the
+    caller runs periodically off the request path.
+    """
+    def __init__(self, policy_dir=None, fixed="", interval=10.0, background=False):
+        self.policy_dir = policy_dir
+        self.fixed = fixed
+        self.interval = interval
+        self.background = background
+        self._checked = None
+        self._version = fixed
+        self._lock = threading.Lock()
+
+    def _digest(self):
+        h = hashlib.sha256()
+        try:
+            names = sorted(n for n in os.listdir(self.policy_dir) if n.endswith(".xml"))
+            for name in names:
+                with open(os.path.join(self.policy_dir, name), "rb") as f:
+                    h.update(name.encode() + b"\0" + f.read())
+        except OSError:
+            return ""
+        return h.hexdigest()
+
+    def refresh(self):
+        """Re-hash the policy files now."""
+        if self.fixed or not self.policy_dir:
+            return
+        version = self._digest()
+        with self._lock:
+            self._version = version
+            self._checked = time.monotonic()
+
+    def __call__(self):
+        if self.fixed or not self.policy_dir:
+            return self.fixed
+        if self.background:
+            return self._version
+        now = time.monotonic()
+        with self._lock:
+            if self._checked is None or now - self._checked >= self.interval:
+                self._version = self._digest()
+                self._checked = now
+            return self._version
+
+
+class DecisionCache:
+    """
+    Thread-safe LRU of decisions with per-decision TTLs. `version` is a
+    callable returning the current policy version; a change empties the
+    cache. max_size 0 disables caching.
+    """
+    def __init__(self, max_size=10000, permit_ttl=60.0, deny_ttl=10.0, version=None):
+        self.max_size = max_size
+        self.ttl = {"Permit": permit_ttl, "Deny": deny_ttl}
+        self.version = version or (lambda: "")
+        self.hits = self.misses = 0
+        self._entries = OrderedDict()   # key -> (decision, expires)
+        self._version = None
+        self._lock = threading.Lock()
+
+    def _check_version(self):
+        version = self.version()
+        if version != self._version:
+            self._entries.clear()
+            self._version = version
+
+    def get(self, key):
+        """The cached decision for key, or None."""
+        if not self.max_size:
+            return None
+        with self._lock:
+            self._check_version()
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, decision):
+        if not self.max_size or decision not in CACHED_DECISIONS:
+            return
+        ttl = self.ttl[decision]
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._check_version()
+            self._entries[key] = (decision, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+
+def policy_version_from_env(background=False):
+    """The PolicyVersion of POLICY_DIR (or the pinned POLICY_VERSION)."""
+    return PolicyVersion(os.getenv("POLICY_DIR", "/etc/abac/policies"),
+                         fixed=os.getenv("POLICY_VERSION", ""), background=background)
+
+
+def cache_from_env(version=None):
+    """The webhook's DecisionCache, configured from DECISION_CACHE_* etc."""
+    return DecisionCache(
+        max_size=int(os.getenv("DECISION_CACHE_SIZE", "10000")),
+        permit_ttl=float(os.getenv("DECISION_CACHE_PERMIT_TTL", "60")),
+        deny_ttl=float(os.getenv("DECISION_CACHE_DENY_TTL", "10")),
+        version=version or policy_version_from_env(),
+    )
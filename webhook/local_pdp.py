@@ -0,0 +1,462 @@
+"""
+In-process evaluator for the XACML policies the webhook enforces.
+
+The policy files (the authzforce-policies ConfigMap mounted at POLICY_DIR)
+are parsed by xacml_parser.py, the parser the CLI's xacml_compiler.py
+uses too, and the result is compiled once into nested Python closures and re-compiled when their
+digest changes. A decision then takes microseconds instead of a round trip
+to AuthzForce. The files are combined with deny-overrides, like the CLI's
+xacml_compiler.py.
+
+Only a subset of XACML 3.0 is compiled:
+  - string and boolean AttributeValues and AttributeDesignators
+  - string-equal, string-starts-with, string-ends-with, string-contains,
+    string-is-in, string-one-and-only, boolean-equal, and, or, not
+  - the deny-overrides, permit-overrides (also ordered- and legacy 1.0
+    rule-combining), first-applicable, deny-unless-permit and
+    permit-unless-deny combining algorithms
+Evaluation follows the standard: designators return bags, a missing
+attribute is an empty bag (Indeterminate if MustBePresent), and errors
+propagate as the extended Indeterminate values of section 7.10. A bag used
+where a single value is expected is treated as string-one-and-only of it.
+
+The remote PDP stays authoritative for everything else. A policy set with
+an unsupported construct disables local evaluation entirely. A request the
+evaluator cannot read (e.g. a Multiple Decision request), or one that
+evaluates to NotApplicable or Indeterminate, is sent to AuthzForce.
+
+LocalPdp has three modes (LOCAL_PDP): "on" answers Permit/Deny locally,
+"shadow" always asks the remote PDP and logs every request on which the
+two disagree, "off" disables the evaluator.
+"""
+import json
+import logging
+import threading
+import xml.etree.ElementTree as ET
+
+from xacml_parser import BOOLEAN, STRING, XacmlError, parse_policy_bytes, policy_files
+
+log = logging.getLogger(__name__)
+
+# Category shorthands of the XACML JSON profile
+CATEGORIES = {
+    "AccessSubject": "urn:oasis:names:tc:xacml:1.0:subject-category:access-subject",
+    "Action": "urn:oasis:names:tc:xacml:3.0:attribute-category:action",
+    "Resource": "urn:oasis:names:tc:xacml:3.0:attribute-category:resource",
+    "Environment": "urn:oasis:names:tc:xacml:3.0:attribute-category:environment",
+    "RecipientSubject": "urn:oasis:names:tc:xacml:1.0:subject-category:recipient-subject",
+    "IntermediarySubject": "urn:oasis:names:tc:xacml:1.0:subject-category:intermediary-subject",
+    "Codebase": "urn:oasis:names:tc:xacml:1.0:subject-category:codebase",
+    "RequestingMachine": "urn:oasis:names:tc:xacml:1.0:subject-category:requesting-machine",
+}
+# Request members that do not change the decision
+REQUEST_FLAGS = ("ReturnPolicyIdList", "CombinedDecision", "XPathVersion")
+
+PERMIT, DENY = "Permit", "Deny"
+NOT_APPLICABLE, INDETERMINATE = "NotApplicable", "Indeterminate"
+IND_D, IND_P, IND_DP = "Indeterminate{D}", "Indeterminate{P}", "Indeterminate{DP}"
+
+
+class Unsupported(XacmlError):
+    """A policy or request outside the subset evaluated in-process."""
+
+
+class _Indeterminate(Exception):
+    """An expression could not be evaluated (missing attribute, bag size)."""
+
+
+# ──────── requests ────────
+
+def _json_datatype(value, datatype):
+    if datatype:
+        # the JSON profile allows "string" for "...XMLSchema#string"
+        return datatype if ":" in datatype else "http://www.w3.org/2001/XMLSchema#" + datatype
+    if isinstance(value, bool):
+        return BOOLEAN
+    if isinstance(value, str):
+        return STRING
+    return None         # numbers etc.: never matched by a supported designator
+
+
+def request_attributes(xacml):
+    """
+    {(category, attribute id, data type): bag tuple} of a XACML-JSON
+    request; both `Attribute` (JSON profile) and `attributes` (what
+    admission.make_xacml_requests emits) lists are read.
+    """
+    try:
+        categories = []
+        for name, body in xacml["Request"].items():
+            if name in REQUEST_FLAGS:
+                continue
+            if name == "Category":
+                categories += [(entry["CategoryId"], entry) for entry in body]
+            elif name in CATEGORIES:
+                entries = body if isinstance(body, list) else [body]
+                categories += [(CATEGORIES[name], entry) for entry in entries]
+            else:
+                raise Unsupported(f"request member {name!r}")
+        if len({category for category, _ in categories}) != len(categories):
+            raise Unsupported("Multiple Decision request")
+        bags = {}
+        for category, entry in categories:
+            for a in entry.get("Attribute", entry.get("attributes", [])):
+                values = a["Value"] if isinstance(a["Value"], list) else [a["Value"]]
+                for value in values:
+                    key = (category, a["AttributeId"], _json_datatype(value, a.get("DataType")))
+                    bags.setdefault(key, []).append(value)
+    except (KeyError, TypeError, AttributeError) as e:
+        raise Unsupported(f"malformed XACML-JSON request ({e!r})") from None
+    return {key: tuple(values) for key, values in bags.items()}
+
+
+# ──────── expressions ────────
+# Compiled expressions are (evaluate(attrs), type) with type "string",
+# "boolean", "bag:string" or "bag:boolean"; evaluate raises _Indeterminate.
+
+def _all(fns, attrs):
+    """Three-valued conjunction: False wins over Indeterminate."""
+    error = None
+    for fn in fns:
+        try:
+            if not fn(attrs):
+                return False
+        except _Indeterminate as e:
+            error = e
+    if error:
+        raise error
+    return True
+
+
+def _any(fns, attrs):
+    """Three-valued disjunction: True wins over Indeterminate."""
+    error = None
+    for fn in fns:
+        try:
+            if fn(attrs):
+                return True
+        except _Indeterminate as e:
+            error = e
+    if error:
+        raise error
+    return False
+
+
+def _one_and_only(bag_fn):
+    def one_and_only(attrs):
+        bag = bag_fn(attrs)
+        if len(bag) != 1:
+            raise _Indeterminate(f"expected one value, got a bag of {len(bag)}")
+        return bag[0]
+    return one_and_only
+
+
+def _single(compiled, kind):
+    """A compiled expression as a single `kind` value."""
+    fn, have = compiled
+    if have == kind:
+        return fn
+    if have == "bag:" + kind:
+        return _one_and_only(fn)
+    raise Unsupported(f"expected a {kind}, got {have}")
+
+
+_KIND = {STRING: "string", BOOLEAN: "boolean"}
+
+
+def _designator(category, attribute_id, datatype, must_be_present):
+    key = (category, attribute_id, datatype)
+
+    def designator(attrs):
+        bag = attrs.get(key, ())
+        if must_be_present and not bag:
+            raise _Indeterminate(f"missing attribute {attribute_id}")
+        return bag
+    return designator, "bag:" + _KIND[datatype]
+
+
+# Two-argument functions on single values: name -> (argument type, fn)
+_BINARY = {
+    "string-equal": ("string", lambda a, b: a == b),
+    "string-starts-with": ("string", lambda a, b: b.startswith(a)),
+    "string-ends-with": ("string", lambda a, b: b.endswith(a)),
+    "string-contains": ("string", lambda a, b: a in b),
+    "boolean-equal": ("boolean", lambda a, b: a == b),
+}
+
+
+def _apply(fn_name, args):
+    if fn_name in ("and", "or"):
+        fns = [_single(a, "boolean") for a in args]
+        combine = _all if fn_name == "and" else _any
+        return (lambda attrs: combine(fns, attrs)), "boolean"
+    if fn_name == "not" and len(args) == 1:
+        fn = _single(args[0], "boolean")
+        return (lambda attrs: not fn(attrs)), "boolean"
+    if fn_name in ("string-one-and-only", "boolean-one-and-only") and len(args) == 1:
+        kind = fn_name.split("-")[0]
+        return _single(args[0], kind), kind
+    if fn_name == "string-is-in" and len(args) == 2:
+        value, (bag, kind) = _single(args[0], "string"), args[1]
+        if kind != "bag:string":
+            raise Unsupported("string-is-in needs a string bag")
+        return (lambda attrs: value(attrs) in bag(attrs)), "boolean"
+    if fn_name in _BINARY and len(args) == 2:
+        kind, op = _BINARY[fn_name]
+        a, b = (_single(arg, kind) for arg in args)
+        return (lambda attrs: op(a(attrs), b(attrs))), "boolean"
+    raise Unsupported(f"function {fn_name!r} with {len(args)} argument(s)")
+
+
+def _expression(e):
+    """Compile an xacml_parser expression."""
+    if e[0] == "value":
+        value = e[2]
+        return (lambda attrs: value), _KIND[e[1]]
+    if e[0] == "attr":
+        return _designator(*e[1:])
+    return _apply(e[1], [_expression(arg) for arg in e[2]])
+
+
+# ──────── targets, rules, policies ────────
+
+def _match(match):
+    """A Match: true if the function holds for the value and any bag member."""
+    _, fn_name, value, designator = match
+    if fn_name not in _BINARY:
+        raise Unsupported(f"Match function {fn_name!r}")
+    kind, op = _BINARY[fn_name]
+    value = _single(_expression(value), kind)
+    bag, bag_kind = _expression(designator)
+    if bag_kind != "bag:" + kind:
+        raise Unsupported(f"Match function {fn_name!r} on a {bag_kind}")
+    return lambda attrs: any(op(value(attrs), v) for v in bag(attrs))
+
+
+def _target(target):
+    """True (match) / False (no match) / raises _Indeterminate; empty matches."""
+    any_ofs = []
+    for any_of in target:
+        all_ofs = []
+        for all_of in any_of:
+            matches = [_match(m) for m in all_of]
+            all_ofs.append(lambda attrs, matches=matches: _all(matches, attrs))
+        any_ofs.append(lambda attrs, all_ofs=all_ofs: _any(all_ofs, attrs))
+    return lambda attrs: _all(any_ofs, attrs)
+
+
+def _rule(rule_id, effect, target, condition):
+    target = _target(target)
+    if condition is not None:
+        condition = _single(_expression(condition), "boolean")
+    indeterminate = IND_P if effect == PERMIT else IND_D
+
+    def rule(attrs):
+        try:
+            if not target(attrs) or (condition is not None and not condition(attrs)):
+                return NOT_APPLICABLE
+        except _Indeterminate:
+            return indeterminate
+        return effect
+    return rule
+
+
+def _deny_overrides(children, attrs):
+    seen = set()
+    for child in children:
+        decision = child(attrs)
+        if decision == DENY:
+            return DENY
+        seen.add(decision)
+    if IND_DP in seen or (IND_D in seen and (IND_P in seen or PERMIT in seen)):
+        return IND_DP
+    for decision in (IND_D, PERMIT, IND_P):
+        if decision in seen:
+            return decision
+    return NOT_APPLICABLE
+
+
+def _permit_overrides(children, attrs):
+    seen = set()
+    for child in children:
+        decision = child(attrs)
+        if decision == PERMIT:
+            return PERMIT
+        seen.add(decision)
+    if IND_DP in seen or (IND_P in seen and (IND_D in seen or DENY in seen)):
+        return IND_DP
+    for decision in (IND_P, DENY, IND_D):
+        if decision in seen:
+            return decision
+    return NOT_APPLICABLE
+
+
+def _first_applicable(children, attrs):
+    for child in children:
+        decision = child(attrs)
+        if decision != NOT_APPLICABLE:
+            return decision
+    return NOT_APPLICABLE
+
+
+def _deny_unless_permit(children, attrs):
+    return PERMIT if any(child(attrs) == PERMIT for child in children) else DENY
+
+
+def _permit_unless_deny(children, attrs):
+    return DENY if any(child(attrs) == DENY for child in children) else PERMIT
+
+
+def _legacy(combine):
+    """
+    XACML 1.0 rule-combining overrides: same final decision as 3.0, but
+    the Indeterminate is not extended, so assume the widest one.
+    """
+    def legacy(children, attrs):
+        decision = combine(children, attrs)
+        return IND_DP if decision.startswith(INDETERMINATE) else decision
+    return legacy
+
+
+_V3 = "urn:oasis:names:tc:xacml:3.0:"
+_V1 = "urn:oasis:names:tc:xacml:1.0:"
+ALGORITHMS = {}
+for _kind in ("rule", "policy"):
+    ALGORITHMS.update({
+        f"{_V3}{_kind}-combining-algorithm:deny-overrides": _deny_overrides,
+        f"{_V3}{_kind}-combining-algorithm:ordered-deny-overrides": _deny_overrides,
+        f"{_V3}{_kind}-combining-algorithm:permit-overrides": _permit_overrides,
+        f"{_V3}{_kind}-combining-algorithm:ordered-permit-overrides": _permit_overrides,
+        f"{_V3}{_kind}-combining-algorithm:deny-unless-permit": _deny_unless_permit,
+        f"{_V3}{_kind}-combining-algorithm:permit-unless-deny": _permit_unless_deny,
+        f"{_V1}{_kind}-combining-algorithm:first-applicable": _first_applicable,
+    })
+ALGORITHMS.update({
+    f"{_V1}rule-combining-algorithm:deny-overrides": _legacy(_deny_overrides),
+    f"{_V1}rule-combining-algorithm:permit-overrides": _legacy(_permit_overrides),
+    "urn:oasis:names:tc:xacml:1.1:rule-combining-algorithm:ordered-deny-overrides":
+        _legacy(_deny_overrides),
+    "urn:oasis:names:tc:xacml:1.1:rule-combining-algorithm:ordered-permit-overrides":
+        _legacy(_permit_overrides),
+})
+
+
+def _algorithm(urn):
+    if urn not in ALGORITHMS:
+        raise Unsupported(f"combining algorithm {urn!r}")
+    return ALGORITHMS[urn]
+
+
+def compile_policy(node):
+    """An xacml_parser policy or policy set as a function attrs -> decision."""
+    kind, _, algorithm, target, children = node
+    combine = _algorithm(algorithm)
+    target = _target(target)
+    if kind == "policy":
+        children = [_rule(*rule) for rule in children]
+    else:
+        children = [compile_policy(child) for child in children]
+
+    def policy(attrs):
+        try:
+            if not target(attrs):
+                return NOT_APPLICABLE
+            target_error = False
+        except _Indeterminate:
+            target_error = True
+        decision = combine(children, attrs)
+        if target_error:
+            # section 7.13: an Indeterminate target weakens what was decided
+            return {PERMIT: IND_P, DENY: IND_D}.get(decision, decision)
+        return decision
+    return policy
+
+
+def compile_policy_dir(policy_dir):
+    """
+    The *.xml policies in policy_dir combined with deny-overrides, as a
+    function attrs -> Permit/Deny/NotApplicable/Indeterminate. Raises
+    XacmlError, OSError or ET.ParseError.
+    """
+    files = policy_files(policy_dir)
+    if not files:
+        raise Unsupported(f"no XACML policies in {policy_dir}")
+    policies = [compile_policy(parse_policy_bytes(f.read_bytes())) for f in files]
+
+    def decide(attrs):
+        decision = _deny_overrides(policies, attrs)
+        return INDETERMINATE if decision.startswith(INDETERMINATE) else decision
+    return decide
+
+
+class LocalPdp:
+    """
+    The policies of `policy_dir` compiled for in-process evaluation,
+    re-compiled whenever `version()` (a decision_cache.PolicyVersion)
+    changes. Counts locally answered, remotely answered and (in shadow
+    mode) disagreeing requests. With `background`, requests only use the
+    policies compiled by the last refresh(), which the caller runs
+    periodically off the request path (async_main.py).
+    """
+    MODES = ("on", "shadow", "off")
+
+    def __init__(self, policy_dir, version=None, mode="on", background=False):
+        if mode not in self.MODES:
+            raise ValueError(f"LOCAL_PDP must be one of {', '.join(self.MODES)}, got {mode!r}")
+        self.policy_dir = policy_dir
+        self.version = version or (lambda: "")
+        self.mode = mode
+        self.background = background
+        self.local = self.remote = self.disagreements = 0
+        self._decide = None
+        self._version = None
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        """Recompile the policies if their version changed; returns them."""
+        if self.mode == "off":
+            return None
+        version = self.version()
+        with self._lock:
+            if self._version != version:
+                self._version = version
+                try:
+                    self._decide = compile_policy_dir(self.policy_dir)
+                except (OSError, ET.ParseError, XacmlError) as e:
+                    log.warning("local PDP disabled, all decisions go to AuthzForce: %s", e)
+                    self._decide = None
+            return self._decide
+
+    def _policies(self):
+        return self._decide if self.background else self.refresh()
+
+    def evaluate(self, xacml):
+        """The local decision for a XACML-JSON request, or None if it cannot be made."""
+        if self.mode == "off":
+            return None
+        decide = self._policies()
+        if decide is None:
+            return None
+        try:
+            return decide(request_attributes(xacml))
+        except Unsupported:
+            return None
+
+    def decide(self, xacml):
+        """In mode "on", Permit or Deny if decided locally; None: ask AuthzForce."""
+        decision = self.evaluate(xacml) if self.mode == "on" else None
+        if decision in (PERMIT, DENY):
+            self.local += 1
+            return decision
+        self.remote += 1
+        return None
+
+    def shadow(self, xacml, remote):
+        """In mode "shadow", log a request on which local and remote decisions differ."""
+        if self.mode != "shadow":
+            return
+        local = self.evaluate(xacml)
+        if local is not None and local != remote:
+            self.disagreements += 1
+            log.warning("local PDP decided %s, AuthzForce %s: %s",
+                        local, remote, json.dumps(xacml, sort_keys=True))
@@ -1,82 +1,67 @@
 #!/usr/bin/env python3
 import json, os
 from flask import Flask, request, jsonify
-import requests
+
+from admission import make_xacml_requests, multi_request, response_decisions, review_response
+from decision_cache import attribute_key, cache_from_env, policy_version_from_env
+from local_pdp import LocalPdp
+from pdp_client import PdpClient
 
 app = Flask(__name__)
 
 PDP_URL = os.getenv("PDP_URL", "https://authzforce-pdp-service.authzforce.svc/services/pdp")
 VERIFY_TLS = os.getenv("VERIFY_TLS", "/etc/webhook/ca.crt")  # CA to trust
+PORT = int(os.getenv("PORT", "8443"))
+# Serving certificate; TLS_CERT="" serves plain HTTP (local benchmarks only)
+TLS_CERT = os.getenv("TLS_CERT", "/etc/webhook/tls.crt")
+TLS = (TLS_CERT, os.getenv("TLS_KEY", "/etc/webhook/tls.key")) if TLS_CERT else None
+
+# Keep-alive connections to the PDP, shared by all request threads
+PDP = PdpClient(
+    PDP_URL,
+    verify=VERIFY_TLS,
+    pool_size=int(os.getenv("PDP_POOL_SIZE", "10")),
+    connect_timeout=float(os.getenv("PDP_CONNECT_TIMEOUT", "1")),
+    read_timeout=float(os.getenv("PDP_READ_TIMEOUT", "5")),
+    retries=int(os.getenv("PDP_RETRIES", "2")),
+)
+
+# Decisions are cached per attribute set; a policy change empties the cache
+POLICIES = policy_version_from_env()
+CACHE = cache_from_env(POLICIES)
+# The same policies evaluated in-process; AuthzForce answers what it cannot
+LOCAL = LocalPdp(POLICIES.policy_dir, POLICIES, mode=os.getenv("LOCAL_PDP", "on"))
 
-def make_xacml_request(ar):
-    # Build minimal XACML-JSON from AdmissionReview
-    req = ar["request"]
-    kind = req["object"]["kind"]
-    namespace = req["requestNamespace"] or ""
-    op = req["operation"].lower()
-    attrs = {
-        "Request": {
-            "AccessSubject": {
-                "attributes": [{
-                    "AttributeId": "urn:k8s:subject:namespace",
-                    "Value": namespace
-                }]
-            },
-            "Action": {
-                "attributes": [{
-                    "AttributeId": "urn:k8s:action:operation",
-                    "Value": op
-                }]
-            },
-            "Resource": {
-                "attributes": [
-                    { "AttributeId": "urn:k8s:resource:kind", "Value": kind }
-                ]
-            },
-            "Environment": { "attributes": [] }
-        }
-    }
-    # If a Pod creation, extract .spec.containers[].imageRegistry
-    if kind == "Pod" and op == "create":
-        images = [c["image"] for c in req["object"]["spec"]["containers"]]
-        # assume registry is prefix before "/"
-        registry = images[0].split("/")[0]
-        attrs["Request"]["Resource"]["attributes"].append({
-            "AttributeId": "urn:k8s:resource:imageRegistry",
-            "Value": registry
-        })
-    return attrs
+def decide(xacmls):
+    """
+    Decisions for individual XACML requests: from the local PDP, else the
+    cache, else one (multi-decision) PDP call for all that remain.
+    """
+    decisions = [LOCAL.decide(x) for x in xacmls]
+    remote = [i for i, d in enumerate(decisions) if d is None]
+    keys = {i: attribute_key(xacmls[i]) for i in remote}
+    missing = []
+    for i in remote:
+        decisions[i] = CACHE.get(keys[i])
+        if decisions[i] is None:
+            missing.append(i)
+    if missing:
+        # call PDP
+        batch = [xacmls[i] for i in missing]
+        for i, decision in zip(missing, response_decisions(PDP.post(multi_request(batch)), batch)):
+            decisions[i] = decision
+            CACHE.put(keys[i], decision)
+    for i in remote:
+        LOCAL.shadow(xacmls[i], decisions[i])
+    return decisions
 
 @app.route("/validate", methods=["POST"])
 def validate():
     review = request.get_json()
-    xacml = make_xacml_request(review)
-    # call PDP
-    resp = requests.post(
-        PDP_URL,
-        json=xacml,
-        headers={"Content-Type": "application/xacml+json"},
-        verify=VERIFY_TLS
-    )
-    decision = resp.json()["Response"]["Decision"]
-    allow = (decision == "Permit")
-    uid = review["request"]["uid"]
-    return jsonify({
-        "apiVersion": "admission.k8s.io/v1",
-        "kind": "AdmissionReview",
-        "response": {
-            "uid": uid,
-            "allowed": allow,
-            "status": {
-                "code": 403 if not allow else 200,
-                "message": f"Denied by ABAC policy: {decision}" if not allow else "Allowed"
-            }
-        }
-    })
+    xacmls = make_xacml_requests(review)
+    decisions = decide(xacmls)
+    return jsonify(review_response(review["request"]["uid"], xacmls, decisions))
 
 if __name__ == "__main__":
     # TLS key/cert mounted at /etc/webhook/tls.crt, tls.key
-    app.run(host="0.0.0.0", port=8443, ssl_context=(
-        "/etc/webhook/tls.crt",
-        "/etc/webhook/tls.key"
-    ))
+    app.run(host="0.0.0.0", port=PORT, ssl_context=TLS)
@@ -0,0 +1,84 @@
+"""
+Pooled HTTPS client for the AuthzForce PDP.
+
+One requests.Session is shared by every request the webhook serves. Its
+adapter keeps up to `pool_size` keep-alive connections to the PDP's nginx
+sidecar, so a burst of admissions reuses established TLS connections
+instead of handshaking per request. Each call has separate connect and
+read timeouts. Only failures to connect are retried, up to `retries`
+times, and a read timeout is never retried. A pooled socket the PDP
+already closed fails at once; then the session is replaced, which drops
+every pooled socket (e.g. after the PDP pod was rescheduled behind its
+Service), and the request is sent once more. One PDP call thus takes at
+most (retries + 2) * connect_timeout + read_timeout (about 9 s with the
+defaults), which must stay below the webhook's timeoutSeconds (10 s in
+manifests/validating-webhook.yaml).
+"""
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ProtocolError
+from urllib3.util.retry import Retry
+
+XACML_JSON = "application/xacml+json"
+
+
+class PdpClient:
+    def __init__(self, url, verify=True, pool_size=10, connect_timeout=1.0,
+                 read_timeout=5.0, retries=2):
+        self.url = url
+        self.verify = verify
+        self.pool_size = pool_size
+        self.connect_timeout = connect_timeout
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self._lock = threading.Lock()
+        self._session = self._new_session()
+
+    def _new_session(self):
+        session = requests.Session()
+        # connect errors only: read=False re-raises read timeouts and
+        # dropped connections instead of retrying them
+        retry = Retry(total=self.retries, connect=self.retries, read=False,
+                      status=0, allowed_methods=frozenset({"POST"}),
+                      backoff_factor=0.05, raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size,
+                              pool_block=True, max_retries=retry)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers["Content-Type"] = XACML_JSON
+        session.verify = self.verify
+        return session
+
+    def _reconnect(self, broken):
+        """
+        Replace the session unless another thread already did. The old one
+        is not closed: other threads may still be posting on it; it is
+        garbage-collected once they are done.
+        """
+        with self._lock:
+            if self._session is broken:
+                self._session = self._new_session()
+
+    def post(self, xacml):
+        """POST a XACML-JSON request; returns the parsed JSON response."""
+        session = self._session
+        start = time.monotonic()
+        try:
+            resp = session.post(self.url, json=xacml, timeout=self.timeout)
+        except requests.ConnectionError as e:
+            # a stale keep-alive socket fails immediately with a
+            # ProtocolError; anything else (connect retries exhausted, a
+            # connection lost mid-read) is not worth another round
+            stale = e.args and isinstance(e.args[0], ProtocolError)
+            if not stale or time.monotonic() - start > self.connect_timeout:
+                raise
+            self._reconnect(session)
+            resp = self._session.post(self.url, json=xacml, timeout=self.timeout)
+        resp.raise_for_status()
+        return resp.json()
+
+    def close(self):
+        self._session.close()
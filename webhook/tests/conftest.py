@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# the webhook modules are flat scripts, imported by module name
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,147 @@
+"""
+AdmissionReview <-> XACML translation: which registries a Pod is checked
+against, how a multi-decision PDP response is mapped back to them, and
+the admission answer built from the decisions.
+"""
+import pytest
+
+from admission import (image_registry, make_xacml_requests, multi_request, pod_registries,
+                       registry_of, response_decisions, review_response)
+
+DIGEST = "sha256:" + "0" * 64
+
+
+@pytest.mark.parametrize("image, expected", [
+    ("nginx", "docker.io"),
+    ("nginx:1.25", "docker.io"),
+    ("library/nginx", "docker.io"),
+    (f"library/nginx@{DIGEST}", "docker.io"),
+    ("user/repo:tag", "docker.io"),
+    ("myregistry.com:5000/app:1", "myregistry.com:5000"),
+    (f"myregistry.com:5000/app@{DIGEST}", "myregistry.com:5000"),
+    (f"gcr.io/project/image:v1@{DIGEST}", "gcr.io"),
+    ("MyRegistry.com/team/app", "myregistry.com"),
+    ("localhost/app", "localhost"),
+    ("localhost:5000/app", "localhost:5000"),
+    ("index.docker.io/library/nginx", "docker.io"),
+    ("docker.io/library/nginx", "docker.io"),
+    # a registry name without a repository is an image on Docker Hub
+    ("myregistry.com", "docker.io"),
+    ("localhost:5000", "docker.io"),
+])
+def test_image_registry(image, expected):
+    assert image_registry(image) == expected
+
+
+def pod(containers=(), init=(), ephemeral=()):
+    def images(names):
+        return [{"name": f"c{i}", "image": image} for i, image in enumerate(names)]
+    return {"kind": "Pod", "spec": {"containers": images(containers),
+                                    "initContainers": images(init),
+                                    "ephemeralContainers": images(ephemeral)}}
+
+
+@pytest.mark.parametrize("spec, expected", [
+    (pod(["nginx", "redis:7"]), ["docker.io"]),
+    (pod(["a.io/x", "b.io/y", "a.io/z"]), ["a.io", "b.io"]),
+    (pod(["a.io/x"], init=["b.io/init"], ephemeral=["c.io/debug"]),
+     ["a.io", "b.io", "c.io"]),
+    (pod(["b.io/x"], init=["a.io/init", "b.io/init"]), ["b.io", "a.io"]),
+    (pod(["index.docker.io/library/nginx", "nginx"]), ["docker.io"]),
+    ({"kind": "Pod", "spec": {"containers": [{"name": "c"}], "initContainers": None}}, []),
+    ({"kind": "Pod"}, []),
+])
+def test_pod_registries(spec, expected):
+    assert pod_registries(spec) == expected
+
+
+def review(obj, operation="CREATE", sub_resource=None):
+    request = {"uid": "u1", "operation": operation, "requestNamespace": "team-a",
+               "object": obj}
+    if sub_resource:
+        request["subResource"] = sub_resource
+    return {"request": request}
+
+
+@pytest.mark.parametrize("ar, expected", [
+    (review(pod(["a.io/x", "b.io/y"])), ["a.io", "b.io"]),
+    (review(pod(["a.io/x"]), "UPDATE"), [None]),
+    (review(pod(["a.io/x"], ephemeral=["c.io/debug"]), "UPDATE", "ephemeralcontainers"),
+     ["a.io", "c.io"]),
+    (review({"kind": "Pod", "spec": {}}), [None]),
+    (review({"kind": "ConfigMap"}), [None]),
+])
+def test_make_xacml_requests(ar, expected):
+    assert [registry_of(x) for x in make_xacml_requests(ar)] == expected
+
+
+def requests(*registries):
+    return make_xacml_requests(review(pod([f"{r}/app" for r in registries])))
+
+
+def test_multi_request_repeats_only_the_resource():
+    xacmls = requests("a.io", "b.io")
+    request = multi_request(xacmls)["Request"]
+    assert request["Resource"] == [x["Request"]["Resource"] for x in xacmls]
+    assert request["AccessSubject"] == xacmls[0]["Request"]["AccessSubject"]
+    assert multi_request(xacmls[:1]) is xacmls[0]
+
+
+def result(decision, registry=None):
+    if registry is None:
+        return {"Decision": decision}
+    return {"Decision": decision, "Category": [{
+        "CategoryId": "urn:oasis:names:tc:xacml:3.0:attribute-category:resource",
+        "Attribute": [{"AttributeId": "urn:k8s:resource:imageRegistry",
+                       "Value": registry}]}]}
+
+
+@pytest.mark.parametrize("registries, response, expected", [
+    # a single request may be answered by a bare result object
+    (["a.io"], result("Permit"), ["Permit"]),
+    (["a.io"], [result("Deny")], ["Deny"]),
+    # echoed registries are matched whatever order the results come in
+    (["a.io", "b.io"], [result("Deny", "b.io"), result("Permit", "a.io")],
+     ["Permit", "Deny"]),
+    # nothing echoed, one result per request: taken in request order
+    (["a.io", "b.io"], [result("Permit"), result("Deny")], ["Permit", "Deny"]),
+    # a request without a result is Indeterminate
+    (["a.io", "b.io"], [result("Permit", "a.io")], ["Permit", "Indeterminate"]),
+    (["a.io", "b.io"], [result("Permit")], ["Indeterminate", "Indeterminate"]),
+    (["a.io", "b.io", "c.io"], [result("Permit", "c.io"), result("Permit")],
+     ["Indeterminate", "Indeterminate", "Permit"]),
+])
+def test_response_decisions(registries, response, expected):
+    assert response_decisions({"Response": response}, requests(*registries)) == expected
+
+
+@pytest.mark.parametrize("decisions, allowed, message", [
+    (["Permit", "Permit"], True, "Allowed"),
+    (["Permit", "Deny"], False, "Denied by ABAC policy: Deny (image registry: b.io)"),
+    (["NotApplicable", "Indeterminate"], False,
+     "Denied by ABAC policy: Indeterminate (image registry: a.io, b.io)"),
+    (["Indeterminate", "Deny"], False,
+     "Denied by ABAC policy: Deny (image registry: a.io, b.io)"),
+    (["NotApplicable", "Permit"], False,
+     "Denied by ABAC policy: NotApplicable (image registry: a.io)"),
+])
+def test_review_response(decisions, allowed, message):
+    response = review_response("u1", requests("a.io", "b.io"), decisions)["response"]
+    assert response["uid"] == "u1"
+    assert response["allowed"] is allowed
+    assert response["status"] == {"code": 200 if allowed else 403, "message": message}
+
+
+def test_review_response_without_a_registry():
+    xacmls = make_xacml_requests(review({"kind": "ConfigMap"}))
+    response = review_response("u1", xacmls, ["Deny"])["response"]
+    assert response["status"]["message"] == "Denied by ABAC policy: Deny"
+
+
+def test_missing_result_is_denied():
+    xacmls = requests("a.io", "b.io")
+    decisions = response_decisions({"Response": [result("Permit", "a.io")]}, xacmls)
+    response = review_response("u1", xacmls, decisions)["response"]
+    assert response["allowed"] is False
+    assert response["status"]["message"] == \
+        "Denied by ABAC policy: Indeterminate (image registry: b.io)"
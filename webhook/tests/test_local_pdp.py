@@ -0,0 +1,222 @@
+"""
+Decisions of the in-process evaluator: the XACML 3.0 bag, Indeterminate
+and combining-algorithm semantics it must share with AuthzForce, since
+its Permit/Deny answers are used without asking the remote PDP.
+"""
+import logging
+from pathlib import Path
+
+import pytest
+
+import local_pdp
+from local_pdp import (DENY, IND_D, IND_DP, IND_P, INDETERMINATE, NOT_APPLICABLE, PERMIT,
+                       LocalPdp, Unsupported, compile_policy_dir, request_attributes)
+
+RUNTIME_POLICIES = Path(__file__).resolve().parents[2] / "runtime" / "policies"
+
+RESOURCE = "urn:oasis:names:tc:xacml:3.0:attribute-category:resource"
+SUBJECT = "urn:oasis:names:tc:xacml:3.0:attribute-category:subject"
+STRING = "http://www.w3.org/2001/XMLSchema#string"
+ALG = "urn:oasis:names:tc:xacml:3.0:rule-combining-algorithm:"
+
+
+def designator(attribute, category=RESOURCE, must_be_present=False):
+    must = ' MustBePresent="true"' if must_be_present else ""
+    return (f'<AttributeDesignator Category="{category}" AttributeId="{attribute}" '
+            f'DataType="{STRING}"{must}/>')
+
+
+def value(text):
+    return f'<AttributeValue DataType="{STRING}">{text}</AttributeValue>'
+
+
+def equal(*args):
+    return ('<Apply FunctionId="urn:oasis:names:tc:xacml:1.0:function:string-equal">'
+            + "".join(args) + "</Apply>")
+
+
+def rule(rule_id, effect, condition=None):
+    body = f"<Condition>{condition}</Condition>" if condition else ""
+    return f'<Rule RuleId="{rule_id}" Effect="{effect}">{body}</Rule>'
+
+
+def kind_target(kind):
+    return ('<Target><AnyOf><AllOf>'
+            '<Match MatchId="urn:oasis:names:tc:xacml:1.0:function:string-equal">'
+            f'{value(kind)}{designator("kind")}</Match>'
+            '</AllOf></AnyOf></Target>')
+
+
+def policy(policy_id, rules, algorithm="deny-overrides", target=""):
+    return ('<Policy xmlns="urn:oasis:names:tc:xacml:3.0:core:schema:wd-17" '
+            f'PolicyId="{policy_id}" RuleCombiningAlgId="{ALG}{algorithm}">'
+            + target + "".join(rules) + "</Policy>")
+
+
+def compile_policies(tmp_path, *policies):
+    for i, text in enumerate(policies):
+        (tmp_path / f"p{i}.xml").write_text(text)
+    return compile_policy_dir(tmp_path)
+
+
+def request(resource=None, subject=None):
+    categories = []
+    for category, attrs in ((RESOURCE, resource), (SUBJECT, subject)):
+        if attrs:
+            categories.append({"CategoryId": category, "Attribute": [
+                {"AttributeId": k, "Value": v} for k, v in attrs.items()]})
+    return {"Request": {"Category": categories}}
+
+
+def decide(compiled, xacml):
+    return compiled(request_attributes(xacml))
+
+
+# ──────── combining algorithms ────────
+
+def children(*decisions):
+    return [lambda attrs, d=d: d for d in decisions]
+
+
+@pytest.mark.parametrize("decisions, expected", [
+    ((), NOT_APPLICABLE),
+    ((NOT_APPLICABLE, PERMIT), PERMIT),
+    ((PERMIT, DENY), DENY),
+    ((IND_DP, DENY), DENY),
+    ((PERMIT, IND_P), PERMIT),
+    ((PERMIT, IND_D), IND_DP),
+    ((IND_P, IND_D), IND_DP),
+    ((IND_D, NOT_APPLICABLE), IND_D),
+    ((IND_P, NOT_APPLICABLE), IND_P),
+    ((IND_DP, PERMIT), IND_DP),
+])
+def test_deny_overrides(decisions, expected):
+    assert local_pdp._deny_overrides(children(*decisions), {}) == expected
+
+
+@pytest.mark.parametrize("decisions, expected", [
+    ((DENY, PERMIT), PERMIT),
+    ((DENY, IND_D), DENY),
+    ((DENY, IND_P), IND_DP),
+    ((IND_D, NOT_APPLICABLE), IND_D),
+    ((IND_DP, PERMIT), PERMIT),
+])
+def test_permit_overrides(decisions, expected):
+    assert local_pdp._permit_overrides(children(*decisions), {}) == expected
+
+
+def test_first_applicable_keeps_the_first_indeterminate():
+    assert local_pdp._first_applicable(children(NOT_APPLICABLE, IND_D, PERMIT), {}) == IND_D
+
+
+def test_legacy_rule_combining_widens_indeterminate():
+    legacy = local_pdp.ALGORITHMS[
+        "urn:oasis:names:tc:xacml:1.0:rule-combining-algorithm:deny-overrides"]
+    assert legacy(children(IND_P), {}) == IND_DP
+    assert legacy(children(IND_P, PERMIT), {}) == PERMIT
+
+
+# ──────── Indeterminate from attributes ────────
+
+def test_missing_attribute_makes_a_deny_rule_indeterminate(tmp_path):
+    # the condition needs exactly one namespace: an empty bag is an error
+    compiled = compile_policies(tmp_path, policy("p", [
+        rule("deny", "Deny", '<Apply FunctionId="urn:oasis:names:tc:xacml:1.0:function:not">'
+             + equal(designator("namespace"), value("a")) + "</Apply>"),
+        rule("permit", "Permit"),
+    ]))
+    assert decide(compiled, request({"namespace": "a"})) == PERMIT
+    assert decide(compiled, request({"namespace": "b"})) == DENY
+    assert decide(compiled, request({"kind": "Pod"})) == INDETERMINATE
+    assert decide(compiled, request({"namespace": ["a", "b"]})) == INDETERMINATE
+
+
+def test_missing_attribute_in_a_permit_rule_is_overridden_by_permit(tmp_path):
+    compiled = compile_policies(tmp_path, policy("p", [
+        rule("maybe", "Permit", equal(designator("namespace"), value("a"))),
+        rule("permit", "Permit"),
+    ]))
+    assert decide(compiled, request({"kind": "Pod"})) == PERMIT
+
+
+def test_missing_attribute_in_a_match_does_not_match(tmp_path):
+    compiled = compile_policies(tmp_path, policy("p", [rule("deny", "Deny")],
+                                                 target=kind_target("Pod")))
+    assert decide(compiled, request({"kind": "Pod"})) == DENY
+    assert decide(compiled, request({"kind": ["Secret", "Pod"]})) == DENY
+    assert decide(compiled, request({"namespace": "a"})) == NOT_APPLICABLE
+
+
+def test_must_be_present_makes_the_target_indeterminate(tmp_path):
+    target = kind_target("Pod").replace(designator("kind"),
+                                        designator("kind", must_be_present=True))
+    permits = policy("permits", [rule("permit", "Permit")], target=target)
+    assert decide(compile_policies(tmp_path, permits), request({"namespace": "a"})) \
+        == INDETERMINATE
+    # another policy's Deny still overrides the weakened Indeterminate{P}
+    denies = policy("denies", [rule("deny", "Deny")])
+    assert decide(compile_policies(tmp_path, permits, denies), request({"namespace": "a"})) \
+        == DENY
+
+
+# ──────── the deployed policies ────────
+
+def deployed(resource, subject):
+    return request({f"urn:k8s:resource:{k}": v for k, v in resource.items()},
+                   {f"urn:k8s:subject:{k}": v for k, v in subject.items()})
+
+
+@pytest.mark.parametrize("resource, subject, expected", [
+    ({"kind": "Pod", "imageRegistry": "myregistry.com", "namespace": "a"},
+     {"namespace": "a"}, PERMIT),
+    ({"kind": "Pod", "imageRegistry": "myregistry.com.attacker.com", "namespace": "a"},
+     {"namespace": "a"}, DENY),
+    ({"kind": "ConfigMap", "namespace": "b"}, {"namespace": "a"}, DENY),
+    ({"kind": "RoleBinding", "roleRefName": "cluster-admin", "namespace": "a"},
+     {"namespace": "a", "groups": ["dev"]}, DENY),
+    ({"kind": "RoleBinding", "roleRefName": "cluster-admin", "namespace": "a"},
+     {"namespace": "a", "groups": ["dev", "system:masters"]}, PERMIT),
+    # no resource namespace: the tenant rule cannot be evaluated
+    ({"kind": "ConfigMap"}, {"namespace": "a"}, INDETERMINATE),
+])
+def test_runtime_policies(resource, subject, expected):
+    compiled = compile_policy_dir(RUNTIME_POLICIES)
+    assert decide(compiled, deployed(resource, subject)) == expected
+
+
+# ──────── LocalPdp ────────
+
+def test_only_permit_and_deny_are_answered_locally():
+    pdp = LocalPdp(RUNTIME_POLICIES)
+    assert pdp.decide(deployed({"kind": "ConfigMap", "namespace": "b"},
+                               {"namespace": "a"})) == DENY
+    assert pdp.decide(deployed({"kind": "ConfigMap"}, {"namespace": "a"})) is None
+    assert (pdp.local, pdp.remote) == (1, 1)
+
+
+def test_multiple_decision_requests_go_to_the_remote_pdp():
+    xacml = {"Request": {"Resource": [{"attributes": []}, {"attributes": []}]}}
+    with pytest.raises(Unsupported):
+        request_attributes(xacml)
+    assert LocalPdp(RUNTIME_POLICIES).decide(xacml) is None
+
+
+def test_unsupported_policy_disables_the_evaluator(tmp_path, caplog):
+    text = policy("p", [rule("permit", "Permit")]).replace(
+        "<Rule", '<VariableDefinition VariableId="v">' + value("x") + "</VariableDefinition><Rule")
+    (tmp_path / "p.xml").write_text(text)
+    pdp = LocalPdp(tmp_path)
+    with caplog.at_level(logging.WARNING):
+        assert pdp.decide(request({"kind": "Pod"})) is None
+    assert "local PDP disabled" in caplog.text
+
+
+def test_shadow_mode_reports_disagreements(caplog):
+    pdp = LocalPdp(RUNTIME_POLICIES, mode="shadow")
+    xacml = deployed({"kind": "ConfigMap", "namespace": "b"}, {"namespace": "a"})
+    assert pdp.decide(xacml) is None
+    with caplog.at_level(logging.WARNING):
+        pdp.shadow(xacml, DENY)
+        pdp.shadow(xacml, PERMIT)
+    assert pdp.disagreements == 1
+    assert "local PDP decided Deny, AuthzForce Permit" in caplog.text
@@ -0,0 +1,149 @@
+"""
+XACML 3.0 policy files -> a small intermediate form of tuples.
+
+Shared by the two back ends that consume the deployed policies: the
+CLI's xacml_compiler.py (SMT encoding for the solver) and the webhook's
+local_pdp.py (in-process evaluation). It is kept in webhook/ so the
+webhook image ships it (the Dockerfile copies *.py); the CLI adds this
+directory to its import path.
+
+The forms are:
+  expression  ("apply", function, [args])      function: 'string-equal'
+              ("attr", category, attribute id, data type, must be present)
+              ("value", data type, str or bool)
+  match       ("match", function, value, designator), the AttributeValue
+              first whichever order the XML gives them in
+  target      [AnyOf] with AnyOf = [AllOf] and AllOf = [match];
+              an empty or missing Target is []
+  rule        (id, effect, target, condition expression or None)
+  policy      ("policy", id, rule-combining URN, target, [rules])
+              ("policyset", id, policy-combining URN, target, [policies])
+Anything outside this (VariableDefinitions, AttributeSelectors, policy
+references, other data types) raises XacmlError when parsed.
+"""
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+XACML_NS = "{urn:oasis:names:tc:xacml:3.0:core:schema:wd-17}"
+STRING = "http://www.w3.org/2001/XMLSchema#string"
+BOOLEAN = "http://www.w3.org/2001/XMLSchema#boolean"
+
+# Children that carry no decision logic
+_IGNORED = ("Description", "PolicyIssuer", "PolicyDefaults", "PolicySetDefaults",
+            "ObligationExpressions", "AdviceExpressions")
+
+
+class XacmlError(ValueError):
+    """A policy file uses XACML outside the supported subset."""
+
+
+def _local(tag):
+    return tag[len(XACML_NS):] if tag.startswith(XACML_NS) else tag
+
+
+def _function(urn):
+    """'urn:...:function:string-equal' -> 'string-equal'."""
+    return urn.rsplit(":", 1)[-1]
+
+
+def _children(el, allowed):
+    """el's children except ignored ones; raises on any not in `allowed`."""
+    children = []
+    for child in el:
+        tag = _local(child.tag)
+        if tag in _IGNORED:
+            continue
+        if tag not in allowed:
+            raise XacmlError(f"unsupported element <{tag}> in <{_local(el.tag)}>")
+        children.append(child)
+    return children
+
+
+def parse_expression(el):
+    tag = _local(el.tag)
+    if tag == "Apply":
+        args = [parse_expression(child) for child in _children(
+            el, ("Apply", "AttributeDesignator", "AttributeValue"))]
+        fn = _function(el.get("FunctionId", ""))
+        if fn == "string-is-in" and len(args) == 2 and args[0][0] == "attr" != args[1][0]:
+            # standard order is (value, bag); accept the bag first as well
+            args = args[::-1]
+        return ("apply", fn, args)
+    if tag == "AttributeDesignator":
+        datatype = el.get("DataType", "")
+        if datatype not in (STRING, BOOLEAN):
+            raise XacmlError(f"unsupported AttributeDesignator DataType {datatype!r}")
+        if el.get("Issuer"):
+            raise XacmlError("unsupported AttributeDesignator with an Issuer")
+        return ("attr", el.get("Category", ""), el.get("AttributeId", ""), datatype,
+                el.get("MustBePresent") == "true")
+    if tag == "AttributeValue":
+        datatype = el.get("DataType", "")
+        if datatype == STRING:
+            return ("value", STRING, el.text or "")
+        if datatype == BOOLEAN:
+            return ("value", BOOLEAN, (el.text or "").strip() in ("true", "1"))
+        raise XacmlError(f"unsupported AttributeValue DataType {datatype!r}")
+    raise XacmlError(f"unsupported expression element <{tag}>")
+
+
+def _parse_match(el):
+    # MatchId is standard; some of our policies say FunctionId
+    fn = _function(el.get("MatchId") or el.get("FunctionId") or "")
+    args = [parse_expression(child) for child in _children(
+        el, ("AttributeValue", "AttributeDesignator"))]
+    kinds = sorted(arg[0] for arg in args)
+    if kinds != ["attr", "value"]:
+        raise XacmlError("a Match needs one AttributeValue and one AttributeDesignator")
+    value, designator = args if args[0][0] == "value" else args[::-1]
+    return ("match", fn, value, designator)
+
+
+def parse_target(el):
+    if el is None:
+        return []
+    return [[[_parse_match(match) for match in _children(all_of, ("Match",))]
+             for all_of in _children(any_of, ("AllOf",))]
+            for any_of in _children(el, ("AnyOf",))]
+
+
+def _parse_rule(el):
+    effect = el.get("Effect")
+    if effect not in ("Permit", "Deny"):
+        raise XacmlError(f"rule {el.get('RuleId')}: unsupported Effect {effect!r}")
+    target, condition = [], None
+    for child in _children(el, ("Target", "Condition")):
+        if _local(child.tag) == "Target":
+            target = parse_target(child)
+            continue
+        if len(child) != 1:
+            raise XacmlError(f"rule {el.get('RuleId')}: Condition needs one expression")
+        condition = parse_expression(child[0])
+    return (el.get("RuleId"), effect, target, condition)
+
+
+def parse_policy(el):
+    """A <Policy> or <PolicySet> element in the intermediate form."""
+    tag = _local(el.tag)
+    if tag == "Policy":
+        children = _children(el, ("Target", "Rule"))
+        rules = [_parse_rule(c) for c in children if _local(c.tag) == "Rule"]
+        return ("policy", el.get("PolicyId"), el.get("RuleCombiningAlgId", ""),
+                parse_target(el.find(XACML_NS + "Target")), rules)
+    if tag == "PolicySet":
+        children = _children(el, ("Target", "Policy", "PolicySet"))
+        policies = [parse_policy(c) for c in children if _local(c.tag) != "Target"]
+        return ("policyset", el.get("PolicySetId"), el.get("PolicyCombiningAlgId", ""),
+                parse_target(el.find(XACML_NS + "Target")), policies)
+    raise XacmlError(f"expected <Policy> or <PolicySet>, found <{tag}>")
+
+
+def policy_files(path):
+    """The XACML files under `path` (a file or directory), sorted."""
+    p = Path(path)
+    return sorted(p.glob("*.xml")) if p.is_dir() else [p]
+
+
+def parse_policy_bytes(data):
+    """Parse one policy file's content; raises XacmlError or ET.ParseError."""
+    return parse_policy(ET.fromstring(data))